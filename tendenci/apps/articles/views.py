@@ -79,7 +79,7 @@ def detail(request, slug=None, hash=None, template_name="articles/view.html"):
 def search(request, template_name="articles/search.html"):
 
     filters = get_query_filters(request.user, 'articles.view_article')
-    articles = Article.objects.filter(filters).distinct()
+    articles = Article.objects.filter(filters)
     cat = None
     category = None
     sub_category = None
@@ -1,8 +1,11 @@
 from datetime import datetime
 
 from django.conf import settings
+from django.utils import six
 
 from tendenci.apps.site_settings.utils import get_setting
+from tendenci.apps.base.lazy_context import lazy_context_processor
+from tendenci.apps.perms.user_context import get_user_context
 
 
 def static_url(request):
@@ -25,10 +28,16 @@ def newrelic(request):
     }
 
 
+@lazy_context_processor(SITE_ADMIN_EMAIL=six.text_type)
 def site_admin_email(request):
     return {'SITE_ADMIN_EMAIL': get_setting('site', 'global', 'admincontactemail')}
 
 
+@lazy_context_processor(USER_IS_NORMAL=bool,
+                        USER_IS_SUPERUSER=bool,
+                        USER_IS_MEMBER=bool,
+                        USER_IS_MEMBER_ACTIVE=bool,
+                        USER_IS_MEMBER_EXPIRED=bool)
 def user_classification(request):
     data = {
     'USER_IS_NORMAL' : True,
@@ -40,16 +49,11 @@ def user_classification(request):
     if hasattr(request.user, 'profile') and request.user.profile.is_superuser:
         data.update({'USER_IS_SUPERUSER': True})
     elif hasattr(request.user, 'memberships'):
-        active_memberships = request.user.membershipdefault_set.filter(
-            status=True, status_detail__iexact='active'
-        )
-        inactive_memberships = request.user.membershipdefault_set.filter(
-            status=True, status_detail__iexact='inactive'
-        )
+        user_context = get_user_context(request.user)
         data.update({'USER_IS_MEMBER':True})
-        if inactive_memberships.exists() > 0:
+        if user_context.has_expired_membership:
             data.update({'USER_IS_MEMBER_EXPIRED': True})
-        elif active_memberships.exists() > 0:
+        elif user_context.has_active_membership:
             data.update({'USER_IS_MEMBER_ACTIVE': True})
 
     return data
@@ -0,0 +1,88 @@
+"""
+Helpers for context processors that defer their work until a
+template reads one of their values.
+
+    @lazy_context_processor(USER_IS_SUPERUSER=bool, THEME_INFO=None)
+    def my_processor(request):
+        return {...}
+
+The decorated processor returns a lazy value for each declared key.
+The first value a template reads runs the original function once for
+the request; every other key is served from that result. Keys with a
+type (six.text_type, bool, ...) get a lazy proxy of that type, keys
+declared as None get a SimpleLazyObject (for dicts, lists and objects).
+
+The time spent in each processor is added to PROCESSOR_TIMINGS so the
+costly ones can be spotted with get_processor_timings().
+"""
+import threading
+from functools import wraps
+from time import time
+
+from django.utils.functional import lazy, SimpleLazyObject
+
+# processor name -> [number of evaluations, total seconds]
+PROCESSOR_TIMINGS = {}
+_timings_lock = threading.Lock()
+
+
+def record_timing(name, seconds):
+    with _timings_lock:
+        timing = PROCESSOR_TIMINGS.setdefault(name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+
+
+def get_processor_timings():
+    """
+    Returns a list of (name, calls, total seconds, average ms)
+    sorted by total time, costliest first.
+    """
+    with _timings_lock:
+        timings = [(name, calls, total, total * 1000 / calls)
+                   for name, (calls, total) in PROCESSOR_TIMINGS.items() if calls]
+    return sorted(timings, key=lambda t: t[2], reverse=True)
+
+
+def timed_context_processor(func):
+    """
+    Records the time spent in an (eager) context processor.
+    """
+    name = '%s.%s' % (func.__module__, func.__name__)
+
+    @wraps(func)
+    def processor(request):
+        start = time()
+        try:
+            return func(request)
+        finally:
+            record_timing(name, time() - start)
+    return processor
+
+
+def lazy_context_processor(**key_types):
+    def decorator(func):
+        name = '%s.%s' % (func.__module__, func.__name__)
+
+        def evaluate(request):
+            results = request.__dict__.setdefault('_lazy_context', {})
+            if name not in results:
+                start = time()
+                results[name] = func(request)
+                record_timing(name, time() - start)
+            return results[name]
+
+        def make_value(request, key, resultclass):
+            def getter():
+                return evaluate(request).get(key)
+            if resultclass is None:
+                return SimpleLazyObject(getter)
+            return lazy(getter, resultclass)()
+
+        @wraps(func)
+        def processor(request):
+            return dict((key, make_value(request, key, resultclass))
+                        for key, resultclass in key_types.items())
+        processor.evaluate = evaluate
+        return processor
+    return decorator
@@ -29,6 +29,8 @@ class Command(BaseCommand):
                     'captcha_clean',
                     'cleanup_expired_dbdumps',
                     'clearsessions',
+                    'drain_event_log_spool',
+                    'rollup_event_logs',
                     )
         for c in commands:
             try:
@@ -1,8 +1,13 @@
+import hashlib
 import random
 from operator import or_
 
+from django.conf import settings
+from django.core.cache import cache
 from django.template import Node, Variable, Context, loader
 from django.db import models
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_bytes
 from django.core.exceptions import FieldError
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.models import AnonymousUser, User
@@ -11,6 +16,13 @@ from django.db.models import Q
 from tendenci.apps.user_groups.models import Group
 from tendenci.apps.perms.utils import get_query_filters
 
+# seconds the items of the list_* tags are cached
+LIST_CACHE_TIMEOUT = 60
+
+# with more items than this, random items are picked by offset
+# instead of from the cached list of ids
+MAX_SAMPLE_IDS = 2000
+
 
 def parse_tag_kwargs(bits):
     """
@@ -32,6 +44,78 @@ def parse_tag_kwargs(bits):
     return kwargs
 
 
+def get_list_cache_key(model, user, *args):
+    """
+    Returns the cache key of the items of a list_* tag for model.
+    Anonymous users share the items, and so do admins. The items of
+    the other users include what they created or own, so they are
+    cached per user. Model instances in args, such as a Group, are
+    keyed by their pk: their repr() is not stable.
+    """
+    user = getattr(user, 'impersonated_user', user)
+    if not isinstance(user, User) or user.is_anonymous():
+        viewer = 'anonymous'
+    elif user.profile.is_superuser:
+        viewer = 'admin'
+    else:
+        viewer = 'user%s' % user.pk
+
+    args = [(arg._meta.app_label, arg._meta.model_name, arg.pk)
+            if isinstance(arg, models.Model) else arg
+            for arg in args]
+    keys = [settings.CACHE_PRE_KEY, 'list_tags', model._meta.app_label,
+            model._meta.model_name, viewer,
+            hashlib.md5(force_bytes(repr(args))).hexdigest()]
+    return '.'.join(keys)
+
+
+def get_list_objects(model, items, limit, randomize, key):
+    """
+    Returns the first limit objects of items (a QuerySet or a
+    SearchQuerySet), or limit random ones if randomize.
+
+    The objects are cached under key for LIST_CACHE_TIMEOUT seconds.
+    For random objects, the ids of the items are cached instead (or
+    only their count if there are more than MAX_SAMPLE_IDS) and only
+    the sampled rows are loaded.
+    """
+    search = not isinstance(items, QuerySet)
+
+    if not randomize:
+        objects = cache.get(key)
+        if objects is None:
+            objects = [item.object if search else item for item in items[:limit]]
+            cache.set(key, objects, LIST_CACHE_TIMEOUT)
+        return objects
+
+    cached = cache.get(key)
+    if cached is None:
+        count = items.count()
+        ids = None
+        if count <= MAX_SAMPLE_IDS:
+            if search:
+                ids = [model._meta.pk.to_python(item.pk) for item in items[:count]]
+            else:
+                ids = list(items.order_by().values_list('pk', flat=True))
+        cached = (count, ids)
+        cache.set(key, cached, LIST_CACHE_TIMEOUT)
+    count, ids = cached
+
+    if ids is not None:
+        chosen = random.sample(ids, min(limit, len(ids)))
+    else:
+        offsets = random.sample(xrange(count), min(limit, count))
+        if search:
+            chosen = [model._meta.pk.to_python(items[offset].pk) for offset in offsets]
+        else:
+            chosen = [items.values_list('pk', flat=True)[offset] for offset in offsets]
+
+    if search:
+        items = model.objects.all()
+    objects = dict((obj.pk, obj) for obj in items.filter(pk__in=chosen))
+    return [objects[pk] for pk in chosen if pk in objects]
+
+
 class ListNode(Node):
     """
     Base template node for searching for items in haystack
@@ -214,13 +298,10 @@ class ListNode(Node):
         if order:
             items = items.order_by(order)
 
-        if randomize:
-            objects = [item for item in random.sample(items, len(items))][:limit]
-        else:
-            objects = [item for item in items[:limit]]
-
-        if query:
-            objects = [item.object for item in objects]
+        key = get_list_cache_key(self.model, user, self.__class__.__name__, self.perms,
+                                 tags, query, limit, order, exclude, group, status_detail,
+                                 randomize, getattr(user, 'is_staff', False))
+        objects = get_list_objects(self.model, items, limit, randomize, key)
 
         context[self.context_var] = objects
 
@@ -0,0 +1,135 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.utils import six
+
+from tendenci.apps.base.lazy_context import lazy_context_processor
+
+
+class LazyContextProcessorTest(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        @lazy_context_processor(NAME=six.text_type, ITEMS=None)
+        def processor(request):
+            self.calls.append(request)
+            return {'NAME': u'tendenci', 'ITEMS': [1, 2]}
+        self.processor = processor
+
+    def test_not_evaluated_until_read(self):
+        request = RequestFactory().get('/')
+        context = self.processor(request)
+        self.assertEqual(sorted(context), ['ITEMS', 'NAME'])
+        self.assertEqual(self.calls, [])
+
+        self.assertEqual(six.text_type(context['NAME']), u'tendenci')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_evaluated_once_per_request(self):
+        request = RequestFactory().get('/')
+        context = self.processor(request)
+        self.assertEqual(six.text_type(context['NAME']), u'tendenci')
+        self.assertEqual(list(context['ITEMS']), [1, 2])
+        # a second processor call in the same request reuses the result
+        self.assertEqual(six.text_type(self.processor(request)['NAME']), u'tendenci')
+        self.assertEqual(len(self.calls), 1)
+
+        other_request = RequestFactory().get('/')
+        self.assertEqual(list(self.processor(other_request)['ITEMS']), [1, 2])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_user_classification(self):
+        from tendenci.apps.base.context_processors import user_classification
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = user_classification(request)
+        self.assertFalse(context['USER_IS_SUPERUSER'])
+        self.assertFalse(context['USER_IS_MEMBER'])
+
+
+class ListObjectsTest(TestCase):
+    def setUp(self):
+        from tendenci.apps.boxes.models import Box
+
+        cache.clear()
+        self.boxes = [Box.objects.create(title='Box %s' % i, content='') for i in range(5)]
+
+    def create_user(self, username, is_superuser=False):
+        from tendenci.apps.profiles.models import Profile
+
+        user = User.objects.create_user(username, '%s@test.com' % username, 'test')
+        user.is_superuser = is_superuser
+        user.save()
+        Profile.objects.create_profile(user=user)
+        return User.objects.get(pk=user.pk)
+
+    def get_key(self, user, *args):
+        from tendenci.apps.base.template_tags import get_list_cache_key
+        from tendenci.apps.boxes.models import Box
+
+        return get_list_cache_key(Box, user, 'ListBoxesNode', *args)
+
+    def get_objects(self, limit, randomize, key='boxes'):
+        from tendenci.apps.base.template_tags import get_list_objects
+        from tendenci.apps.boxes.models import Box
+
+        return get_list_objects(Box, Box.objects.order_by('pk'), limit, randomize, key)
+
+    def test_keys_per_viewer(self):
+        admins = [self.create_user('admin%s' % i, is_superuser=True) for i in range(2)]
+        users = [self.create_user('user%s' % i) for i in range(2)]
+
+        self.assertEqual(self.get_key(AnonymousUser(), 3), self.get_key(None, 3))
+        self.assertEqual(self.get_key(admins[0], 3), self.get_key(admins[1], 3))
+        self.assertNotEqual(self.get_key(users[0], 3), self.get_key(users[1], 3))
+        self.assertNotEqual(self.get_key(users[0], 3), self.get_key(AnonymousUser(), 3))
+        self.assertNotEqual(self.get_key(None, 3), self.get_key(None, 4))
+
+    def test_keys_use_the_pk_of_instances(self):
+        from tendenci.apps.user_groups.models import Group
+
+        groups = [Group.objects.create(name='Group %s' % i) for i in range(2)]
+        key = self.get_key(None, groups[0])
+
+        group = Group.objects.get(pk=groups[0].pk)
+        group.name = 'Renamed'
+        self.assertEqual(self.get_key(None, group), key)
+        self.assertNotEqual(self.get_key(None, groups[1]), key)
+
+    def test_first_objects_are_cached(self):
+        self.assertEqual(self.get_objects(3, False), self.boxes[:3])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_objects(3, False), self.boxes[:3])
+
+    def test_random_objects_are_sampled_from_cached_ids(self):
+        objects = self.get_objects(3, True)
+        self.assertEqual(len(set(objects)), 3)
+        self.assertTrue(set(objects) <= set(self.boxes))
+        self.assertEqual(cache.get('boxes'), (5, [box.pk for box in self.boxes]))
+
+        # only the sampled rows are loaded
+        with self.assertNumQueries(1):
+            objects = self.get_objects(3, True)
+        self.assertEqual(len(set(objects)), 3)
+
+        self.assertEqual(sorted(box.pk for box in self.get_objects(10, True)),
+                         [box.pk for box in self.boxes])
+
+    def test_random_objects_by_offset_above_max_sample_ids(self):
+        from tendenci.apps.base import template_tags
+
+        max_sample_ids = template_tags.MAX_SAMPLE_IDS
+        template_tags.MAX_SAMPLE_IDS = 2
+        try:
+            objects = self.get_objects(3, True)
+            self.assertEqual(cache.get('boxes'), (5, None))
+            self.assertEqual(len(set(objects)), 3)
+            self.assertTrue(set(objects) <= set(self.boxes))
+
+            # one query per offset, one for the rows
+            with self.assertNumQueries(4):
+                self.assertEqual(len(set(self.get_objects(3, True))), 3)
+        finally:
+            template_tags.MAX_SAMPLE_IDS = max_sample_ids
@@ -4,7 +4,7 @@ from django.utils.safestring import mark_safe
 from django.contrib.auth.models import AnonymousUser, User
 from django.utils.translation import ugettext_lazy as _
 
-from tendenci.apps.perms.utils import get_query_filters
+from tendenci.apps.perms.cache import get_visible_object
 from tendenci.apps.base.template_tags import ListNode, parse_tag_kwargs
 from tendenci.apps.boxes.models import Box
 
@@ -29,16 +29,14 @@ class GetBoxNode(Node):
             pk = self.pk
 
         try:
-            filters = get_query_filters(user, 'boxes.view_box')
-            box = Box.objects.filter(filters).filter(pk=pk)
-            if user.is_authenticated():
-                if not user.profile.is_superuser:
-                    box = box.distinct()
-            context['box'] = box[0]
+            box = get_visible_object(user, Box, pk, 'boxes.view_box')
+            if box is None:
+                return unicode()
+            context['box'] = box
             template = get_template('boxes/edit-link.html')
             output = '<div id="box-%s" class="boxes">%s %s</div>' % (
-                box[0].pk,
-                box[0].content,
+                box.pk,
+                box.content,
                 template.render(context),
             )
             return output
@@ -84,12 +82,7 @@ class GetBoxTitleNode(Node):
             pk = self.pk
 
         try:
-            filters = get_query_filters(user, 'boxes.view_box')
-            box = Box.objects.filter(filters).filter(pk=pk)
-            if user.is_authenticated():
-                if not user.profile.is_superuser:
-                    box = box.distinct()
-            box = box[0]
+            box = get_visible_object(user, Box, pk, 'boxes.view_box')
             return box.title
         except:
             return unicode()
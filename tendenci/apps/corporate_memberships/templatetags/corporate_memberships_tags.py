@@ -1,12 +1,11 @@
-import random
-
 from django.contrib.auth.models import AnonymousUser, User
 from django.db import models
 from django.template import Node, Library, TemplateSyntaxError, Variable
 from django.utils.translation import ugettext_lazy as _
 
 from tendenci.apps.corporate_memberships.models import CorpMembership
-from tendenci.apps.base.template_tags import ListNode, parse_tag_kwargs
+from tendenci.apps.base.template_tags import (ListNode, parse_tag_kwargs,
+    get_list_cache_key, get_list_objects)
 from tendenci.apps.site_settings.utils import get_setting
 from tendenci.apps.base.utils import tcurrency
 
@@ -261,16 +260,13 @@ class ListCorpMembershipNode(ListNode):
             if not allow_anonymous_search:
                 items = items.none()
 
-        objects = []
-
         # if order is not specified it sorts by relevance
         if order:
             items = items.order_by(order)
 
-        if randomize:
-            objects = [item for item in random.sample(items, items.count())][:limit]
-        else:
-            objects = [item for item in items[:limit]]
+        key = get_list_cache_key(CorpMembership, user, self.__class__.__name__, limit, order,
+                                 randomize, allow_anonymous_search, allow_member_search)
+        objects = get_list_objects(CorpMembership, items, limit, randomize, key)
 
         context[self.context_var] = objects
         return ""
@@ -0,0 +1,257 @@
+"""
+Cold archival of old EventLog rows.
+
+Event logs are never deleted, but rows older than EVENTLOG_ARCHIVE_DAYS
+can be moved out of the EventLog table by the archive_event_logs
+command. They are written to append-only gzip JSON-lines segment files
+in default storage, one directory per month:
+
+    event_logs/archive/index.json
+    event_logs/archive/2015-03/1200-48113.jsonl.gz
+
+index.json lists every segment with its month, id range, create_dt
+range and row count. The event log search and detail views only read
+the segments whose create_dt range (or id range) they need.
+"""
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from tendenci.apps.event_logs.buffer import serialize_event_log, deserialize_event_logs
+
+ARCHIVE_DIR = 'event_logs/archive'
+INDEX_PATH = '%s/index.json' % ARCHIVE_DIR
+MONTH_FORMAT = '%Y-%m'
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# the storage of the index and segments
+storage = default_storage
+
+
+def load_index():
+    if not storage.exists(INDEX_PATH):
+        return {'segments': []}
+    f = storage.open(INDEX_PATH)
+    try:
+        return json.loads(f.read().decode('utf-8'))
+    finally:
+        f.close()
+
+
+def save_index(index):
+    content = json.dumps(index, indent=1, sort_keys=True).encode('utf-8')
+    if storage.exists(INDEX_PATH):
+        storage.delete(INDEX_PATH)
+    storage.save(INDEX_PATH, ContentFile(content))
+
+
+def month_range(month):
+    """
+    Returns the first moment of the month ('YYYY-MM')
+    and the first moment of the next one.
+    """
+    start = datetime.strptime(month, MONTH_FORMAT)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def archived_months(index=None):
+    index = index or load_index()
+    return sorted(set(segment['month'] for segment in index['segments']))
+
+
+def get_dt_range(segment):
+    """
+    Returns the create_dt of the oldest and newest rows of a segment.
+    """
+    return (datetime.strptime(segment['min_dt'], DATETIME_FORMAT),
+            datetime.strptime(segment['max_dt'], DATETIME_FORMAT))
+
+
+def delete_archived_rows(segment):
+    """
+    Delete the hot rows that a segment holds. Safe to repeat, so a run
+    interrupted between writing a segment and deleting its rows is
+    finished by the next run.
+
+    The ids don't follow create_dt (buffered rows are inserted late),
+    so the id range alone can hold rows the segment doesn't have: the
+    create_dt range of the segment is applied too. Every row in both
+    ranges was archived, new rows only get higher ids.
+    """
+    from tendenci.apps.event_logs.models import EventLog
+
+    min_dt, max_dt = get_dt_range(segment)
+    EventLog.objects.filter(pk__gte=segment['min_id'],
+                            pk__lte=segment['max_id'],
+                            create_dt__gte=min_dt,
+                            create_dt__lte=max_dt).delete()
+
+
+def write_segment(month, event_logs):
+    """
+    Write the event logs to a new gzip segment file for month
+    and return its index entry.
+    """
+    min_id, max_id = event_logs[0].pk, event_logs[-1].pk
+    min_dt = min(event_log.create_dt for event_log in event_logs)
+    max_dt = max(event_log.create_dt for event_log in event_logs)
+    path = '%s/%s/%s-%s.jsonl.gz' % (ARCHIVE_DIR, month, min_id, max_id)
+
+    tmp = tempfile.TemporaryFile()
+    gz = gzip.GzipFile(fileobj=tmp, mode='wb')
+    for event_log in event_logs:
+        gz.write((serialize_event_log(event_log) + '\n').encode('utf-8'))
+    gz.close()
+    tmp.seek(0)
+
+    if storage.exists(path):
+        storage.delete(path)
+    path = storage.save(path, File(tmp))
+    tmp.close()
+
+    return {'month': month,
+            'path': path,
+            'count': len(event_logs),
+            'min_id': min_id,
+            'max_id': max_id,
+            'min_dt': min_dt.strftime(DATETIME_FORMAT),
+            'max_dt': max_dt.strftime(DATETIME_FORMAT)}
+
+
+def archive_event_logs(days, segment_size=50000):
+    """
+    Move the EventLog rows older than days into monthly segment files.
+    Returns the number of rows archived.
+
+    The rows are rolled up first, so the event log reports
+    keep counting them after they leave the table.
+    """
+    from tendenci.apps.event_logs.models import EventLog, EventLogSummaryWatermark
+    from tendenci.apps.event_logs.summaries import rollup_event_logs
+
+    index = load_index()
+    for segment in index['segments']:
+        delete_archived_rows(segment)
+
+    rollup_event_logs()
+    last_id = EventLogSummaryWatermark.get_last_id()
+    cutoff = datetime.now() - timedelta(days=days)
+
+    total = 0
+    while True:
+        oldest = EventLog.objects.filter(create_dt__lt=cutoff, pk__lte=last_id)\
+                    .order_by('create_dt').values_list('create_dt', flat=True).first()
+        if not oldest:
+            break
+
+        month = oldest.strftime(MONTH_FORMAT)
+        start, end = month_range(month)
+        event_logs = list(EventLog.objects.filter(create_dt__gte=start,
+                                                  create_dt__lt=min(end, cutoff),
+                                                  pk__lte=last_id)
+                                          .order_by('pk')[:segment_size])
+
+        segment = write_segment(month, event_logs)
+        index['segments'].append(segment)
+        save_index(index)
+        with transaction.atomic():
+            delete_archived_rows(segment)
+        total += segment['count']
+
+    return total
+
+
+def read_segment(segment):
+    f = storage.open(segment['path'])
+    try:
+        data = f.read()
+    finally:
+        f.close()
+    lines = gzip.GzipFile(fileobj=BytesIO(data)).read().decode('utf-8').splitlines()
+    return deserialize_event_logs(lines, keep_pk=True)
+
+
+def search_archive(start_dt, end_dt, match=None):
+    """
+    Returns the archived event logs created between start_dt and end_dt
+    for which match(event_log) is true, newest first. Only the segments
+    with rows in that range are read.
+    """
+    event_logs = []
+    for segment in load_index()['segments']:
+        min_dt, max_dt = get_dt_range(segment)
+        if max_dt < start_dt or min_dt > end_dt:
+            continue
+        for event_log in read_segment(segment):
+            if not start_dt <= event_log.create_dt <= end_dt:
+                continue
+            if match and not match(event_log):
+                continue
+            event_logs.append(event_log)
+
+    event_logs.sort(key=lambda e: (e.create_dt, e.pk), reverse=True)
+    return event_logs
+
+
+def get_archived_event_log(pk):
+    """
+    Returns the archived event log with this id, or None.
+    """
+    for segment in load_index()['segments']:
+        if segment['min_id'] <= pk <= segment['max_id']:
+            for event_log in read_segment(segment):
+                if event_log.pk == pk:
+                    return event_log
+    return None
+
+
+class EventLogSearchResults(object):
+    """
+    The hot EventLog queryset followed by the matching archived rows,
+    sliceable and countable like a queryset for pagination.
+
+    Archived rows are always older than the rows left in the table,
+    so the newest-first order holds across the two.
+    """
+    def __init__(self, queryset, archived):
+        self.queryset = queryset
+        self.archived = archived
+        self._hot_count = None
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count + len(self.archived)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        for event_log in self.queryset:
+            yield event_log
+        for event_log in self.archived:
+            yield event_log
+
+    def __getitem__(self, k):
+        hot_count = self.hot_count
+        if isinstance(k, slice):
+            start = k.start or 0
+            stop = self.count() if k.stop is None else k.stop
+            items = list(self.queryset[min(start, hot_count):min(stop, hot_count)])
+            items += self.archived[max(start - hot_count, 0):max(stop - hot_count, 0)]
+            return items
+        if k < hot_count:
+            return self.queryset[k]
+        return self.archived[k - hot_count]
@@ -0,0 +1,216 @@
+"""
+Buffered writer for EventLog rows.
+
+By default ``EventLog.objects.log()`` saves every row as soon as it is
+built. With ``EVENTLOG_WRITE_MODE`` set to ``'buffered'`` or ``'spool'``
+the rows are queued per process and written in batches instead:
+
+    EVENTLOG_WRITE_MODE = 'buffered'  # 'sync' (default), 'buffered', 'spool'
+    EVENTLOG_BUFFER_SIZE = 100        # flush when this many rows are queued
+    EVENTLOG_BUFFER_TIMEOUT = 5       # or when the oldest row is this old (sec)
+    EVENTLOG_SPOOL_DIR = '/path/to/spool'
+
+In ``'spool'`` mode every queued row is also appended to a per-process
+JSON-lines file in ``EVENTLOG_SPOOL_DIR``. The file is truncated after
+each successful flush, so the rows of a worker that dies before flushing
+can be loaded later with ``python manage.py drain_event_log_spool``.
+"""
+import os
+import atexit
+import logging
+import threading
+from time import time
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WRITE_MODE_SYNC = 'sync'
+WRITE_MODE_BUFFERED = 'buffered'
+WRITE_MODE_SPOOL = 'spool'
+
+SPOOL_FILE_EXT = '.jsonl'
+
+
+def get_write_mode():
+    mode = getattr(settings, 'EVENTLOG_WRITE_MODE', WRITE_MODE_SYNC)
+    if mode not in (WRITE_MODE_BUFFERED, WRITE_MODE_SPOOL):
+        return WRITE_MODE_SYNC
+    return mode
+
+
+def get_spool_dir():
+    return getattr(settings, 'EVENTLOG_SPOOL_DIR',
+                   os.path.join(settings.CACHE_DIR, 'event_logs_spool'))
+
+
+def insert_event_logs(event_logs):
+    """
+    Insert a list of unsaved EventLog instances in batches.
+
+    This is what ``bulk_create`` does, except the rows are inserted raw
+    so that ``create_dt`` keeps the time the event happened instead of
+    being reset by ``auto_now_add`` at flush time. Rows built without
+    a ``create_dt`` get the current time, as ``auto_now_add`` would.
+    """
+    if not event_logs:
+        return
+    from tendenci.apps.event_logs.models import EventLog
+
+    now = timezone.now()
+    for event_log in event_logs:
+        if not event_log.create_dt:
+            event_log.create_dt = now
+
+    fields = [f for f in EventLog._meta.local_concrete_fields
+              if not f.primary_key]
+    batch_size = getattr(settings, 'EVENTLOG_BUFFER_SIZE', 100) or 100
+    with transaction.atomic(using=EventLog.objects.db):
+        for i in range(0, len(event_logs), batch_size):
+            EventLog._base_manager._insert(event_logs[i:i + batch_size],
+                                           fields=fields,
+                                           using=EventLog.objects.db,
+                                           raw=True)
+
+
+def serialize_event_log(event_log):
+    return serializers.serialize('json', [event_log])
+
+
+def deserialize_event_logs(lines, keep_pk=False):
+    """
+    Yield EventLog instances from spool (or archive) file lines.
+    Corrupted lines (e.g. a partial write at crash time) are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            for obj in serializers.deserialize('json', line):
+                if not keep_pk:
+                    obj.object.pk = None
+                yield obj.object
+        except Exception as e:
+            logger.warning('Skipping bad event log line: %s' % e)
+
+
+class EventLogBuffer(object):
+    """
+    Per-process queue of unsaved EventLog instances.
+    """
+    def __init__(self, size=100, timeout=5, spool_dir=None):
+        self.size = size
+        self.timeout = timeout
+        self.spool_dir = spool_dir
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.queue = []
+        self.first_added = None
+        self.spool_file = None
+
+    def _check_pid(self):
+        # after a fork the child must not flush (or truncate the spool
+        # file of) rows that belong to the parent process
+        if self.pid != os.getpid():
+            self._reset()
+
+    @property
+    def spool_path(self):
+        return os.path.join(self.spool_dir, '%s%s' % (self.pid, SPOOL_FILE_EXT))
+
+    def _spool(self, event_log):
+        if not self.spool_dir:
+            return
+        try:
+            if not self.spool_file:
+                if not os.path.isdir(self.spool_dir):
+                    os.makedirs(self.spool_dir)
+                self.spool_file = open(self.spool_path, 'a')
+            self.spool_file.write(serialize_event_log(event_log) + '\n')
+            self.spool_file.flush()
+        except (IOError, OSError) as e:
+            logger.error('Unable to spool event log: %s' % e)
+
+    def _truncate_spool(self):
+        if self.spool_file:
+            self.spool_file.seek(0)
+            self.spool_file.truncate()
+
+    def add(self, event_log):
+        with self.lock:
+            self._check_pid()
+            self.queue.append(event_log)
+            self._spool(event_log)
+            if not self.first_added:
+                self.first_added = time()
+            if len(self.queue) >= self.size or \
+                    time() - self.first_added >= self.timeout:
+                self.flush()
+
+    def flush(self):
+        with self.lock:
+            self._check_pid()
+            if not self.queue:
+                return
+            event_logs, self.queue = self.queue, []
+            self.first_added = None
+            try:
+                insert_event_logs(event_logs)
+            except Exception as e:
+                # keep the rows for the next attempt, the spool
+                # file (if any) still holds them as well
+                self.queue = event_logs + self.queue
+                self.first_added = time()
+                logger.error('Unable to flush event logs: %s' % e)
+                return
+            self._truncate_spool()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.spool_file:
+                self.spool_file.close()
+                self.spool_file = None
+            if self.spool_dir and not self.queue:
+                try:
+                    os.remove(self.spool_path)
+                except OSError:
+                    pass
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """
+    Return the buffer for this process, creating it on first use.
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                spool_dir = None
+                if get_write_mode() == WRITE_MODE_SPOOL:
+                    spool_dir = get_spool_dir()
+                _buffer = EventLogBuffer(
+                    size=getattr(settings, 'EVENTLOG_BUFFER_SIZE', 100),
+                    timeout=getattr(settings, 'EVENTLOG_BUFFER_TIMEOUT', 5),
+                    spool_dir=spool_dir)
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+def flush_buffer():
+    """
+    Write any queued event logs for this process now.
+    """
+    if _buffer is not None:
+        _buffer.flush()
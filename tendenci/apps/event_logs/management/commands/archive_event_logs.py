@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Move event logs older than EVENTLOG_ARCHIVE_DAYS (or --days) out of
+    the EventLog table into compressed monthly segment files in
+    default storage. The rows are rolled up for the reports first
+    and stay searchable from the event log search page.
+
+    Usage:
+        python manage.py archive_event_logs [--days 365] [--segment-size 50000]
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days',
+            type=int,
+            dest='days',
+            default=None,
+            help='Archive event logs older than this many days')
+        parser.add_argument('--segment-size',
+            type=int,
+            dest='segment_size',
+            default=50000,
+            help='Maximum number of event logs per segment file')
+
+    def handle(self, *args, **options):
+        from tendenci.apps.event_logs.archive import archive_event_logs
+
+        days = options['days'] or getattr(settings, 'EVENTLOG_ARCHIVE_DAYS', None)
+        if not days:
+            print('Set EVENTLOG_ARCHIVE_DAYS or pass --days to archive event logs')
+            return
+
+        total = archive_event_logs(days, segment_size=options['segment_size'])
+        if int(options.get('verbosity', 1)) >= 1:
+            print('Archived %d event logs older than %d days' % (total, days))
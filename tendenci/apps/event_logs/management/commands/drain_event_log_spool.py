@@ -0,0 +1,64 @@
+import os
+import errno
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Insert the event logs left in the spool directory by worker
+    processes that exited (or crashed) before flushing their buffer.
+
+    Spool files of processes that are still running are skipped
+    unless --all is passed.
+
+    Usage:
+        python manage.py drain_event_log_spool [--all]
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Also drain spool files of running processes')
+
+    def pid_is_running(self, pid):
+        try:
+            os.kill(pid, 0)
+        except OSError as e:
+            return e.errno == errno.EPERM
+        return True
+
+    def handle(self, *args, **options):
+        from tendenci.apps.event_logs.buffer import (get_spool_dir,
+            insert_event_logs, deserialize_event_logs, SPOOL_FILE_EXT)
+
+        verbosity = int(options.get('verbosity', 1))
+        spool_dir = get_spool_dir()
+        if not os.path.isdir(spool_dir):
+            return
+
+        total = 0
+        for filename in sorted(os.listdir(spool_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext != SPOOL_FILE_EXT or not name.isdigit():
+                continue
+            pid = int(name)
+            if pid == os.getpid():
+                continue
+            if not options['all'] and self.pid_is_running(pid):
+                continue
+
+            path = os.path.join(spool_dir, filename)
+            with open(path) as f:
+                event_logs = list(deserialize_event_logs(f))
+            insert_event_logs(event_logs)
+            os.remove(path)
+
+            total += len(event_logs)
+            if verbosity >= 2:
+                print('%s: %d event logs' % (filename, len(event_logs)))
+
+        if verbosity >= 1:
+            print('Drained %d event logs from %s' % (total, spool_dir))
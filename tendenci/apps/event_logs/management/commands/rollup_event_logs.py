@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Add the event logs created since the last run to the daily
+    summary table used by the event log reports.
+
+    Only rows past the stored watermark and older than
+    EVENTLOG_ROLLUP_LAG (or --lag) minutes are processed, so this can
+    be run as often as needed (nightly at least).
+
+    Usage:
+        python manage.py rollup_event_logs [--chunk-size 50000] [--lag 15]
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=50000,
+            help='Number of event log ids to process per transaction')
+        parser.add_argument('--lag',
+            type=int,
+            dest='lag',
+            default=None,
+            help='Leave the event logs newer than this many minutes')
+
+    def handle(self, *args, **options):
+        from datetime import timedelta
+        from tendenci.apps.event_logs.summaries import rollup_event_logs
+
+        lag = None
+        if options['lag'] is not None:
+            lag = timedelta(minutes=options['lag'])
+        total = rollup_event_logs(chunk_size=options['chunk_size'], lag=lag)
+        if int(options.get('verbosity', 1)) >= 1:
+            print('Rolled up %d event logs' % total)
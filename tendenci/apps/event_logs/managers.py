@@ -1,4 +1,5 @@
-import inspect
+import sys
+import uuid
 from time import strptime
 from datetime import datetime, timedelta
 from operator import and_
@@ -11,8 +12,95 @@ from django.contrib.auth.models import AnonymousUser
 from django.db.models import Q
 from django.conf import settings
 from django.utils.encoding import smart_bytes
+from django.utils import timezone
 
 from tendenci.apps.robots.models import Robot
+from tendenci.apps.event_logs.buffer import get_write_mode, get_buffer, WRITE_MODE_SYNC
+
+
+# application and action per view callable, for the 'resolver'
+# EVENTLOG_ATTRIBUTION_MODE
+_view_attribution_cache = {}
+
+# resolved on first use, it doesn't change for the life of the process
+_server_ip_address = None
+
+
+def get_server_ip_address():
+    global _server_ip_address
+    if _server_ip_address is None:
+        try:
+            _server_ip_address = gethostbyname(gethostname())
+        except:
+            try:
+                _server_ip_address = settings.INTERNAL_IPS[0]
+            except:
+                _server_ip_address = '0.0.0.0'
+    return _server_ip_address
+
+
+def get_caller_frames(depth=5):
+    """
+    Return the frames of the current call stack, innermost first,
+    starting with the caller of this function.
+
+    Much cheaper than inspect.stack(), which also reads the source
+    context of every frame on the stack.
+    """
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        frames.append(frame)
+        frame = frame.f_back
+    return frames
+
+
+def clean_application_name(module_name):
+    """
+    Turn a module path like tendenci.apps.articles.views
+    into an application name like articles.
+    """
+    application = module_name.split('.')
+    remove_list = ['tendenci',
+                    'models',
+                    'views',
+                    'addons',
+                    'core',
+                    'apps',
+                    'contrib']
+
+    for item in remove_list:
+        if item in application:
+            application.remove(item)
+
+    # Join on the chance that we are left with more than one item
+    # in the list that we created
+    return ".".join(application)
+
+
+def get_view_attribution(request):
+    """
+    Return (application, action) for the view that resolved this request,
+    or (None, None) if the request has no resolver match.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    if not resolver_match:
+        return None, None
+
+    func = resolver_match.func
+    try:
+        return _view_attribution_cache[func]
+    except (KeyError, TypeError):
+        pass
+
+    attribution = (clean_application_name(getattr(func, '__module__', '') or ''),
+                   getattr(func, '__name__', ''))
+    try:
+        _view_attribution_cache[func] = attribution
+    except TypeError:
+        # unhashable view callable
+        pass
+    return attribution
 
 
 default_keyword_args = (
@@ -33,49 +121,72 @@ default_keyword_args = (
 class EventLogManager(Manager):
     def search(self, query=None, *args, **kwargs):
         """
-        Uses haystack to query event logs
-        Returns a SearchQuerySet
+        Returns the event logs matching the search form query, newest
+        first, as a QuerySet.
+
+        If the date range reaches into archived months the matching
+        archived event logs are appended to the results, which are then
+        an EventLogSearchResults.
         """
+        from tendenci.apps.event_logs.archive import (archived_months,
+            search_archive, EventLogSearchResults, MONTH_FORMAT)
+
         f_data = query.cleaned_data
         qs = []
+        # (attribute, value) pairs to match archived rows against
+        matches = []
 
-        if f_data['start_dt']:
-            qs.append(Q(create_dt__gte=f_data['start_dt']))
-        else:
-            qs.append(Q(create_dt__gte=datetime.now() - timedelta(weeks=4)))
-
-        if f_data['end_dt']:
-            qs.append(Q(create_dt__lte=f_data['end_dt']))
-        else:
-            qs.append(Q(create_dt__lte=datetime.now()))
+        start_dt = f_data['start_dt'] or datetime.now() - timedelta(weeks=4)
+        end_dt = f_data['end_dt'] or datetime.now()
+        qs.append(Q(create_dt__gte=start_dt))
+        qs.append(Q(create_dt__lte=end_dt))
 
         if f_data['request_method']:
             if f_data['request_method'] != 'all':
                 qs.append(Q(request_method=f_data['request_method']))
+                matches.append(('request_method', f_data['request_method']))
 
         if f_data['user_id']:
             qs.append(Q(user=f_data['user_id']))
+            matches.append(('user_id', f_data['user_id']))
 
         if f_data['user_name']:
             qs.append(Q(username=f_data['user_name']))
+            matches.append(('username', f_data['user_name']))
 
         if f_data['user_ip_address']:
             qs.append(Q(user_ip_address=f_data['user_ip_address']))
+            matches.append(('user_ip_address', f_data['user_ip_address']))
 
         if f_data['application']:
             qs.append(Q(application=f_data['application']))
+            matches.append(('application', f_data['application']))
 
         if f_data['action']:
             qs.append(Q(action=f_data['action']))
+            matches.append(('action', f_data['action']))
 
         if f_data['object_id']:
             qs.append(Q(object_id=f_data['object_id']))
+            matches.append(('object_id', f_data['object_id']))
 
         event_logs = self.model.objects.filter(
             reduce(and_, qs)
         )
+        event_logs = event_logs.order_by('-create_dt')
+
+        months = archived_months()
+        if months and months[0] <= end_dt.strftime(MONTH_FORMAT) and \
+                start_dt.strftime(MONTH_FORMAT) <= months[-1]:
+            def match(event_log):
+                for attr, value in matches:
+                    if unicode(getattr(event_log, attr)) != unicode(value):
+                        return False
+                return True
+            archived = search_archive(start_dt, end_dt, match)
+            return EventLogSearchResults(event_logs, archived)
 
-        return event_logs.order_by('-create_dt')
+        return event_logs
 
     def log(self, **kwargs):
         """
@@ -90,19 +201,18 @@ class EventLogManager(Manager):
         """
         request, user, instance = None, None, None
 
-        stack = inspect.stack()
+        # stack[0] is this method, stack[1] its caller and so on
+        stack = get_caller_frames()
 
         # If the request is not present in the kwargs, we try to find it
         # by inspecting the stack. We dive 3 levels if necessary. - JMO 2012-05-14
         if 'request' in kwargs:
             request = kwargs['request']
         else:
-            if 'request' in inspect.getargvalues(stack[1][0]).locals:
-                request = inspect.getargvalues(stack[1][0]).locals['request']
-            elif 'request' in inspect.getargvalues(stack[2][0]).locals:
-                request = inspect.getargvalues(stack[2][0]).locals['request']
-            elif 'request' in inspect.getargvalues(stack[3][0]).locals:
-                request = inspect.getargvalues(stack[3][0]).locals['request']
+            for frame in stack[1:4]:
+                if 'request' in frame.f_locals:
+                    request = frame.f_locals['request']
+                    break
 
         # If this eventlog is being triggered by something without a request, we
         # do not want to log it. This is usually some other form of logging
@@ -150,32 +260,27 @@ class EventLogManager(Manager):
         # We get the app name via inspecting. Due to our update_perms_and_save util
         # we must filter out perms as an actual source. This is ok since there are
         # no views within perms. - JMO 2012-05-14
+        #
+        # With EVENTLOG_ATTRIBUTION_MODE = 'resolver' both the application
+        # and the action come from the view in request.resolver_match
+        # and the stack is only used when the request was not resolved.
+        view_application, view_action = None, None
+        if getattr(settings, 'EVENTLOG_ATTRIBUTION_MODE', 'stack') == 'resolver':
+            view_application, view_action = get_view_attribution(request)
+
         if 'application' in kwargs:
             event_log.application = kwargs['application']
 
-        if not event_log.application:
-            event_log.application = inspect.getmodule(stack[1][0]).__name__
+        if not event_log.application and view_application is not None:
+            event_log.application = view_application
+        elif not event_log.application:
+            event_log.application = stack[1].f_globals.get('__name__', '')
             if "perms" in event_log.application.split('.'):
-                event_log.application = inspect.getmodule(stack[2][0]).__name__
+                event_log.application = stack[2].f_globals.get('__name__', '')
                 if "perms" in event_log.application.split('.'):
-                    event_log.application = inspect.getmodule(stack[3][0]).__name__
+                    event_log.application = stack[3].f_globals.get('__name__', '')
 
-        event_log.application = event_log.application.split('.')
-        remove_list = ['tendenci',
-                        'models',
-                        'views',
-                        'addons',
-                        'core',
-                        'apps',
-                        'contrib']
-
-        for item in remove_list:
-            if item in event_log.application:
-                event_log.application.remove(item)
-
-        # Join on the chance that we are left with more than one item
-        # in the list that we created
-        event_log.application = ".".join(event_log.application)
+        event_log.application = clean_application_name(event_log.application)
 
         # Action is the name of the view that is being called
         #
@@ -185,16 +290,20 @@ class EventLogManager(Manager):
         # updating. - JMO 2012-05-14
         if 'action' in kwargs:
             event_log.action = kwargs['action']
+        elif view_action is not None:
+            event_log.action = view_action
         else:
-            event_log.action = stack[1][3]
-            if stack[1][3] == "save":
-                if stack[2][3] == "save" or stack[2][3] == "update_perms_and_save":
-                    if stack[3][3] == "update_perms_and_save":
-                        event_log.action = stack[4][3]
+            names = [frame.f_code.co_name for frame in stack]
+            event_log.action = names[1]
+            if names[1] == "save":
+                if names[2] == "save" or names[2] == "update_perms_and_save":
+                    if names[3] == "update_perms_and_save":
+                        event_log.action = names[4]
                     else:
-                        event_log.action = stack[3][3]
+                        event_log.action = names[3]
                 else:
-                    event_log.action = stack[2][3]
+                    event_log.action = names[2]
+        del stack
 
         if event_log.application == "base":
             event_log.application = "homepage"
@@ -249,22 +358,32 @@ class EventLogManager(Manager):
                 if robot:
                     event_log.robot = robot
 
-            try:
-                event_log.server_ip_address = gethostbyname(gethostname())
-            except:
-                try:
-                    event_log.server_ip_address = settings.INTERNAL_IPS[0]
-                except:
-                    event_log.server_ip_address = '0.0.0.0'
+            event_log.server_ip_address = get_server_ip_address()
             if hasattr(request, 'path'):
                 event_log.url = request.path or ''
 
         # If we have an IP address, save the event_log
         if "." in event_log.user_ip_address:
-            event_log.save()
+            self.write(event_log)
             return event_log
         else:
             return None
 
+    def write(self, event_log):
+        """
+        Save the event_log now, or queue it for a bulk insert
+        if EVENTLOG_WRITE_MODE is 'buffered' or 'spool'.
+        """
+        if get_write_mode() == WRITE_MODE_SYNC:
+            event_log.save()
+            return
+
+        # bulk inserts skip EventLog.save(), so fill in what it would
+        if not event_log.uuid:
+            event_log.uuid = str(uuid.uuid1())
+        if not event_log.create_dt:
+            event_log.create_dt = timezone.now()
+        get_buffer().add(event_log)
+
     def delete(self, *args, **kwargs):
         pass
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event_logs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventLogDailySummary',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('day', models.DateField(db_index=True)),
+                ('application', models.CharField(max_length=50, null=True)),
+                ('action', models.CharField(max_length=50, null=True)),
+                ('source', models.CharField(max_length=50, null=True)),
+                ('event_id', models.IntegerField(null=True)),
+                ('description', models.CharField(max_length=120, null=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EventLogSummaryWatermark',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('last_id', models.IntegerField(default=0)),
+                ('update_dt', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -70,6 +70,42 @@ class EventLog(models.Model):
         pass
 
 
+class EventLogDailySummary(models.Model):
+    """
+    Per-day EventLog counts used by the event log reports.
+    Kept up to date by the rollup_event_logs command.
+    """
+    day = models.DateField(db_index=True)
+    application = models.CharField(max_length=50, null=True)
+    action = models.CharField(max_length=50, null=True)
+    source = models.CharField(max_length=50, null=True)
+    event_id = models.IntegerField(null=True)
+    description = models.CharField(max_length=120, null=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        app_label="event_logs"
+
+
+class EventLogSummaryWatermark(models.Model):
+    """
+    The id of the last EventLog counted in EventLogDailySummary.
+    There is only ever one row.
+    """
+    last_id = models.IntegerField(default=0)
+    update_dt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label="event_logs"
+
+    @classmethod
+    def get_last_id(cls):
+        watermark = cls.objects.first()
+        if watermark:
+            return watermark.last_id
+        return 0
+
+
 class CachedColorModel(models.Model):
     "Cache to avoid re-looking up eventlog color objects all over the place."
     class Meta:
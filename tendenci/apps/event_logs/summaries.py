@@ -0,0 +1,176 @@
+"""
+Daily roll-ups of EventLog counts for the event log reports.
+
+EventLogDailySummary holds per-day counts by application, action,
+source, event_id and description for every EventLog up to the id kept
+in EventLogSummaryWatermark. The reports add the counts of the raw
+EventLog rows past the watermark (the rows newer than
+settings.EVENTLOG_ROLLUP_LAG minutes at least) so the result matches a
+group by over the raw table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from tendenci.apps.event_logs.models import (EventLog, EventLogDailySummary,
+    EventLogSummaryWatermark)
+
+SUMMARY_FIELDS = ('application', 'action', 'source', 'event_id', 'description')
+
+
+def parse_day(value):
+    """
+    DATE(create_dt) is a string on sqlite and a date elsewhere.
+    """
+    if isinstance(value, basestring):
+        return parse_date(value)
+    return value
+
+
+def get_rollup_lag():
+    return timedelta(minutes=getattr(settings, 'EVENTLOG_ROLLUP_LAG', 15))
+
+
+def get_rollup_bound(last_id, lag):
+    """
+    Returns the first EventLog id past last_id that is newer than lag,
+    or None. Rows from that id on are left to the raw path: ids are
+    assigned at insert time, so a transaction still open (or a buffered
+    flush) can commit a lower id after a higher one is visible.
+    """
+    return EventLog.objects.filter(pk__gt=last_id,
+                                   create_dt__gte=timezone.now() - lag)\
+                .order_by('pk').values_list('pk', flat=True).first()
+
+
+def rollup_event_logs(chunk_size=50000, lag=None):
+    """
+    Add the EventLog rows past the watermark and older than lag
+    (settings.EVENTLOG_ROLLUP_LAG minutes by default) to
+    EventLogDailySummary. Returns the number of event logs processed.
+    """
+    if lag is None:
+        lag = get_rollup_lag()
+    max_id = EventLog.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if not max_id:
+        return 0
+    bound = get_rollup_bound(EventLogSummaryWatermark.get_last_id(), lag)
+    if bound is not None:
+        max_id = min(max_id, bound - 1)
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            # another run may have moved the watermark since the last chunk
+            watermark = get_watermark_for_update()
+            from_id = watermark.last_id
+            if from_id >= max_id:
+                break
+            to_id = min(from_id + chunk_size, max_id)
+            total += rollup_range(from_id, to_id)
+            watermark.last_id = to_id
+            watermark.save()
+    return total
+
+
+def get_watermark_for_update():
+    """
+    Returns the watermark row locked until the end of the transaction.
+    """
+    watermark = EventLogSummaryWatermark.objects.select_for_update()\
+                    .order_by('pk').first()
+    if not watermark:
+        watermark = EventLogSummaryWatermark.objects.create()
+    return watermark
+
+
+def rollup_range(from_id, to_id):
+    """
+    Roll up the event logs with from_id < id <= to_id.
+    Must run in the transaction that moves the watermark to to_id.
+    """
+    rows = EventLog.objects.filter(pk__gt=from_id, pk__lte=to_id)\
+                .extra(select={'day': 'DATE(create_dt)'})\
+                .values('day', *SUMMARY_FIELDS)\
+                .annotate(count=Count('pk'))\
+                .order_by()
+
+    counts = {}
+    for row in rows:
+        key = (parse_day(row['day']),) + tuple(row[f] for f in SUMMARY_FIELDS)
+        counts[key] = counts.get(key, 0) + row['count']
+
+    existing = {}
+    days = set(key[0] for key in counts)
+    if days:
+        for summary in EventLogDailySummary.objects.filter(day__in=days):
+            key = (summary.day,) + tuple(getattr(summary, f) for f in SUMMARY_FIELDS)
+            existing[key] = summary.pk
+
+    new_summaries = []
+    for key, count in counts.items():
+        if key in existing:
+            EventLogDailySummary.objects.filter(pk=existing[key])\
+                .update(count=F('count') + count)
+        else:
+            new_summaries.append(EventLogDailySummary(
+                day=key[0], count=count, **dict(zip(SUMMARY_FIELDS, key[1:]))))
+    EventLogDailySummary.objects.bulk_create(new_summaries)
+
+    return sum(counts.values())
+
+
+def can_use_summaries(form):
+    """
+    The roll-ups can't answer the ip, user and session filters
+    of the EventsFilterForm.
+    """
+    if not form.is_valid():
+        return True
+    cd = form.cleaned_data
+    return not (cd['ip'] or cd['user_id'] or cd['session_id'])
+
+
+def summary_counts(from_date, to_date, fields, filters=None, by_day=False):
+    """
+    Returns a list of dicts with the given fields (and 'day' if by_day)
+    and their EventLog 'count' between from_date and to_date inclusive,
+    ordered by descending count (by day first if by_day).
+    """
+    filters = filters or {}
+    last_id = EventLogSummaryWatermark.get_last_id()
+    group_by = (('day',) if by_day else ()) + tuple(fields)
+
+    counts = {}
+
+    summaries = EventLogDailySummary.objects.filter(
+                    day__gte=from_date, day__lte=to_date, **filters)\
+                .values(*group_by)\
+                .annotate(count=Sum('count'))\
+                .order_by()
+    for row in summaries:
+        key = tuple(row[f] for f in group_by)
+        counts[key] = counts.get(key, 0) + row['count']
+
+    # the rows that are not rolled up yet
+    queryset = EventLog.objects.filter(pk__gt=last_id,
+                    create_dt__gte=from_date,
+                    create_dt__lt=to_date + timedelta(days=1), **filters)
+    if by_day:
+        queryset = queryset.extra(select={'day': 'DATE(create_dt)'})
+    for row in queryset.values(*group_by).annotate(count=Count('pk')).order_by():
+        if by_day:
+            row['day'] = parse_day(row['day'])
+        key = tuple(row[f] for f in group_by)
+        counts[key] = counts.get(key, 0) + row['count']
+
+    data = [dict(zip(group_by, key), count=count) for key, count in counts.items()]
+    if by_day:
+        data.sort(key=lambda item: (item['day'], -item['count']))
+    else:
+        data.sort(key=lambda item: -item['count'])
+    return data
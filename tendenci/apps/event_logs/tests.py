@@ -4,6 +4,10 @@ unittest). These will both pass when you run "manage.py test".
 
 Replace these with more appropriate tests for your application.
 """
+import os
+import shutil
+import tempfile
+
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 
@@ -116,3 +120,274 @@ class EventLogTest(TestCase):
         }
 
         self.assertRaises(Exception, EventLog.objects.log(**event_log_defaults))
+
+
+class EventLogBufferTest(TestCase):
+    def make_event_log(self, n):
+        return EventLog(event_id=n, event_name='', event_type='', event_data='',
+                        user_ip_address='127.0.0.1', uuid='uuid-%s' % n,
+                        application='test', action='test', model_name='')
+
+    def test_flush_on_size(self):
+        from tendenci.apps.event_logs.buffer import EventLogBuffer
+
+        buf = EventLogBuffer(size=3, timeout=60)
+        buf.add(self.make_event_log(1))
+        buf.add(self.make_event_log(2))
+        self.assertEqual(EventLog.objects.filter(application='test').count(), 0)
+
+        buf.add(self.make_event_log(3))
+        self.assertEqual(EventLog.objects.filter(application='test').count(), 3)
+        self.assertEqual(buf.queue, [])
+
+    def test_spool_is_truncated_after_flush(self):
+        from tendenci.apps.event_logs.buffer import EventLogBuffer, deserialize_event_logs
+
+        spool_dir = tempfile.mkdtemp()
+        try:
+            buf = EventLogBuffer(size=10, timeout=60, spool_dir=spool_dir)
+            buf.add(self.make_event_log(1))
+            with open(buf.spool_path) as f:
+                spooled = list(deserialize_event_logs(f))
+            self.assertEqual([e.event_id for e in spooled], [1])
+
+            buf.close()
+            self.assertEqual(EventLog.objects.filter(application='test').count(), 1)
+            self.assertEqual(os.listdir(spool_dir), [])
+        finally:
+            shutil.rmtree(spool_dir)
+
+
+class EventLogAttributionTest(TestCase):
+    def test_view_attribution_from_resolver_match(self):
+        from django.core.urlresolvers import resolve
+        from django.test.client import RequestFactory
+        from tendenci.apps.event_logs.managers import (get_view_attribution,
+                                                        clean_application_name)
+
+        request = RequestFactory().get('/')
+        self.assertEqual(get_view_attribution(request), (None, None))
+
+        request.resolver_match = resolve('/')
+        func = request.resolver_match.func
+        self.assertEqual(get_view_attribution(request),
+                         (clean_application_name(func.__module__), func.__name__))
+
+
+class EventLogSummaryTest(TestCase):
+    def make_event_log(self, application, action):
+        event_log = EventLog(event_id=1, event_name='', event_type='', event_data='',
+                             user_ip_address='127.0.0.1', application=application,
+                             action=action, model_name='')
+        event_log.save()
+        return event_log
+
+    def test_summary_counts_match_raw_counts(self):
+        from datetime import date
+        from tendenci.apps.event_logs.summaries import rollup_event_logs, summary_counts
+
+        self.make_event_log('articles', 'detail')
+        self.make_event_log('articles', 'detail')
+        self.make_event_log('pages', 'index')
+        rollup_event_logs()
+        # one more past the watermark
+        self.make_event_log('articles', 'detail')
+
+        today = date.today()
+        data = summary_counts(today, today, ('application',))
+        self.assertEqual(data, [{'application': 'articles', 'count': 3},
+                                {'application': 'pages', 'count': 1}])
+
+        rollup_event_logs()
+        data = summary_counts(today, today, ('action',), {'application': 'articles'})
+        self.assertEqual(data, [{'action': 'detail', 'count': 3}])
+
+    def test_rollup_leaves_recent_event_logs(self):
+        from datetime import datetime, timedelta
+        from tendenci.apps.event_logs.models import (EventLogDailySummary,
+            EventLogSummaryWatermark)
+        from tendenci.apps.event_logs.summaries import rollup_event_logs, summary_counts
+
+        old_dt = datetime.now() - timedelta(hours=1)
+        old_logs = [self.make_event_log('articles', 'detail') for i in range(2)]
+        EventLog.objects.filter(pk__in=[e.pk for e in old_logs]).update(create_dt=old_dt)
+        self.make_event_log('articles', 'detail')
+        # older than the lag, but past a row that is not
+        late_log = self.make_event_log('pages', 'index')
+        EventLog.objects.filter(pk=late_log.pk).update(create_dt=old_dt)
+
+        self.assertEqual(rollup_event_logs(lag=timedelta(minutes=15)), 2)
+        self.assertEqual(EventLogSummaryWatermark.get_last_id(), old_logs[-1].pk)
+        self.assertEqual(sum(EventLogDailySummary.objects.values_list('count', flat=True)), 2)
+
+        data = summary_counts(old_dt.date(), datetime.now().date(), ('application',))
+        self.assertEqual(data, [{'application': 'articles', 'count': 3},
+                                {'application': 'pages', 'count': 1}])
+
+    def test_rollup_does_not_count_twice(self):
+        from datetime import date, timedelta
+        from tendenci.apps.event_logs.models import EventLogDailySummary
+        from tendenci.apps.event_logs.summaries import rollup_event_logs, summary_counts
+
+        for i in range(5):
+            self.make_event_log('articles', 'detail')
+        self.assertEqual(rollup_event_logs(chunk_size=2, lag=timedelta(0)), 5)
+        self.assertEqual(rollup_event_logs(chunk_size=2, lag=timedelta(0)), 0)
+        self.assertEqual(EventLogDailySummary.objects.get().count, 5)
+
+        today = date.today()
+        self.assertEqual(summary_counts(today, today, ('application',)),
+                         [{'application': 'articles', 'count': 5}])
+
+
+class EventLogReportTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from tendenci.apps.event_logs.summaries import rollup_event_logs
+
+        for application, action, source in (('articles', 'detail', 'articles'),
+                                            ('articles', 'detail', 'articles'),
+                                            ('pages', 'index', 'pages')):
+            EventLog(event_id=1, event_name='', event_type='', event_data='',
+                     user_ip_address='127.0.0.1', application=application,
+                     action=action, source=source, model_name='').save()
+        rollup_event_logs(lag=timedelta(0))
+        EventLog(event_id=1, event_name='', event_type='', event_data='',
+                 user_ip_address='127.0.0.2', application='articles',
+                 action='detail', source='articles', model_name='').save()
+
+        User.objects.create_superuser('tester', 'test@test.com', 'test')
+        self.client = Client()
+        self.assertTrue(self.client.login(username='tester', password='test'))
+
+    def get_summary(self, response):
+        """
+        Returns the (values, count) of the report summary rows.
+        """
+        summary_data = response.context['summary_data']
+        if isinstance(summary_data, tuple):  # split in columns
+            summary_data = [item for column in summary_data for item in column]
+        fields = ('application', 'source', 'action', 'event_id', 'description')
+        return sorted((tuple(item[f] for f in fields if f in item), item['count'])
+                      for item in summary_data)
+
+    def test_summary_reports(self):
+        from django.core.urlresolvers import reverse
+
+        response = self.client.get(reverse('reports-events-summary'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_summary(response),
+                         [(('articles',), 3), (('pages',), 1)])
+
+        response = self.client.get(reverse('reports-events-summary-historical'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_summary(response),
+                         [(('articles',), 3), (('pages',), 1)])
+
+        response = self.client.get(reverse('reports-events-application', args=['articles']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_summary(response), [(('detail', None), 3)])
+
+        response = self.client.get(reverse('reports-events-source', args=['pages']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_summary(response), [((1, None), 1)])
+
+    def test_raw_report_with_ip_filter(self):
+        from django.core.urlresolvers import reverse
+
+        response = self.client.get(reverse('reports-events-summary'),
+                                   {'ip': '127.0.0.2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_summary(response), [(('articles',), 1)])
+
+
+class EventLogArchiveTest(TestCase):
+    def setUp(self):
+        from django.core.files.storage import FileSystemStorage
+        from tendenci.apps.event_logs import archive
+
+        self.media_root = tempfile.mkdtemp()
+        # default_storage keeps the MEDIA_ROOT it was created with
+        self.storage = archive.storage
+        archive.storage = FileSystemStorage(location=self.media_root)
+
+    def tearDown(self):
+        from tendenci.apps.event_logs import archive
+
+        archive.storage = self.storage
+        shutil.rmtree(self.media_root)
+
+    def create_event_log(self, create_dt, application='articles'):
+        event_log = EventLog(event_id=1, event_name='', event_type='', event_data='',
+                             user_ip_address='127.0.0.1', application=application,
+                             action='detail', model_name='')
+        event_log.save()
+        EventLog.objects.filter(pk=event_log.pk).update(create_dt=create_dt)
+        return event_log
+
+    def test_archive_and_search(self):
+        from datetime import datetime, timedelta
+        from tendenci.apps.event_logs.archive import (archive_event_logs,
+            search_archive, get_archived_event_log, INDEX_PATH)
+
+        old_dt = datetime.now() - timedelta(days=400)
+        event_log = self.create_event_log(old_dt)
+
+        self.assertEqual(archive_event_logs(365), 1)
+        self.assertFalse(EventLog.objects.filter(pk=event_log.pk).exists())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, INDEX_PATH)))
+
+        archived = search_archive(old_dt - timedelta(days=1), old_dt + timedelta(days=1))
+        self.assertEqual([e.pk for e in archived], [event_log.pk])
+        self.assertEqual(get_archived_event_log(event_log.pk).application, 'articles')
+
+    def test_rows_past_the_cutoff_in_the_id_range_are_kept(self):
+        from datetime import datetime, timedelta
+        from tendenci.apps.event_logs.archive import archive_event_logs, month_range, search_archive
+
+        cutoff = datetime.now() - timedelta(days=400)
+        start, end = month_range(cutoff.strftime('%Y-%m'))
+        old_dt = cutoff - (cutoff - start) / 2
+        recent_dt = cutoff + (end - cutoff) / 2
+
+        # ids don't follow create_dt: the middle row was created after
+        # the cutoff, the last one is an old row inserted late
+        first = self.create_event_log(old_dt)
+        recent = self.create_event_log(recent_dt)
+        late = self.create_event_log(old_dt)
+
+        self.assertEqual(archive_event_logs(400), 2)
+        self.assertEqual(list(EventLog.objects.values_list('pk', flat=True)), [recent.pk])
+        archived = search_archive(start, end)
+        self.assertEqual(sorted(e.pk for e in archived), [first.pk, late.pk])
+
+        # the next run deletes the archived rows again, and only them
+        self.assertEqual(archive_event_logs(400), 0)
+        self.assertEqual(list(EventLog.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_search_reads_only_the_segments_in_range(self):
+        from datetime import datetime, timedelta
+        from tendenci.apps.event_logs import archive
+
+        old_dt = datetime.now() - timedelta(days=500)
+        older_dt = old_dt - timedelta(days=60)
+        event_logs = [self.create_event_log(dt) for dt in
+                      (older_dt, old_dt - timedelta(hours=2), old_dt)]
+        # one segment per row
+        self.assertEqual(archive.archive_event_logs(365, segment_size=1), 3)
+
+        read = []
+        read_segment = archive.read_segment
+
+        def counting_read_segment(segment):
+            read.append(segment['path'])
+            return read_segment(segment)
+
+        archive.read_segment = counting_read_segment
+        try:
+            archived = archive.search_archive(old_dt - timedelta(hours=1),
+                                              old_dt + timedelta(hours=1))
+        finally:
+            archive.read_segment = read_segment
+        self.assertEqual([e.pk for e in archived], [event_logs[2].pk])
+        self.assertEqual(len(read), 1)
@@ -6,7 +6,7 @@ from PIL import Image
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render_to_response, get_object_or_404
 from django.template import RequestContext
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, Http404
 from django.core.urlresolvers import reverse
 from django.conf import settings
 from django.db.models import Count
@@ -22,12 +22,21 @@ from tendenci.apps.event_logs.utils import day_bars, month_days,\
 from tendenci.apps.event_logs.models import EventLog, EventLogBaseColor, EventLogColor
 from tendenci.apps.event_logs.forms import EventLogSearchForm, EventsFilterForm
 from tendenci.apps.event_logs.colors import non_model_event_logs, get_color
+from tendenci.apps.event_logs.summaries import (can_use_summaries, summary_counts,
+    parse_day)
+from tendenci.apps.event_logs.archive import get_archived_event_log
 
 
 def index(request, id=None, template_name="event_logs/view.html"):
     if not id:
         return HttpResponseRedirect(reverse('event_log.search'))
-    event_log = get_object_or_404(EventLog, pk=id)
+    try:
+        event_log = EventLog.objects.get(pk=id)
+    except EventLog.DoesNotExist:
+        # it may have been moved to the archive
+        event_log = get_archived_event_log(int(id))
+        if not event_log:
+            raise Http404
 
     if has_perm(request.user, 'event_logs.view_eventlog'):
         return render_to_response(template_name, {'event_log': event_log},
@@ -156,28 +165,51 @@ def action_colors(data):
         item['color'] = get_color(str(item['action']))
 
 
-@superuser_required
-def event_summary_report(request):
-    queryset = EventLog.objects.all()
+def report_data(request, filters, chart_field, summary_fields):
+    """
+    Returns the date range, filter form, per-day chart data and summary
+    data of an event log report.
+
+    The counts come from the daily roll-ups unless the form filters on
+    something they don't keep (ip, user or session).
+    """
     form = EventsFilterForm(request.GET)
+    from_date, to_date = request_month_range(request)
+
+    if can_use_summaries(form):
+        if form.is_valid() and form.cleaned_data['event_id']:
+            filters = dict(filters, event_id=form.cleaned_data['event_id'])
+        chart_data = summary_counts(from_date, to_date, (chart_field,),
+                                    filters, by_day=True)
+        summary_data = summary_counts(from_date, to_date, summary_fields, filters)
+        return form, from_date, to_date, chart_data, summary_data
+
+    queryset = EventLog.objects.filter(**filters)
     if form.is_valid():
         queryset = form.process_filter(queryset)
 
-    from_date, to_date = request_month_range(request)
     next_day = to_date+timedelta(days=1)
-    queryset = queryset.filter(create_dt__gte=from_date, create_dt__lte=next_day)
+    queryset = queryset.filter(create_dt__gte=from_date, create_dt__lt=next_day)
 
     chart_data = queryset\
                 .extra(select={'day': 'DATE(create_dt)'})\
-                .values('day', 'application')\
+                .values('day', chart_field)\
                 .annotate(count=Count('pk'))\
                 .order_by('day', '-count')
-    chart_data = day_bars(chart_data, from_date.year, from_date.month, 300, application_colors)
+    chart_data = [dict(row, day=parse_day(row['day'])) for row in chart_data]
 
     summary_data = queryset\
-                .values('application')\
+                .values(*summary_fields)\
                 .annotate(count=Count('pk'))\
                 .order_by('-count')
+    return form, from_date, to_date, chart_data, summary_data
+
+
+@superuser_required
+def event_summary_report(request):
+    form, from_date, to_date, chart_data, summary_data = report_data(
+        request, {}, 'application', ('application',))
+    chart_data = day_bars(chart_data, from_date.year, from_date.month, 300, application_colors)
     application_colors(summary_data)
 
     m = 1+len(summary_data)/3
@@ -193,26 +225,9 @@ def event_summary_report(request):
 
 @superuser_required
 def event_application_summary_report(request, application):
-    queryset = EventLog.objects.filter(application=application)
-    form = EventsFilterForm(request.GET)
-    if form.is_valid():
-        queryset = form.process_filter(queryset)
-
-    from_date, to_date = request_month_range(request)
-    next_day = to_date+timedelta(days=1)
-    queryset = queryset.filter(create_dt__gte=from_date, create_dt__lte=next_day)
-
-    chart_data = queryset\
-                .extra(select={'day': 'DATE(create_dt)'})\
-                .values('day', 'action')\
-                .annotate(count=Count('pk'))\
-                .order_by('day', '-count')
+    form, from_date, to_date, chart_data, summary_data = report_data(
+        request, {'application': application}, 'action', ('action', 'description'))
     chart_data = day_bars(chart_data, from_date.year, from_date.month, 300, action_colors)
-
-    summary_data = queryset\
-                .values('action', 'description')\
-                .annotate(count=Count('pk'))\
-                .order_by('-count')
     action_colors(summary_data)
 
     return render_to_response(
@@ -228,26 +243,9 @@ def event_summary_historical_report(request):
     """
     This report queries based on source for historical reporting purposes
     """
-    queryset = EventLog.objects.all()
-    form = EventsFilterForm(request.GET)
-    if form.is_valid():
-        queryset = form.process_filter(queryset)
-
-    from_date, to_date = request_month_range(request)
-    next_day = to_date+timedelta(days=1)
-    queryset = queryset.filter(create_dt__gte=from_date, create_dt__lte=next_day)
-
-    chart_data = queryset\
-                .extra(select={'day': 'DATE(create_dt)'})\
-                .values('day', 'source')\
-                .annotate(count=Count('pk'))\
-                .order_by('day', '-count')
+    form, from_date, to_date, chart_data, summary_data = report_data(
+        request, {}, 'source', ('source',))
     chart_data = day_bars(chart_data, from_date.year, from_date.month, 300, source_colors)
-
-    summary_data = queryset\
-                .values('source')\
-                .annotate(count=Count('pk'))\
-                .order_by('-count')
     source_colors(summary_data)
 
     m = 1+len(summary_data)/3
@@ -263,26 +261,9 @@ def event_summary_historical_report(request):
 
 @superuser_required
 def event_source_summary_report(request, source):
-    queryset = EventLog.objects.filter(source=source)
-    form = EventsFilterForm(request.GET)
-    if form.is_valid():
-        queryset = form.process_filter(queryset)
-
-    from_date, to_date = request_month_range(request)
-    next_day = to_date+timedelta(days=1)
-    queryset = queryset.filter(create_dt__gte=from_date, create_dt__lte=next_day)
-
-    chart_data = queryset\
-                .extra(select={'day': 'DATE(create_dt)'})\
-                .values('day', 'event_id')\
-                .annotate(count=Count('pk'))\
-                .order_by('day', '-count')
+    form, from_date, to_date, chart_data, summary_data = report_data(
+        request, {'source': source}, 'event_id', ('event_id', 'description'))
     chart_data = day_bars(chart_data, from_date.year, from_date.month, 300, event_colors)
-
-    summary_data = queryset\
-                .values('event_id', 'description')\
-                .annotate(count=Count('pk'))\
-                .order_by('-count')
     event_colors(summary_data)
 
     return render_to_response(
@@ -1,4 +1,3 @@
-import random
 from datetime import datetime, timedelta
 from operator import or_
 
@@ -12,7 +11,8 @@ from tendenci.apps.events.models import Event, Registrant, Type
 from tendenci.apps.events.utils import (registration_earliest_time,
                                         registration_has_started,
                                         registration_has_ended,)
-from tendenci.apps.base.template_tags import ListNode, parse_tag_kwargs
+from tendenci.apps.base.template_tags import (ListNode, parse_tag_kwargs,
+    get_list_cache_key, get_list_objects)
 from tendenci.apps.perms.utils import get_query_filters
 from tendenci.apps.events.forms import EventSimpleSearchForm
 
@@ -433,10 +433,9 @@ class ListEventsNode(ListNode):
             else:
                 items = items.order_by(order)
 
-        if randomize:
-            objects = [item for item in random.sample(items, items.count())][:limit]
-        else:
-            objects = [item for item in items[:limit]]
+        key = get_list_cache_key(self.model, user, self.__class__.__name__, tags, limit,
+                                 order, event_type, group, start_dt, randomize)
+        objects = get_list_objects(self.model, items, limit, randomize, key)
 
         context[self.context_var] = objects
         return ""
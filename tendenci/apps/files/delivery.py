@@ -0,0 +1,202 @@
+"""
+Sends the content of a File without reading it in memory.
+
+Local files are streamed in chunks, or handed to the front-end server
+with settings.FILES_SENDFILE:
+
+    FILES_SENDFILE = 'x-sendfile'        # apache mod_xsendfile, lighttpd
+    FILES_SENDFILE = 'x-accel-redirect'  # nginx, MEDIA_ROOT is served
+    FILES_SENDFILE_URL = '/protected/'   # at this internal location
+
+Files on S3 (USE_S3_STORAGE) are streamed from the GET of their key.
+
+Both honor If-None-Match, If-Modified-Since and a single bytes Range
+(with If-Range).
+"""
+import os
+
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse)
+from django.utils.http import (
+    http_date, parse_etags, parse_http_date_safe, quote_etag, urlquote)
+from django.views.static import was_modified_since
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Returns the first and last byte of the range in a Range header,
+    or None if there is no header or it isn't a single bytes range.
+    Raises RangeNotSatisfiable if the range is past the end of the file.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    start, sep, end = header[len('bytes='):].strip().partition('-')
+    if not sep or not (start + end).isdigit():
+        return None
+
+    if start:
+        start = int(start)
+        if end and int(end) < start:
+            return None
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # suffix range: the last bytes of the file
+        if not int(end):
+            raise RangeNotSatisfiable
+        start, end = max(size - int(end), 0), size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def range_applies(request, etag, last_modified):
+    """
+    If-Range: the Range only applies if the file didn't change.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == quote_etag(etag)
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since and last_modified is not None:
+        return not was_modified_since(if_modified_since, last_modified)
+    return False
+
+
+def iter_chunks(f, length):
+    """
+    Yields length bytes of f in chunks and closes it.
+    """
+    try:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def get_local_file(file):
+    """
+    Returns the path, size, ETag and modification time of a local file.
+    """
+    try:
+        path = file.file.path
+        stat = os.stat(path)
+    except (OSError, ValueError):  # no such file or directory
+        raise Http404
+    etag = '%x-%x' % (int(stat.st_mtime), stat.st_size)
+    return path, stat.st_size, etag, int(stat.st_mtime)
+
+
+def get_s3_key(field_file):
+    """
+    Returns the boto key of a file on S3, with its size, ETag and
+    modification time (from a HEAD request).
+    """
+    from tendenci.libs.boto_s3.utils import get_bucket
+
+    key = get_bucket().get_key('%s/%s' % (settings.DEFAULT_S3_PATH, field_file.name))
+    if key is None:
+        raise Http404
+    return key, key.size, key.etag.strip('"'), parse_http_date_safe(key.last_modified)
+
+
+def stat_file(file):
+    """
+    Returns the local path or the S3 key of file, with its size, ETag
+    and modification time. Raises Http404 if the file is missing.
+    """
+    if settings.USE_S3_STORAGE:
+        return get_s3_key(file.file)
+    return get_local_file(file)
+
+
+def get_sendfile_headers(path):
+    """
+    Returns the headers handing path to the front-end server,
+    or None if files are streamed by django.
+    """
+    if settings.FILES_SENDFILE == 'x-sendfile':
+        return {'X-Sendfile': path}
+    if settings.FILES_SENDFILE == 'x-accel-redirect':
+        media_root = os.path.join(os.path.abspath(settings.MEDIA_ROOT), '')
+        path = os.path.abspath(path)
+        if path.startswith(media_root):
+            url = settings.FILES_SENDFILE_URL + path[len(media_root):]
+            return {'X-Accel-Redirect': urlquote(url)}
+    return None
+
+
+def serve_file(request, file, content_type, stat=None):
+    """
+    Returns the response with the content of file. stat is the
+    result of stat_file(file), if the caller already has it.
+    """
+    source, size, etag, last_modified = stat or stat_file(file)
+
+    if is_not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+        response['ETag'] = quote_etag(etag)
+        return response
+
+    if not settings.USE_S3_STORAGE:
+        headers = get_sendfile_headers(source)
+        if headers:
+            # the front-end server handles the Range
+            response = HttpResponse(content_type=content_type)
+            for header, value in headers.items():
+                response[header] = value
+            response['ETag'] = quote_etag(etag)
+            response['Last-Modified'] = http_date(last_modified)
+            return response
+
+    byte_range = None
+    if range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+
+    if settings.USE_S3_STORAGE:
+        headers = {'Range': 'bytes=%d-%d' % (start, end)} if byte_range else None
+        if length > 0:
+            source.open_read(headers=headers)
+        f = source
+    else:
+        f = open(source, 'rb')
+        f.seek(start)
+
+    response = StreamingHttpResponse(iter_chunks(f, length), content_type=content_type)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,262 @@
+"""
+Resized images (derivatives) of the files and photos.
+
+A derivative is built once: the original is decoded at the smallest
+scale still larger than the derivative (JPEG draft mode, then
+Image.reduce where Pillow has it), resized and encoded. The bytes are
+stored in IMAGE_DERIVATIVES_DIR, named after a hash of the content of
+the original and of the resize parameters, and the responses are
+made of them.
+
+The least recently used derivatives are removed when the directory
+grows past IMAGE_DERIVATIVES_MAX_SIZE bytes.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from cStringIO import StringIO
+
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.encoding import force_bytes
+
+from tendenci.apps.base.utils import image_rescale
+from tendenci.apps.files.utils import validate_image_size
+from tendenci.libs.boto_s3.utils import read_media_file_from_s3
+
+# seconds the hash of an original is kept, it is recomputed
+# anyway when the file is modified
+HASH_TIMEOUT = 60 * 60 * 24 * 30
+
+# a derivative is marked as used at most once per TOUCH_INTERVAL seconds
+TOUCH_INTERVAL = 60 * 60
+
+# min seconds between two scans of the directory for eviction
+EVICT_INTERVAL = 60 * 5
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_source_hash_key(name, *stamps):
+    return '.'.join([settings.CACHE_PRE_KEY, 'image_source_hash',
+                     hashlib.md5(force_bytes(name)).hexdigest()] + [str(s) for s in stamps])
+
+
+def get_source_hash(field_file):
+    """
+    Returns a hash of the content of an original image: the ETag of
+    the file on S3, or the sha1 of a local file, computed once per
+    modification of it.
+
+    On S3 the modification is taken from the update_dt of the object
+    of the file, which changes whenever the file is replaced through
+    it, so that the ETag doesn't cost a HEAD request on every view.
+    """
+    if settings.USE_S3_STORAGE:
+        from tendenci.apps.files.delivery import get_s3_key
+
+        update_dt = getattr(field_file.instance, 'update_dt', None)
+        key = get_source_hash_key(field_file.name, update_dt.isoformat() if update_dt else '')
+        source_hash = cache.get(key)
+        if source_hash is None:
+            source_hash = get_s3_key(field_file)[2]
+            cache.set(key, source_hash, HASH_TIMEOUT)
+        return source_hash
+
+    try:
+        path = field_file.path
+        stat = os.stat(path)
+    except (OSError, ValueError):  # no such file or directory
+        raise Http404
+
+    key = get_source_hash_key(path, int(stat.st_mtime), stat.st_size)
+    source_hash = cache.get(key)
+    if source_hash is None:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                sha1.update(chunk)
+        source_hash = sha1.hexdigest()
+        cache.set(key, source_hash, HASH_TIMEOUT)
+    return source_hash
+
+
+def get_derivative_path(source_hash, size, crop, quality, format):
+    name = hashlib.sha1(force_bytes('%s.%sx%s.%s.%s.%s' % (
+        source_hash, size[0], size[1], int(bool(crop)), quality, format or ''))).hexdigest()
+    return os.path.join(settings.IMAGE_DERIVATIVES_DIR, name[:2], name)
+
+
+def open_image(field_file, size):
+    """
+    Opens an original image to be resized to size. A JPEG is decoded
+    at 1/2, 1/4 or 1/8 of its size when that is still larger than size.
+    """
+    if settings.USE_S3_STORAGE:
+        image = Image.open(StringIO(read_media_file_from_s3(field_file)))
+    else:
+        image = Image.open(field_file.path)
+
+    if image.format == 'JPEG':
+        format = image.format
+        image.draft('RGB', size)
+        image.format = format
+    return image
+
+
+def reduce_image(image, size):
+    """
+    Shrinks image by an integer factor while it stays at least twice
+    size, which is much faster than resizing it from the full size.
+    Needs Pillow 7, older versions return image as is.
+    """
+    factor = min(image.size[0] // size[0], image.size[1] // size[1]) // 2
+    if factor < 2 or not hasattr(image, 'reduce'):
+        return image
+    format = image.format
+    image = image.reduce(factor)
+    image.format = format
+    return image
+
+
+def build_derivative(field_file, size, crop=False, quality=90, format=None):
+    """
+    Returns the binary of the original image of field_file resized to
+    size, encoded as format (defaults to the format of the original).
+    """
+    image = open_image(field_file, size)
+    format = format or image.format or 'JPEG'
+
+    if format in ('GIF', 'PNG'):
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+    elif format == 'JPEG':
+        # handle infamous error
+        # IOError: cannot write mode P as JPEG
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+    image = reduce_image(image, size)
+    if crop:
+        image = image_rescale(image, size)  # thumbnail image
+    else:
+        image = image.resize(size, Image.ANTIALIAS)
+
+    options = {'quality': quality}
+    if format == 'GIF':
+        options['transparency'] = 0
+
+    output = StringIO()
+    image.save(output, format, **options)
+    return output.getvalue()
+
+
+def write_derivative(path, binary):
+    """
+    Writes path through a temporary file, so that readers never
+    see a partial derivative.
+    """
+    dirname = os.path.dirname(path)
+    if not os.path.isdir(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            pass
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(binary)
+        os.rename(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
+
+
+def evict(max_size=None):
+    """
+    Removes the least recently used derivatives until they take less
+    than max_size (IMAGE_DERIVATIVES_MAX_SIZE) bytes.
+    Returns the number of derivatives removed.
+    """
+    if max_size is None:
+        max_size = settings.IMAGE_DERIVATIVES_MAX_SIZE
+
+    derivatives = []
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(settings.IMAGE_DERIVATIVES_DIR):
+        for name in filenames:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            derivatives.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    derivatives.sort()
+    removed = 0
+    for mtime, size, path in derivatives:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def evict_if_due():
+    """
+    Runs evict(), at most once per EVICT_INTERVAL seconds.
+    """
+    marker = os.path.join(settings.IMAGE_DERIVATIVES_DIR, '.evicted')
+    try:
+        if time.time() - os.path.getmtime(marker) < EVICT_INTERVAL:
+            return
+    except OSError:
+        pass
+    open(marker, 'a').close()
+    os.utime(marker, None)
+    evict()
+
+
+def get_derivative(field_file, size, crop=False, quality=90, format=None):
+    """
+    Returns the binary of the original image of field_file resized to
+    size, from IMAGE_DERIVATIVES_DIR or built and stored there.
+    Raises Http404 if the original doesn't exist, IOError if it
+    isn't an image.
+    """
+    size = validate_image_size(size)  # make sure it's not too big
+    try:
+        quality = int(quality)
+    except (TypeError, ValueError):
+        quality = 90
+
+    path = get_derivative_path(get_source_hash(field_file), size, crop, quality, format)
+    try:
+        with open(path, 'rb') as f:
+            binary = f.read()
+    except IOError:
+        binary = None
+
+    if binary is not None:
+        try:
+            # the mtime is the last use, for the eviction
+            if time.time() - os.path.getmtime(path) > TOUCH_INTERVAL:
+                os.utime(path, None)
+        except OSError:
+            pass
+        return binary
+
+    binary = build_derivative(field_file, size, crop=crop, quality=quality, format=format)
+    write_derivative(path, binary)
+    evict_if_due()
+    return binary
@@ -0,0 +1,282 @@
+import os
+import shutil
+import tempfile
+from cStringIO import StringIO
+
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from django.utils.http import http_date
+
+from tendenci.apps.files.delivery import (
+    RangeNotSatisfiable, get_sendfile_headers, parse_range, serve_file)
+from tendenci.apps.files.models import File
+
+
+class ParseRangeTest(TestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        # past the end of the file the range is cut
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 99))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-200', 100), (0, 99))
+
+    def test_range_past_the_end(self):
+        self.assertRaises(RangeNotSatisfiable, parse_range, 'bytes=100-', 100)
+        self.assertRaises(RangeNotSatisfiable, parse_range, 'bytes=-0', 100)
+
+    def test_ignored_ranges(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('items=0-9', 100))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+        self.assertIsNone(parse_range('bytes=9-0', 100))
+        self.assertIsNone(parse_range('bytes=a-b', 100))
+
+
+class ServeFileTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root, USE_S3_STORAGE=False,
+                                          FILES_SENDFILE=None)
+        self.override.enable()
+
+        os.makedirs(os.path.join(self.media_root, 'files'))
+        self.path = os.path.join(self.media_root, 'files', 'test file.txt')
+        with open(self.path, 'wb') as f:
+            f.write('0123456789')
+        os.utime(self.path, (1500000000, 1500000000))
+        self.file = File.objects.create(file='files/test file.txt')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def serve(self, **headers):
+        request = RequestFactory().get('/', **headers)
+        response = serve_file(request, self.file, 'text/plain')
+        content = ''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def test_whole_file(self):
+        response, content = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, '0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Last-Modified'], http_date(1500000000))
+
+    def test_range(self):
+        response, content = self.serve(HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, '2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response, content = self.serve(HTTP_RANGE='bytes=-3')
+        self.assertEqual(content, '789')
+
+    def test_range_past_the_end(self):
+        response, content = self.serve(HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_if_range(self):
+        etag = self.serve()[0]['ETag']
+
+        response, content = self.serve(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response, content = self.serve(HTTP_RANGE='bytes=2-5',
+                                       HTTP_IF_RANGE=http_date(1500000000))
+        self.assertEqual(response.status_code, 206)
+
+        # the file changed: the whole file is sent
+        response, content = self.serve(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, '0123456789')
+
+    def test_not_modified(self):
+        etag = self.serve()[0]['ETag']
+
+        response, content = self.serve(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH='"other"')[0].status_code, 200)
+
+        response, content = self.serve(HTTP_IF_MODIFIED_SINCE=http_date(1500000000))
+        self.assertEqual(response.status_code, 304)
+        response, content = self.serve(HTTP_IF_MODIFIED_SINCE=http_date(1400000000))
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_file(self):
+        os.remove(self.path)
+        self.assertRaises(Http404, self.serve)
+
+    def test_x_accel_redirect(self):
+        with override_settings(FILES_SENDFILE='x-accel-redirect',
+                               FILES_SENDFILE_URL='/protected/'):
+            response, content = self.serve(HTTP_RANGE='bytes=2-5')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(content, '')
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/files/test%20file.txt')
+
+            # only the files in MEDIA_ROOT are mapped
+            self.assertIsNone(get_sendfile_headers(os.path.join(tempfile.gettempdir(), 'x.txt')))
+
+    def test_x_sendfile(self):
+        with override_settings(FILES_SENDFILE='x-sendfile'):
+            response, content = self.serve()
+            self.assertEqual(response['X-Sendfile'], self.path)
+
+    def test_missing_public_file_is_not_cached(self):
+        from tendenci.apps.files.cache import FILE_IMAGE_PRE_KEY
+        from tendenci.apps.files.utils import generate_image_cache_key
+        from tendenci.apps.site_settings.models import Setting
+
+        Setting.objects.create(name='enabled', label='Enabled', description='',
+                               data_type='boolean', value='true', input_type='select',
+                               scope='module', scope_category='files')
+        cache.clear()
+        os.remove(self.path)
+        response = self.client.get('/files/%s/' % self.file.pk)
+        self.assertEqual(response.status_code, 404)
+
+        cache_key = generate_image_cache_key(
+            file=str(self.file.pk), size=None, pre_key=FILE_IMAGE_PRE_KEY, crop=False,
+            unique_key=str(self.file.pk), quality=90, constrain=False)
+        self.assertIsNone(cache.get(cache_key))
+
+
+class DerivativeTest(TestCase):
+    def setUp(self):
+        from PIL import Image
+
+        self.media_root = tempfile.mkdtemp()
+        self.derivatives_dir = os.path.join(self.media_root, 'derivatives')
+        self.override = override_settings(MEDIA_ROOT=self.media_root, USE_S3_STORAGE=False,
+                                          IMAGE_DERIVATIVES_DIR=self.derivatives_dir)
+        self.override.enable()
+        cache.clear()
+
+        os.makedirs(os.path.join(self.media_root, 'files'))
+        self.path = os.path.join(self.media_root, 'files', 'photo.jpg')
+        Image.new('RGB', (800, 600), (200, 20, 20)).save(self.path, 'JPEG')
+        self.file = File.objects.create(file='files/photo.jpg')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_derivative_key(self):
+        from tendenci.apps.files.derivatives import get_derivative_path, get_source_hash
+
+        source_hash = get_source_hash(self.file.file)
+        path = get_derivative_path(source_hash, (100, 75), False, 90, None)
+        self.assertEqual(get_derivative_path(source_hash, (100, 75), False, 90, None), path)
+        self.assertTrue(path.startswith(self.derivatives_dir))
+        for args in [((100, 76), False, 90, None), ((100, 75), True, 90, None),
+                     ((100, 75), False, 80, None), ((100, 75), False, 90, 'PNG')]:
+            self.assertNotEqual(get_derivative_path(source_hash, *args), path)
+
+        # a new content of the original gives new derivatives
+        with open(self.path, 'ab') as f:
+            f.write('\0')
+        self.assertNotEqual(get_source_hash(self.file.file), source_hash)
+
+    def test_source_hash_is_kept_until_the_file_changes(self):
+        from tendenci.apps.files.derivatives import get_source_hash
+
+        source_hash = get_source_hash(self.file.file)
+        stat = os.stat(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(stat.st_size - 1)
+            f.write('\1')
+        os.utime(self.path, (stat.st_mtime, stat.st_mtime))
+        self.assertEqual(get_source_hash(self.file.file), source_hash)
+
+        os.utime(self.path, (stat.st_mtime + 10, stat.st_mtime + 10))
+        self.assertNotEqual(get_source_hash(self.file.file), source_hash)
+
+    def test_s3_etag_is_cached(self):
+        from tendenci.apps.files import delivery
+        from tendenci.apps.files.derivatives import get_source_hash
+
+        heads = []
+
+        def get_s3_key(field_file):
+            heads.append(field_file.name)
+            return None, 10, 'etag%s' % len(heads), None
+
+        original_get_s3_key = delivery.get_s3_key
+        delivery.get_s3_key = get_s3_key
+        try:
+            with override_settings(USE_S3_STORAGE=True):
+                self.assertEqual(get_source_hash(self.file.file), 'etag1')
+                self.assertEqual(get_source_hash(self.file.file), 'etag1')
+                self.assertEqual(len(heads), 1)
+
+            # replacing the file through its object updates update_dt
+            self.file.save()
+            with override_settings(USE_S3_STORAGE=True):
+                self.assertEqual(get_source_hash(self.file.file), 'etag2')
+                self.assertEqual(len(heads), 2)
+        finally:
+            delivery.get_s3_key = original_get_s3_key
+
+    def test_stored_derivative_is_reused(self):
+        from PIL import Image
+        from tendenci.apps.files.derivatives import (
+            get_derivative, get_derivative_path, get_source_hash)
+
+        binary = get_derivative(self.file.file, (100, 75))
+        self.assertEqual(Image.open(StringIO(binary)).size, (100, 75))
+
+        path = get_derivative_path(get_source_hash(self.file.file), (100, 75), False, 90, None)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), binary)
+
+        with open(path, 'wb') as f:
+            f.write('stored')
+        self.assertEqual(get_derivative(self.file.file, (100, 75)), 'stored')
+
+    def test_evict_removes_least_recently_used(self):
+        from tendenci.apps.files.derivatives import evict
+
+        paths = []
+        for i, name in enumerate(['newest', 'oldest', 'middle']):
+            path = os.path.join(self.derivatives_dir, name[:2], name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as f:
+                f.write('0123456789')
+            paths.append(path)
+        os.utime(paths[0], (1500000300, 1500000300))
+        os.utime(paths[1], (1500000100, 1500000100))
+        os.utime(paths[2], (1500000200, 1500000200))
+        open(os.path.join(self.derivatives_dir, '.evicted'), 'w').close()
+
+        self.assertEqual(evict(max_size=30), 0)
+        self.assertEqual(evict(max_size=20), 1)
+        self.assertEqual([os.path.exists(path) for path in paths], [True, False, True])
+        self.assertEqual(evict(max_size=10), 1)
+        self.assertEqual([os.path.exists(path) for path in paths], [True, False, False])
+        self.assertTrue(os.path.exists(os.path.join(self.derivatives_dir, '.evicted')))
+
+    def test_draft_decoding_covers_the_size(self):
+        from tendenci.apps.files.derivatives import build_derivative, open_image
+        from PIL import Image
+
+        for size in [(100, 75), (300, 200), (790, 590)]:
+            image = open_image(self.file.file, size)
+            self.assertTrue(image.size[0] >= size[0] and image.size[1] >= size[1])
+            self.assertEqual(image.format, 'JPEG')
+            binary = build_derivative(self.file.file, size)
+            self.assertEqual(Image.open(StringIO(binary)).size, size)
+
+        # decoded at 1/8 of the original size
+        self.assertEqual(open_image(self.file.file, (100, 75)).size, (100, 75))
+        self.assertEqual(open_image(self.file.file, (790, 590)).size, (800, 600))
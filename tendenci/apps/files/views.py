@@ -40,8 +40,10 @@ from tendenci.apps.categories.models import Category
 from tendenci.apps.event_logs.models import EventLog
 from tendenci.apps.theme.shortcuts import themed_response as render_to_response
 from tendenci.apps.files.cache import FILE_IMAGE_PRE_KEY
+from tendenci.apps.files.delivery import serve_file, stat_file
+from tendenci.apps.files.derivatives import get_derivative
 from tendenci.apps.files.models import File, FilesCategory
-from tendenci.apps.files.utils import get_image, aspect_ratio, generate_image_cache_key, get_max_file_upload_size, get_allowed_upload_file_exts
+from tendenci.apps.files.utils import aspect_ratio, generate_image_cache_key, get_max_file_upload_size, get_allowed_upload_file_exts
 from tendenci.apps.files.forms import FileForm, MostViewedForm, FileSearchForm, FileSearchMinForm, TinymceUploadForm
 
 
@@ -82,13 +84,6 @@ def details(request, id, size=None, crop=False, quality=90, download=False, cons
     if isinstance(quality, basestring) and quality.isdigit():
         quality = int(quality)
 
-    # get image binary
-    try:
-        data = file.file.read()
-        file.file.close()
-    except IOError:  # no such file or directory
-        raise Http404
-
     if download:  # log download
         attachment = u'attachment;'
         EventLog.objects.log(**{
@@ -125,22 +120,19 @@ def details(request, id, size=None, crop=False, quality=90, download=False, cons
         if not all(size):
             raise Http404
 
-        # gets resized image from cache or rebuilds
-        image = get_image(file.file, size, FILE_IMAGE_PRE_KEY, cache=True, crop=crop, quality=quality, unique_key=None)
-        response = HttpResponse(content_type=file.mime_type())
+        # gets the resized image from the derivatives or builds it
+        try:
+            binary = get_derivative(file.file, size, crop=crop, quality=quality)
+        except IOError:  # not an image
+            raise Http404
+        response = HttpResponse(binary, content_type=file.mime_type())
         response['Content-Disposition'] = '%s filename="%s"' % (attachment, file.get_name())
 
-        params = {'quality': quality}
-        if image.format == 'GIF':
-            params['transparency'] = 0
-
-        image.save(response, image.format, **params)
-
         if file.is_public_file():
             file_name = "%s%s" % (file.get_name(), ".jpg")
             file_path = 'cached%s%s' % (request.path, file_name)
             default_storage.delete(file_path)
-            default_storage.save(file_path, ContentFile(response.content))
+            default_storage.save(file_path, ContentFile(binary))
             full_file_path = "%s%s" % (settings.MEDIA_URL, file_path)
             cache.set(cache_key, full_file_path)
             cache_group_key = "files_cache_set.%s" % file.pk
@@ -154,6 +146,9 @@ def details(request, id, size=None, crop=False, quality=90, download=False, cons
 
         return response
 
+    # raises Http404 if the file is missing, before its url is cached
+    stat = stat_file(file)
+
     if file.is_public_file():
         cache.set(cache_key, file.get_file_public_url())
         set_s3_file_permission(file.file, public=True)
@@ -167,11 +162,12 @@ def details(request, id, size=None, crop=False, quality=90, download=False, cons
             cache.set(cache_group_key, cache_group_list)
 
     # set mimetype
-    if file.mime_type():
-        response = HttpResponse(data, content_type=file.mime_type())
-    else:
+    if not file.mime_type():
         raise Http404
 
+    # streams the file, or hands it to the front-end server
+    response = serve_file(request, file, file.mime_type(), stat=stat)
+
     # return response
     if file.get_name().endswith(file.ext()):
         response['Content-Disposition'] = '%s filename="%s"' % (attachment, file.get_name())
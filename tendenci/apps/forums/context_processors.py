@@ -6,7 +6,18 @@ import defaults
 __author__ = 'zeus'
 
 
+_context = None
+
+
 def processor(request):
+    """
+    The values only depend on the forum defaults,
+    so they are built once per process.
+    """
+    global _context
+    if _context is not None:
+        return _context
+
     context = {}
     for i in (
         'PYBB_TEMPLATE',
@@ -20,4 +31,5 @@ def processor(request):
     ):
         context[i] = getattr(defaults, i, None)
     context['PYBB_AVATAR_DIMENSIONS'] = '%sx%s' % (defaults.PYBB_AVATAR_WIDTH, defaults.PYBB_AVATAR_WIDTH)
+    _context = context
     return context
@@ -80,7 +80,7 @@ def nearest(request, template_name="locations/nearest.html"):
     if query:
         lat, lng = get_coordinates(address=query)
 
-    all_locations = Location.objects.filter(filters).distinct()
+    all_locations = Location.objects.filter(filters)
     if not request.user.is_anonymous():
         all_locations = all_locations.select_related()
 
@@ -1,9 +1,8 @@
-from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User, Permission
 from django.db.models.base import Model
 
-from tendenci.apps.perms.object_perms import ObjectPermission
-from tendenci.apps.perms.utils import can_view
+from tendenci.apps.perms.cache import has_object_perm
+from tendenci.apps.perms.user_context import get_user_context
 
 
 class ObjectPermBackend(object):
@@ -62,44 +61,32 @@ class ObjectPermBackend(object):
         if user_obj.is_anonymous():
             return set()
         if not hasattr(user_obj, '_perm_cache'):
-            user_obj._perm_cache = set([u"%s.%s" % (p.content_type.app_label, p.codename) for p in user_obj.user_permissions.select_related()])
-            user_obj._perm_cache.update(self.get_group_permissions(user_obj))
+            # user, tendenci group and django group permissions in one query
+            user_obj._perm_cache = get_user_context(user_obj).permissions
         return user_obj._perm_cache
 
     def get_group_object_permissions(self, user_obj, obj):
-        app_label = obj._meta.app_label
-        user_obj_attr = '_%s_%d_group_object_perm_cache' % (
-            app_label,
-            obj.pk
-        )
-        if not hasattr(user_obj, user_obj_attr):
-            content_type = ContentType.objects.get_for_model(obj)
-            filters = {
-               'group__members': user_obj,
-               'content_type': content_type,
-               'object_id': obj.pk
-            }
-            group_object_perms = ObjectPermission.objects.filter(**filters)
-            user_obj._group_object_perm_cache = set([u"%s.%s.%s" % (p.object_id, p.content_type.app_label, p.codename) for p in group_object_perms])
-        return user_obj._group_object_perm_cache
+        """
+        Returns a set of "object_id.app_label.codename" permission strings
+        that this user has on obj through his/her groups.
+        """
+        return get_user_context(user_obj).get_group_object_permissions(obj)
 
     def get_all_object_permissions(self, user_obj, obj):
-        app_label = obj._meta.app_label
-        user_obj_attr = '_%s_%d_object_perm_cache' % (
-            app_label,
-            obj.pk
-        )
-        if not hasattr(user_obj, user_obj_attr):
-            content_type = ContentType.objects.get_for_model(obj)
-            filters = {
-                'content_type': content_type,
-                'object_id': obj.pk,
-                'user': user_obj
-            }
-            perms = ObjectPermission.objects.filter(**filters)
-            user_obj._object_perm_cache = set([u"%s.%s.%s" % (p.object_id, p.content_type.app_label, p.codename) for p in perms])
-            user_obj._object_perm_cache.update(self.get_group_object_permissions(user_obj, obj))
-        return user_obj._object_perm_cache
+        """
+        Returns a set of "object_id.app_label.codename" permission strings
+        that this user has on obj, directly or through groups.
+        They are cached per object for the request.
+        """
+        return get_user_context(user_obj).get_object_permissions(obj)
+
+    def prefetch_object_permissions(self, user_obj, objects):
+        """
+        Loads the object permissions of user_obj on a list of objects
+        with one query per content type, so that checking has_perm
+        on each of them (e.g. on a list page) doesn't hit the database.
+        """
+        get_user_context(user_obj).prefetch_object_permissions(objects)
 
     def has_perm(self, user, perm, obj=None):
         # check codename, return false if its a malformed codename
@@ -158,25 +145,9 @@ class ObjectPermBackend(object):
         if not isinstance(obj, Model):
             return False
 
-        # lets check the search index for view permissions
-        # before we ever hit the database, faster
-        if 'view' in perm:
-            try:  # test for an index and make the query
-                from haystack import connections
-                site = connections['default'].unified_index()
-
-                index = site.get_index(obj.__class__)
-                if can_view(user, obj):
-                    return True
-            except AssertionError:
-                raise
-            except:
-                pass
-
-        # check the permissions on the object level of groups or user
-        perm = '%s.%s' % (obj.pk, perm)
-        if perm in self.get_all_object_permissions(user, obj):
-            return True
+        # check the permissions on the object level of groups or user,
+        # the decisions are cached across requests
+        return has_object_perm(user, obj, perm)
 
     def has_module_perms(self, user_obj, app_label):
         """
@@ -0,0 +1,157 @@
+import uuid
+
+from django.core.cache import cache
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+
+from tendenci.apps.perms.user_context import get_user_context
+
+
+CACHE_PRE_KEY = "perms"
+
+# seconds an object permission decision is kept
+DECISION_TIMEOUT = 60 * 60
+
+# seconds a visible object of a template tag is kept
+VISIBLE_OBJECT_TIMEOUT = 60 * 60
+
+
+def get_cache_key(keys):
+    keys = [settings.CACHE_PRE_KEY, CACHE_PRE_KEY] + [unicode(k) for k in keys]
+    return '.'.join(keys)
+
+
+def get_object_version(content_type_id, object_id):
+    """
+    Returns the version stamp of the object permissions of an object.
+    It changes whenever the object or one of its ObjectPermission rows
+    is saved or deleted, which discards the cached decisions.
+    """
+    key = get_cache_key(['version', content_type_id, object_id])
+    version = cache.get(key)
+    if not version:
+        version = uuid.uuid4().hex
+        cache.set(key, version, None)
+    return version
+
+
+def bump_object_versions(objects):
+    """
+    Invalidates the permission decisions on a list of
+    (content_type_id, object_id).
+    """
+    cache.set_many(dict((get_cache_key(['version', content_type_id, object_id]),
+                         uuid.uuid4().hex)
+                        for content_type_id, object_id in set(objects)), None)
+
+
+def bump_object_perms_version(sender, instance, **kwargs):
+    """
+    Connected to ObjectPermission save and delete.
+    """
+    bump_object_versions([(instance.content_type_id, instance.object_id)])
+
+
+def bump_object_version(sender, instance, **kwargs):
+    """
+    Connected to the save and delete of TendenciBaseModel objects.
+    """
+    from tendenci.apps.perms.models import TendenciBaseModel
+
+    if isinstance(instance, TendenciBaseModel) and instance.pk:
+        content_type = ContentType.objects.get_for_model(instance)
+        bump_object_versions([(content_type.pk, instance.pk)])
+
+
+def has_object_perm(user, obj, perm):
+    """
+    Checks if user has the permission perm ('app_label.codename')
+    on obj through an ObjectPermission row for the user or one of
+    his/her groups.
+
+    The decisions are cached across requests: the group decision is
+    shared by every user with the same groups, the user decision is
+    per user. Both are keyed by the object version.
+    """
+    if not user.is_authenticated() or obj.pk is None:
+        return False
+
+    context = get_user_context(user)
+    content_type = ContentType.objects.get_for_model(obj)
+    version = get_object_version(content_type.pk, obj.pk)
+    keys = ['decision', content_type.pk, obj.pk, version, perm]
+    group_key = get_cache_key(keys + ['g%s' % context.groups_fingerprint])
+    user_key = get_cache_key(keys + ['u%s' % user.pk])
+
+    decisions = cache.get_many([group_key, user_key])
+    if len(decisions) == 2:
+        return decisions[group_key] or decisions[user_key]
+
+    perm = '%s.%s' % (obj.pk, perm)
+    group_decision = perm in context.get_group_object_permissions(obj)
+    user_decision = not group_decision and perm in context.get_object_permissions(obj)
+    cache.set_many({group_key: group_decision,
+                    user_key: user_decision}, DECISION_TIMEOUT)
+    return group_decision or user_decision
+
+
+def get_visibility_class(user):
+    """
+    Returns the name of the users that get_query_filters gives
+    the same filter (apart from what they created or own):
+    anonymous, admin, or user/member with the same groups.
+    """
+    user = getattr(user, 'impersonated_user', user)
+    if not isinstance(user, User) or user.is_anonymous():
+        return 'anonymous'
+    if user.profile.is_superuser:
+        return 'admin'
+    if user.profile.is_member:
+        return 'member.%s' % get_user_context(user).groups_fingerprint
+    return 'user.%s' % get_user_context(user).groups_fingerprint
+
+
+def get_visible_object(user, model, pk, perm):
+    """
+    Returns the object of model with pk if user can view it
+    (see get_query_filters), None otherwise.
+
+    The result is cached per visibility class of the user and object
+    version, so template tags such as {% box %} and {% nav %} don't
+    query for it on every render. The creator and owner of the object
+    can see it through get_query_filters whatever their class: the
+    cache is bypassed for them.
+    """
+    from tendenci.apps.perms.utils import get_query_filters
+
+    user = getattr(user, 'impersonated_user', user)
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+
+    content_type = ContentType.objects.get_for_model(model)
+    version = get_object_version(content_type.pk, pk)
+    key = get_cache_key(['visible', content_type.pk, pk, version,
+                         perm, get_visibility_class(user)])
+    user_id = getattr(user, 'pk', None)
+
+    cached = cache.get(key)
+    if cached is not None:
+        obj, owner_ids = cached
+        if user_id is None or user_id not in owner_ids:
+            return obj
+
+    objs = list(model.objects.filter(get_query_filters(user, perm)).filter(pk=pk)[:1])
+    if objs:
+        obj = objs[0]
+        owner_ids = (obj.creator_id, obj.owner_id)
+    else:
+        obj = None
+        owner_ids = tuple(model.objects.filter(pk=pk).values_list(
+            'creator_id', 'owner_id').first() or ())
+
+    if user_id is None or user_id not in owner_ids:
+        cache.set(key, (obj, owner_ids), VISIBLE_OBJECT_TIMEOUT)
+    return obj
@@ -1,7 +1,9 @@
 from haystack import indexes
 
-from django.db.models import signals
+from django.db.models import signals, Model
+from django.db.models.query import QuerySet
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 
 from tendenci.apps.perms.object_perms import ObjectPermission
 #from tendenci.apps.search.indexes import CustomSearchIndex
@@ -10,6 +12,27 @@ def is_whoosh():
     default_engine = settings.HAYSTACK_CONNECTIONS.get('default', {}).get('ENGINE', '')
     return default_engine and 'whoosh' in default_engine.lower()
 
+class BatchQuerySet(QuerySet):
+    """
+    QuerySet returned by TendenciBaseSearchIndex.build_queryset.
+    Each time a slice of it is fetched (update_index fetches one batch
+    at a time), the search index preloads the data its prepare_*
+    methods need for the whole batch.
+    """
+    search_index = None
+
+    def _clone(self, *args, **kwargs):
+        clone = super(BatchQuerySet, self)._clone(*args, **kwargs)
+        clone.search_index = self.search_index
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super(BatchQuerySet, self)._fetch_all()
+        if fetched and self.search_index is not None:
+            self.search_index.prefetch_batch(self._result_cache)
+
+
 class TendenciBaseSearchIndex(indexes.SearchIndex):
     text = indexes.CharField(document=True, use_template=True)
 
@@ -38,11 +61,58 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
     # the prepare_order method to sort by a different field
     order = indexes.DateTimeField()
 
+    def __init__(self, *args, **kwargs):
+        super(TendenciBaseSearchIndex, self).__init__(*args, **kwargs)
+        self.is_whoosh = is_whoosh()
+
     def get_model(self):
         return None
 
+    def build_queryset(self, using=None, start_date=None, end_date=None):
+        """
+        Loads creator and owner with the objects and returns a
+        BatchQuerySet, so that each batch is prepared by prefetch_batch.
+        """
+        queryset = super(TendenciBaseSearchIndex, self).build_queryset(using=using,
+                                                                       start_date=start_date,
+                                                                       end_date=end_date)
+        field_names = [f.name for f in queryset.model._meta.fields]
+        related = [name for name in ('creator', 'owner') if name in field_names]
+        if related:
+            queryset = queryset.select_related(*related)
+
+        batch_queryset = BatchQuerySet(model=queryset.model, query=queryset.query.clone(),
+                                       using=queryset.db)
+        batch_queryset._prefetch_related_lookups = queryset._prefetch_related_lookups
+        batch_queryset.search_index = self
+        return batch_queryset
+
+    def prefetch_batch(self, objects):
+        """
+        Loads the groups that can view each object of a batch in one
+        query. The result is stored on the objects and used by
+        prepare_groups_can_view.
+        """
+        objects = [obj for obj in objects if isinstance(obj, Model) and obj.pk is not None]
+        if not objects:
+            return
+
+        model = objects[0]._meta.model
+        content_type = ContentType.objects.get_for_model(model)
+        groups = dict((obj.pk, []) for obj in objects)
+        rows = ObjectPermission.objects.filter(content_type=content_type,
+                                               codename='view_%s' % model._meta.model_name,
+                                               object_id__in=list(groups.keys()),
+                                               group__isnull=False
+                                               ).values_list('object_id', 'group_id')
+        for object_id, group_id in rows:
+            groups[object_id].append(group_id)
+
+        for obj in objects:
+            obj._groups_can_view = groups[obj.pk]
+
     def prepare_allow_anonymous_view(self, obj):
-        if is_whoosh():
+        if self.is_whoosh:
             try:
                 temp = int(obj.allow_anonymous_view)
             except TypeError:
@@ -51,7 +121,7 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
         return obj.allow_anonymous_view
 
     def prepare_allow_user_view(self, obj):
-        if is_whoosh():
+        if self.is_whoosh:
             try:
                 temp = int(obj.allow_user_view)
             except TypeError:
@@ -60,7 +130,7 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
         return obj.allow_user_view
 
     def prepare_allow_member_view(self, obj):
-        if is_whoosh():
+        if self.is_whoosh:
             try:
                 temp = int(obj.allow_member_view)
             except TypeError:
@@ -69,7 +139,7 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
         return obj.allow_member_view
 
     def prepare_allow_user_edit(self, obj):
-        if is_whoosh():
+        if self.is_whoosh:
             try:
                 temp = int(obj.allow_user_edit)
             except TypeError:
@@ -78,7 +148,7 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
         return obj.allow_user_edit
 
     def prepare_allow_member_edit(self, obj):
-        if is_whoosh():
+        if self.is_whoosh:
             try:
                 temp = int(obj.allow_member_edit)
             except TypeError:
@@ -87,7 +157,7 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
         return obj.allow_member_edit
 
     def prepare_status(self, obj):
-        if is_whoosh():
+        if self.is_whoosh:
             try:
                 temp = int(obj.status)
             except TypeError:
@@ -113,4 +183,7 @@ class TendenciBaseSearchIndex(indexes.SearchIndex):
         This needs to be overwritten if 'view' permission label does not follow the standard convention:
         (app_label).view_(module_name)
         """
+        groups = getattr(obj, '_groups_can_view', None)
+        if groups is not None:
+            return groups
         return ObjectPermission.objects.groups_with_perms('%s.view_%s' % (obj._meta.app_label, obj._meta.model_name), obj)
@@ -1,12 +1,16 @@
 from haystack.query import SearchQuerySet
 from haystack.backends import SQ
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.db.models.query import QuerySet
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User, AnonymousUser
 
+from tendenci.apps.perms.user_context import get_user_context
+from tendenci.apps.perms.cache import bump_object_versions
+
 
 class ObjectPermissionManager(models.Manager):
     def users_with_perms(self, perm, instance):
@@ -92,29 +96,18 @@ class ObjectPermissionManager(models.Manager):
            leave blank for all permissions.
            Note: If you are using the tuple/perm approach this does nothing.
         """
-        multi_group = False
-        group_with_perms = False
-
         # nobody to give permissions too
         if not group_or_groups:
             return
         # check perms
         if not isinstance(perms, list):
             perms = None
-        # check for multi_groups
-        if isinstance(group_or_groups, list):
-            multi_group = True
-        if isinstance(group_or_groups, QuerySet):
-            multi_group = True
-        if isinstance(group_or_groups, tuple):
-            multi_group = True
-            if len(group_or_groups[0]) == 2:
-                group_with_perms = True
 
         # treat the tuples differently. They are passed in as
         # ((group,perm,),(group,perm,) ..... (group,perm.))
-        if group_with_perms:
+        if isinstance(group_or_groups, tuple) and len(group_or_groups[0]) == 2:
             from tendenci.apps.user_groups.models import Group
+            grants = []
             for group, perm in group_or_groups:
                 if isinstance(group, unicode):
                     if group.isdigit():
@@ -122,76 +115,14 @@ class ObjectPermissionManager(models.Manager):
                             group = Group.objects.get(pk=group)
                         except:
                             group = None
-
-                codename = '%s_%s' % (perm, object._meta.object_name.lower())
-                content_type = ContentType.objects.get_for_model(object)
-
-                perm = Permission.objects.get(codename=codename,
-                                              content_type=content_type)
-
-                defaults = {
-                    "codename": codename,
-                    "object_id": object.pk,
-                    "content_type": perm.content_type,
-                    "group": group,
-                }
-                self.get_or_create(**defaults)
+                grants.append((group, perm))
+            self.bulk_assign([object], grants)
             return  # get out
 
-        if multi_group:
-            for group in group_or_groups:
-                if perms:
-                    for perm in perms:
-                        codename = '%s_%s' % (perm, object._meta.object_name.lower())
-                        content_type = ContentType.objects.get_for_model(object)
-
-                        perm = Permission.objects.get(codename=codename,
-                                                      content_type=content_type)
-
-                        defaults = {
-                            "codename": codename,
-                            "object_id": object.pk,
-                            "content_type": perm.content_type,
-                            "group": group,
-                        }
-                        self.get_or_create(**defaults)
-                else:  # all default permissions
-                    content_type = ContentType.objects.get_for_model(object)
-                    perms = Permission.objects.filter(content_type=content_type)
-                    for perm in perms:
-                        defaults = {
-                            "codename": perm.codename,
-                            "object_id": object.pk,
-                            "content_type": content_type,
-                            "group": group,
-                        }
-                        self.get_or_create(**defaults)
-        else:  # not multi_group
-            if perms:
-                for perm in perms:
-                    codename = '%s_%s' % (perm, object._meta.object_name.lower())
-                    content_type = ContentType.objects.get_for_model(object)
-
-                    perm = Permission.objects.get(codename=codename,
-                                                  content_type=content_type)
-                    defaults = {
-                        "codename": codename,
-                        "object_id": object.pk,
-                        "content_type": perm.content_type,
-                        "group": group_or_groups,
-                    }
-                    self.get_or_create(**defaults)
-            else:  # all default permissions
-                content_type = ContentType.objects.get_for_model(object)
-                perms = Permission.objects.filter(content_type=content_type)
-                for perm in perms:
-                    defaults = {
-                        "codename": perm.codename,
-                        "object_id": object.pk,
-                        "content_type": content_type,
-                        "group": group_or_groups,
-                    }
-                    self.get_or_create(**defaults)
+        if not isinstance(group_or_groups, (list, tuple, QuerySet)):
+            group_or_groups = [group_or_groups]
+        self.bulk_assign([object], [(group, perm) for group in group_or_groups
+                                    for perm in (perms or [None])])
 
     def assign(self, user_or_users, object, perms=None):
         """
@@ -206,91 +137,146 @@ class ObjectPermissionManager(models.Manager):
         -- perms: a list of individual permissions to assign to each user
            leave blank for all permissions.
         """
-        multi_user = False
-
         # nobody to give permissions too
         if not user_or_users:
             return
         # check perms
         if not isinstance(perms, list):
             perms = None
-        # check for multi_users
-        if isinstance(user_or_users, list):
-            multi_user = True
-        if isinstance(user_or_users, QuerySet):
-            multi_user = True
-        if isinstance(user_or_users, tuple):
-            multi_user = True
-
-        if multi_user:
-            for user in user_or_users:
-                if perms:
-                    for perm in perms:
-                        codename = '%s_%s' % (perm, object._meta.object_name.lower())
-                        content_type = ContentType.objects.get_for_model(object)
-
-                        perm = Permission.objects.get(codename=codename,
-                                                      content_type=content_type)
-
-                        defaults = {
-                            "codename": codename,
-                            "object_id": object.pk,
-                            "content_type": perm.content_type,
-                            "user": user,
-                        }
-                        try:
-                            self.get_or_create(**defaults)
-                        except self.model.MultipleObjectsReturned as e:
-                            pass
-
-                else:  # all default permissions
-                    content_type = ContentType.objects.get_for_model(object)
-                    perms = Permission.objects.filter(content_type=content_type)
-                    for perm in perms:
-                        defaults = {
-                            "codename": perm.codename,
-                            "object_id": object.pk,
-                            "content_type": content_type,
-                            "user": user,
-                        }
-                        try:
-                            self.get_or_create(**defaults)
-                        except self.model.MultipleObjectsReturned as e:
-                            pass
-
-        else:  # not muli_user
-            if perms:
-                for perm in perms:
-                    codename = '%s_%s' % (perm, object._meta.object_name.lower())
-                    content_type = ContentType.objects.get_for_model(object)
-
-                    perm = Permission.objects.get(codename=codename,
-                                                  content_type=content_type)
-                    defaults = {
-                        "codename": codename,
-                        "object_id": object.pk,
-                        "content_type": perm.content_type,
-                        "user": user_or_users,
-                    }
-                    try:
-                        self.get_or_create(**defaults)
-                    except self.model.MultipleObjectsReturned as e:
-                        pass
-
-            else:  # all default permissions
-                content_type = ContentType.objects.get_for_model(object)
-                perms = Permission.objects.filter(content_type=content_type)
-                for perm in perms:
-                    defaults = {
-                        "codename": perm.codename,
-                        "object_id": object.pk,
-                        "content_type": content_type,
-                        "user": user_or_users,
-                    }
-                    try:
-                        self.get_or_create(**defaults)
-                    except self.model.MultipleObjectsReturned as e:
-                        pass
+
+        if not isinstance(user_or_users, (list, tuple, QuerySet)):
+            user_or_users = [user_or_users]
+        self.bulk_assign([object], [(user, perm) for user in user_or_users
+                                    for perm in (perms or [None])])
+
+    def _get_codenames(self, content_type, perm, all_codenames):
+        """
+        Returns the codenames of perm ('view', 'change', ...)
+        for content_type, or all_codenames if perm is None.
+        """
+        if perm is None:
+            return all_codenames
+        codename = '%s_%s' % (perm, content_type.model)
+        if codename in all_codenames:
+            return [codename]
+        return []
+
+    def _bulk_update(self, objects, grants, revoke=None):
+        """
+        Diffs the ObjectPermission rows of objects against grants,
+        with one query per content type, and in the same transaction
+        creates the missing rows and, if revoke is 'all' (or 'groups'),
+        deletes the existing (group) rows that are not granted.
+        Returns (number created, number deleted).
+        """
+        object_ids = {}
+        for obj in objects:
+            content_type = ContentType.objects.get_for_model(obj)
+            object_ids.setdefault(content_type, set()).add(obj.pk)
+
+        with transaction.atomic():
+            new_perms, delete_ids = [], []
+            for content_type, ids in object_ids.items():
+                # the Permission rows are read once per content type
+                all_codenames = set(Permission.objects.filter(
+                    content_type=content_type).values_list('codename', flat=True))
+
+                wanted = set()
+                for principal, perm in grants:
+                    if principal is None:
+                        continue
+                    if isinstance(principal, User):
+                        group_id, user_id = None, principal.pk
+                    else:
+                        group_id, user_id = principal.pk, None
+                    for codename in self._get_codenames(content_type, perm, all_codenames):
+                        for object_id in ids:
+                            wanted.add((object_id, group_id, user_id, codename))
+
+                existing = set()
+                # locked so that a concurrent update of the same objects
+                # waits for this diff instead of working from a stale one
+                rows = self.select_for_update().filter(content_type=content_type,
+                                                       object_id__in=ids)
+                for row in rows.values('pk', 'object_id', 'group_id', 'user_id', 'codename'):
+                    key = (row['object_id'], row['group_id'], row['user_id'], row['codename'])
+                    existing.add(key)
+                    if key in wanted or not revoke:
+                        continue
+                    if revoke == 'groups' and row['group_id'] is None:
+                        continue
+                    delete_ids.append(row['pk'])
+
+                for object_id, group_id, user_id, codename in wanted - existing:
+                    new_perms.append(self.model(content_type=content_type,
+                                                object_id=object_id,
+                                                group_id=group_id,
+                                                user_id=user_id,
+                                                codename=codename))
+
+            if delete_ids:
+                self.filter(pk__in=delete_ids).delete()
+            self.bulk_create(new_perms)
+        # bulk_create doesn't send post_save
+        bump_object_versions([(p.content_type.pk, p.object_id) for p in new_perms])
+        return len(new_perms), len(delete_ids)
+
+    def bulk_assign(self, objects, grants):
+        """
+        Grants permissions on many objects at once.
+
+        -- objects: a list or queryset of model instances
+
+        -- grants: a list of (group_or_user, perm) pairs, perm being
+           'view', 'change', ... or None for all the model permissions.
+
+        Permissions that don't exist for a model are skipped.
+        Returns the number of permissions created.
+        """
+        return self._bulk_update(objects, grants)[0]
+
+    def bulk_replace(self, objects, grants, groups_only=False):
+        """
+        Same as bulk_assign, but also revokes the permissions on the
+        objects that are not in grants (only group permissions if
+        groups_only). Replaces remove_all() followed by assign_group().
+        Returns (number created, number deleted).
+        """
+        revoke = 'groups' if groups_only else 'all'
+        return self._bulk_update(objects, grants, revoke=revoke)
+
+    def bulk_revoke(self, objects, principals=None, perms=None):
+        """
+        Revokes permissions on many objects in one delete.
+
+        -- principals: a list of groups and users, all if None
+
+        -- perms: a list of perms ('view', 'change', ...), all if None
+
+        Returns the number of permissions deleted.
+        """
+        object_ids = {}
+        for obj in objects:
+            content_type = ContentType.objects.get_for_model(obj)
+            object_ids.setdefault(content_type, set()).add(obj.pk)
+
+        delete_ids = []
+        with transaction.atomic():
+            for content_type, ids in object_ids.items():
+                perms_qs = self.select_for_update().filter(content_type=content_type,
+                                                           object_id__in=ids)
+                if principals is not None:
+                    user_ids = [p.pk for p in principals if isinstance(p, User)]
+                    group_ids = [p.pk for p in principals if not isinstance(p, User)]
+                    perms_qs = perms_qs.filter(Q(user__in=user_ids) | Q(group__in=group_ids))
+                if perms is not None:
+                    perms_qs = perms_qs.filter(codename__in=[
+                        '%s_%s' % (perm, content_type.model) for perm in perms])
+                delete_ids.extend(perms_qs.values_list('pk', flat=True))
+
+            if delete_ids:
+                self.filter(pk__in=delete_ids).delete()
+        return len(delete_ids)
 
     def list_all(self, object):
         """
@@ -308,10 +294,8 @@ class ObjectPermissionManager(models.Manager):
             Remove all permissions on object (instance)
         """
         content_type = ContentType.objects.get_for_model(object)
-        perms = self.filter(content_type=content_type,
-                            object_id=object.pk)
-        for perm in perms:
-            perm.delete()
+        self.filter(content_type=content_type,
+                    object_id=object.pk).delete()
 
 
 class TendenciBaseManager(models.Manager):
@@ -347,7 +331,7 @@ class TendenciBaseManager(models.Manager):
 
         user is a required argument since we'll be filtering by user.pk.
         """
-        groups = [g.pk for g in user.group_set.all()]
+        groups = get_user_context(user).group_ids
         status_detail = kwargs.get('status_detail', 'active')
         status = kwargs.get('status', True)
 
@@ -384,7 +368,7 @@ class TendenciBaseManager(models.Manager):
 
         user required since we'll filter by user.pk.
         """
-        groups = [g.pk for g in user.group_set.all()]
+        groups = get_user_context(user).group_ids
         status_detail = kwargs.get('status_detail', 'active')
         status = kwargs.get('status', True)
 
@@ -425,7 +409,7 @@ class TendenciBaseManager(models.Manager):
 
         user is a required argument since we'll be filtering by user.pk.
         """
-        groups = [g.pk for g in user.group_set.all()]
+        groups = get_user_context(user).group_ids
         status_detail = kwargs.get('status_detail', 'active')
         status = kwargs.get('status', True)
         is_member = kwargs.get('is_member', True)
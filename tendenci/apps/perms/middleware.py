@@ -0,0 +1,20 @@
+from tendenci.apps.perms.user_context import get_user_context, clear_user_context
+
+
+class UserContextMiddleware(object):
+    """
+    Installs the request-scoped UserContext of request.user as
+    request.user_context. Nothing is loaded until it is read, and
+    the context is dropped when the response goes out.
+
+    Should come after ProfileMiddleware.
+    """
+    def process_request(self, request):
+        request.user_context = get_user_context(request.user)
+
+    def process_response(self, request, response):
+        user_context = getattr(request, 'user_context', None)
+        if user_context is not None:
+            clear_user_context(user_context.user)
+            del request.user_context
+        return response
@@ -1,4 +1,5 @@
 from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 from django.utils.safestring import mark_safe
@@ -8,6 +9,7 @@ from tendenci.apps.event_logs.models import EventLog
 from tendenci.apps.entities.models import Entity
 from tendenci.apps.versions.models import Version
 from tendenci.apps.categories.models import Category
+from tendenci.apps.perms.cache import bump_object_version
 
 # Abstract base class for authority fields
 class TendenciBaseModel(models.Model):
@@ -176,3 +178,10 @@ class TendenciBaseModel(models.Model):
                 Category.objects.remove(self, 'sub_category')
             else:
                 Category.objects.update(self, subcategory_value, 'sub_category')
+
+
+# discard the cached object permission decisions of saved and deleted objects
+post_save.connect(bump_object_version, weak=False,
+                  dispatch_uid='perms.bump_object_version')
+post_delete.connect(bump_object_version, weak=False,
+                    dispatch_uid='perms.bump_deleted_object_version')
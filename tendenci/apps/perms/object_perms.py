@@ -1,9 +1,11 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
 
 from tendenci.apps.perms.managers import ObjectPermissionManager
+from tendenci.apps.perms.cache import bump_object_perms_version
 from tendenci.apps.user_groups.models import Group
 
 
@@ -27,3 +29,10 @@ class ObjectPermission(models.Model):
 
     class Meta:
         app_label = 'perms'
+        index_together = [
+            ('content_type', 'codename', 'group', 'object_id'),
+        ]
+
+
+post_save.connect(bump_object_perms_version, sender=ObjectPermission, weak=False)
+post_delete.connect(bump_object_perms_version, sender=ObjectPermission, weak=False)
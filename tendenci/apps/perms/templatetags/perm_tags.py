@@ -79,6 +79,19 @@ def has_perm(parser, token):
     return HasPermNode(user, perm, object, context_var=context_var)
 
 
+@register.simple_tag
+def prefetch_perms(user, objects):
+    """
+        {% prefetch_perms user object_list %}
+
+        Loads the object permissions of user on object_list at once,
+        put it before a loop that calls has_perm on each object.
+    """
+    if isinstance(user, User) and objects and not user.profile.is_superuser:
+        utils.prefetch_object_perms(user, objects)
+    return ''
+
+
 class IsAdminNode(Node):
     def __init__(self, user, context_var):
         self.user = user
@@ -0,0 +1,405 @@
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from tendenci.apps.boxes.models import Box
+from tendenci.apps.profiles.models import Profile
+from tendenci.apps.user_groups.models import Group, GroupMembership
+from tendenci.apps.perms.object_perms import ObjectPermission
+from tendenci.apps.perms.middleware import UserContextMiddleware
+from tendenci.apps.perms.user_context import get_user_context
+from tendenci.apps.perms.utils import has_view_perm
+
+
+class UserContextTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tester', 'test@test.com', 'test')
+        Profile.objects.create_profile(user=self.user)
+        self.box = Box.objects.create(title='Box', content='', allow_anonymous_view=False,
+                                      allow_user_view=False, allow_member_view=True)
+
+    def test_middleware_drops_context_after_response(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        middleware = UserContextMiddleware()
+
+        middleware.process_request(request)
+        context = request.user_context
+        self.assertIs(get_user_context(self.user), context)
+
+        middleware.process_response(request, None)
+        self.assertFalse(hasattr(request, 'user_context'))
+        self.assertIsNot(get_user_context(self.user), context)
+
+    def test_has_view_perm_uses_user_context(self):
+        self.assertFalse(has_view_perm(self.user, 'boxes.view_box', self.box))
+        # the check went through the user context of the request
+        self.assertTrue(hasattr(self.user, '_user_context'))
+
+        self.user.profile.member_number = '1001'
+        self.assertTrue(has_view_perm(self.user, 'boxes.view_box', self.box))
+
+        self.user.profile.member_number = ''
+        self.user.is_superuser = True
+        self.assertTrue(has_view_perm(self.user, 'boxes.view_box', self.box))
+
+
+class ObjectPermissionPrefetchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tester', 'test@test.com', 'test')
+        Profile.objects.create_profile(user=self.user)
+        self.group = Group.objects.create(name='Editors')
+        GroupMembership.objects.create(group=self.group, member=self.user)
+        self.boxes = [Box.objects.create(title='Box %s' % i, content='',
+                                         allow_anonymous_view=False) for i in range(3)]
+        ObjectPermission.objects.assign_group([self.group], self.boxes[0], ['change'])
+        ObjectPermission.objects.assign(self.user, self.boxes[1], ['change'])
+
+    def test_permissions_are_kept_per_object(self):
+        context = get_user_context(self.user)
+        self.assertEqual(context.get_object_permissions(self.boxes[0]),
+                         set(['%s.boxes.change_box' % self.boxes[0].pk]))
+        self.assertEqual(context.get_group_object_permissions(self.boxes[0]),
+                         set(['%s.boxes.change_box' % self.boxes[0].pk]))
+        self.assertEqual(context.get_object_permissions(self.boxes[1]),
+                         set(['%s.boxes.change_box' % self.boxes[1].pk]))
+        self.assertEqual(context.get_group_object_permissions(self.boxes[1]), set())
+        self.assertEqual(context.get_object_permissions(self.boxes[2]), set())
+
+    def test_prefetch_loads_all_objects_at_once(self):
+        from tendenci.apps.perms.utils import prefetch_object_perms
+
+        context = get_user_context(self.user)
+        context.group_ids
+        with self.assertNumQueries(1):
+            prefetch_object_perms(self.user, self.boxes)
+        with self.assertNumQueries(0):
+            for box in self.boxes:
+                context.get_object_permissions(box)
+                context.get_group_object_permissions(box)
+
+
+class GroupPermFilterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tester', 'test@test.com', 'test')
+        Profile.objects.create_profile(user=self.user)
+        self.groups = [Group.objects.create(name='Group %s' % i) for i in range(2)]
+        for group in self.groups:
+            GroupMembership.objects.create(group=group, member=self.user)
+        self.box = Box.objects.create(title='Shared', content='', allow_anonymous_view=False,
+                                      allow_user_view=False, allow_member_view=False)
+        self.other_box = Box.objects.create(title='Private', content='', allow_anonymous_view=False,
+                                            allow_user_view=False, allow_member_view=False)
+        # both groups of the user can view the box
+        ObjectPermission.objects.assign_group(self.groups, self.box, ['view'])
+
+    def test_semi_join_filter(self):
+        from tendenci.apps.perms.utils import get_group_perm_filters
+
+        group_ids = [group.pk for group in self.groups]
+        q = get_group_perm_filters('boxes.view_box', group_ids)
+        self.assertEqual(list(Box.objects.filter(q)), [self.box])
+        q = get_group_perm_filters('boxes.change_box', group_ids)
+        self.assertEqual(list(Box.objects.filter(q)), [])
+
+    def test_query_filters_return_each_object_once(self):
+        from tendenci.apps.perms.utils import get_query_filters
+
+        boxes = Box.objects.filter(get_query_filters(self.user, 'boxes.view_box'))
+        self.assertEqual(list(boxes), [self.box])
+
+    def test_unknown_perm_keeps_join(self):
+        from tendenci.apps.perms.utils import get_group_perm_filters
+
+        q = get_group_perm_filters('boxes.search', [self.groups[0].pk])
+        self.assertEqual(list(Box.objects.filter(q)), [])
+
+
+class BulkObjectPermissionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tester', 'test@test.com', 'test')
+        self.groups = [Group.objects.create(name='Group %s' % i) for i in range(2)]
+        self.boxes = [Box.objects.create(title='Box %s' % i, content='') for i in range(2)]
+
+    def get_perms(self):
+        content_type = ContentType.objects.get_for_model(Box)
+        return set(ObjectPermission.objects.filter(content_type=content_type,
+                                                   object_id__in=[b.pk for b in self.boxes])
+                   .values_list('object_id', 'group_id', 'user_id', 'codename'))
+
+    def test_bulk_assign(self):
+        created = ObjectPermission.objects.bulk_assign(
+            self.boxes, [(self.groups[0], 'view'), (self.user, 'change'),
+                         (self.groups[1], 'unknown')])
+        self.assertEqual(created, 4)
+        expected = set()
+        for box in self.boxes:
+            expected.add((box.pk, self.groups[0].pk, None, 'view_box'))
+            expected.add((box.pk, None, self.user.pk, 'change_box'))
+        self.assertEqual(self.get_perms(), expected)
+
+        # existing rows are not created again
+        self.assertEqual(ObjectPermission.objects.bulk_assign(
+            self.boxes, [(self.groups[0], 'view')]), 0)
+        self.assertEqual(self.get_perms(), expected)
+
+    def test_bulk_assign_all_perms(self):
+        ObjectPermission.objects.bulk_assign(self.boxes[:1], [(self.groups[0], None)])
+        codenames = set(p[3] for p in self.get_perms())
+        self.assertTrue(set(['view_box', 'change_box', 'delete_box']) <= codenames)
+
+    def test_bulk_replace(self):
+        ObjectPermission.objects.bulk_assign(
+            self.boxes, [(self.groups[0], 'view'), (self.user, 'change')])
+
+        created, deleted = ObjectPermission.objects.bulk_replace(
+            self.boxes, [(self.groups[1], 'view')])
+        self.assertEqual((created, deleted), (2, 4))
+        self.assertEqual(self.get_perms(), set(
+            (box.pk, self.groups[1].pk, None, 'view_box') for box in self.boxes))
+
+    def test_bulk_replace_groups_only(self):
+        ObjectPermission.objects.bulk_assign(
+            self.boxes, [(self.groups[0], 'view'), (self.user, 'change')])
+
+        created, deleted = ObjectPermission.objects.bulk_replace(
+            self.boxes, [(self.groups[0], 'view'), (self.groups[1], 'change')],
+            groups_only=True)
+        self.assertEqual((created, deleted), (2, 0))
+
+        created, deleted = ObjectPermission.objects.bulk_replace(
+            self.boxes, [(self.groups[1], 'change')], groups_only=True)
+        self.assertEqual((created, deleted), (0, 2))
+        expected = set()
+        for box in self.boxes:
+            expected.add((box.pk, self.groups[1].pk, None, 'change_box'))
+            # user permissions are kept
+            expected.add((box.pk, None, self.user.pk, 'change_box'))
+        self.assertEqual(self.get_perms(), expected)
+
+    def test_bulk_revoke(self):
+        ObjectPermission.objects.bulk_assign(
+            self.boxes, [(self.groups[0], 'view'), (self.groups[0], 'change'),
+                         (self.groups[1], 'view'), (self.user, 'view')])
+
+        self.assertEqual(ObjectPermission.objects.bulk_revoke(
+            self.boxes, principals=[self.groups[0]], perms=['change']), 2)
+        self.assertEqual(ObjectPermission.objects.bulk_revoke(
+            self.boxes[:1], principals=[self.user]), 1)
+        self.assertEqual(ObjectPermission.objects.bulk_revoke(
+            self.boxes, perms=['view']), 5)
+        self.assertEqual(self.get_perms(), set())
+
+
+class ObjectPermDecisionCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user('tester', 'test@test.com', 'test')
+        Profile.objects.create_profile(user=self.user)
+        self.group = Group.objects.create(name='Editors')
+        GroupMembership.objects.create(group=self.group, member=self.user)
+        self.box = Box.objects.create(title='Box', content='')
+
+    def has_object_perm(self, perm='boxes.change_box'):
+        from tendenci.apps.perms.cache import has_object_perm
+        from tendenci.apps.perms.user_context import clear_user_context
+
+        # every check stands for a new request
+        clear_user_context(self.user)
+        return has_object_perm(self.user, self.box, perm)
+
+    def test_decision_is_cached(self):
+        from tendenci.apps.perms.cache import has_object_perm
+
+        self.assertFalse(self.has_object_perm())
+        with self.assertNumQueries(0):
+            self.assertFalse(has_object_perm(self.user, self.box, 'boxes.change_box'))
+
+    def test_object_permission_save_and_delete_invalidate(self):
+        self.assertFalse(self.has_object_perm())
+
+        ObjectPermission.objects.assign_group([self.group], self.box, ['change'])
+        self.assertTrue(self.has_object_perm())
+
+        ObjectPermission.objects.filter(group=self.group).delete()
+        self.assertFalse(self.has_object_perm())
+
+        ObjectPermission.objects.assign(self.user, self.box, ['change'])
+        self.assertTrue(self.has_object_perm())
+
+    def test_object_save_invalidates(self):
+        from tendenci.apps.perms.cache import get_object_version
+
+        content_type = ContentType.objects.get_for_model(Box)
+        version = get_object_version(content_type.pk, self.box.pk)
+        self.assertFalse(self.has_object_perm())
+
+        # a row added without signals is only seen once the object changes
+        ObjectPermission.objects.bulk_create([ObjectPermission(
+            content_type=content_type, object_id=self.box.pk,
+            group=self.group, codename='change_box')])
+        self.assertFalse(self.has_object_perm())
+
+        self.box.save()
+        self.assertNotEqual(get_object_version(content_type.pk, self.box.pk), version)
+        self.assertTrue(self.has_object_perm())
+
+
+class SearchIndexBatchTest(TestCase):
+    def setUp(self):
+        from haystack import connections
+
+        self.groups = [Group.objects.create(name='Group %s' % i) for i in range(2)]
+        self.boxes = [Box.objects.create(title='Box %s' % i, content='') for i in range(3)]
+        ObjectPermission.objects.assign_group(self.groups, self.boxes[0], ['view'])
+        ObjectPermission.objects.assign_group(self.groups[1:], self.boxes[1], ['change'])
+        self.index = connections['default'].get_unified_index().get_index(Box)
+
+    def test_batch_preloads_groups_can_view(self):
+        queryset = self.index.build_queryset().order_by('pk')
+        with self.assertNumQueries(2):
+            boxes = list(queryset[:3])
+        with self.assertNumQueries(0):
+            prepared = [sorted(self.index.prepare_groups_can_view(box)) for box in boxes]
+        self.assertEqual(prepared, [sorted(g.pk for g in self.groups), [], []])
+
+    def test_same_as_per_object_query(self):
+        for box in self.index.build_queryset().filter(pk__in=[b.pk for b in self.boxes]):
+            self.assertEqual(sorted(self.index.prepare_groups_can_view(box)),
+                             sorted(ObjectPermission.objects.groups_with_perms('boxes.view_box', box)))
+
+    def test_full_prepare_of_a_batch(self):
+        boxes = list(self.index.build_queryset().order_by('pk'))
+        docs = [self.index.full_prepare(box) for box in boxes]
+        self.assertEqual(sorted(docs[0]['groups_can_view']), sorted(g.pk for g in self.groups))
+        self.assertEqual(docs[1]['groups_can_view'], [])
+
+
+class VisibleObjectCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.group = Group.objects.create(name='Editors')
+        self.members = [self.create_user('member%s' % i, member_number='100%s' % i)
+                        for i in range(2)]
+        self.users = [self.create_user('user%s' % i) for i in range(2)]
+        self.admin = self.create_user('admin', is_superuser=True)
+        self.box = Box.objects.create(title='Box', content='', allow_anonymous_view=False,
+                                      allow_user_view=False, allow_member_view=True)
+
+    def create_user(self, username, member_number='', is_superuser=False):
+        user = User.objects.create_user(username, '%s@test.com' % username, 'test')
+        if is_superuser:
+            user.is_superuser = True
+            user.save()
+        profile = Profile.objects.create_profile(user=user)
+        if member_number:
+            profile.member_number = member_number
+            profile.save()
+        return User.objects.get(pk=user.pk)
+
+    def get_visible(self, user, obj=None):
+        from tendenci.apps.perms.cache import get_visible_object
+        from tendenci.apps.perms.user_context import clear_user_context
+
+        # every lookup stands for a new request
+        clear_user_context(user)
+        obj = obj or self.box
+        return get_visible_object(user, obj.__class__, obj.pk, '%s.view_%s' % (
+            obj._meta.app_label, obj._meta.model_name))
+
+    def test_visibility_classes(self):
+        from django.contrib.auth.models import AnonymousUser
+        from tendenci.apps.perms.cache import get_visibility_class
+        from tendenci.apps.perms.user_context import clear_user_context
+
+        self.assertEqual(get_visibility_class(AnonymousUser()), 'anonymous')
+        self.assertEqual(get_visibility_class(None), 'anonymous')
+        self.assertEqual(get_visibility_class(self.admin), 'admin')
+        self.assertEqual(get_visibility_class(self.members[0]),
+                         get_visibility_class(self.members[1]))
+        self.assertTrue(get_visibility_class(self.members[0]).startswith('member.'))
+        self.assertTrue(get_visibility_class(self.users[0]).startswith('user.'))
+
+        GroupMembership.objects.create(group=self.group, member=self.members[1])
+        clear_user_context(self.members[1])
+        self.assertNotEqual(get_visibility_class(self.members[0]),
+                            get_visibility_class(self.members[1]))
+
+    def test_entries_are_shared_within_a_class(self):
+        from django.contrib.auth.models import AnonymousUser
+        from tendenci.apps.perms.cache import get_visibility_class, get_visible_object
+
+        self.assertEqual(self.get_visible(self.members[0]), self.box)
+        get_visibility_class(self.members[1])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_visible_object(self.members[1], Box, self.box.pk,
+                                                'boxes.view_box'), self.box)
+
+        self.assertIsNone(get_visible_object(AnonymousUser(), Box, self.box.pk, 'boxes.view_box'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_visible_object(AnonymousUser(), Box, self.box.pk,
+                                                 'boxes.view_box'))
+
+        self.assertIsNone(self.get_visible(self.users[0]))
+        self.assertEqual(self.get_visible(self.admin), self.box)
+
+    def test_creator_and_owner_bypass_the_cache(self):
+        self.box.allow_member_view = False
+        self.box.creator = self.users[0]
+        self.box.owner = self.users[1]
+        self.box.save()
+
+        self.assertIsNone(self.get_visible(self.members[0]))
+        self.assertIsNone(self.get_visible(self.members[1]))
+        # the creator and the owner see it through the query filters
+        self.assertEqual(self.get_visible(self.users[0]), self.box)
+        self.assertEqual(self.get_visible(self.users[1]), self.box)
+
+        other = self.create_user('other')
+        self.assertIsNone(self.get_visible(other))
+        self.assertEqual(self.get_visible(self.users[0]), self.box)
+
+    def test_box_save_and_delete_invalidate(self):
+        self.assertEqual(self.get_visible(self.members[0]), self.box)
+
+        self.box.allow_member_view = False
+        self.box.save()
+        self.assertIsNone(self.get_visible(self.members[0]))
+
+        self.box.allow_member_view = True
+        self.box.save()
+        self.assertEqual(self.get_visible(self.members[0]), self.box)
+
+        self.box.delete()
+        self.assertIsNone(self.get_visible(self.members[0]))
+
+    def test_nav_save_and_delete_invalidate(self):
+        from django.contrib.auth.models import AnonymousUser
+        from tendenci.apps.navs.models import Nav
+
+        nav = Nav.objects.create(title='Nav')
+        anonymous = AnonymousUser()
+        self.assertEqual(self.get_visible(anonymous, nav), nav)
+
+        nav.allow_anonymous_view = False
+        nav.save()
+        self.assertIsNone(self.get_visible(anonymous, nav))
+
+        self.assertEqual(self.get_visible(self.members[0], nav), nav)
+        nav.hard_delete()
+        self.assertIsNone(self.get_visible(self.members[0], nav))
+
+    def test_object_permission_change_invalidates(self):
+        GroupMembership.objects.create(group=self.group, member=self.users[0])
+        self.assertIsNone(self.get_visible(self.users[0]))
+
+        ObjectPermission.objects.assign_group([self.group], self.box, ['view'])
+        self.assertEqual(self.get_visible(self.users[0]), self.box)
+
+        ObjectPermission.objects.filter(group=self.group).delete()
+        self.assertIsNone(self.get_visible(self.users[0]))
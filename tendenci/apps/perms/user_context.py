@@ -0,0 +1,195 @@
+import hashlib
+
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.db.models.base import Model
+
+
+class UserContext(object):
+    """
+    Request-scoped facts about a user that permission checks need over
+    and over: profile flags, group ids, membership status and global
+    permissions. Each part is loaded with one query the first time it
+    is read and kept for the rest of the request.
+
+    Use get_user_context(user) to get the context of a user; the
+    UserContextMiddleware installs it for request.user.
+    """
+    def __init__(self, user):
+        self.user = user
+        self._group_ids = None
+        self._membership_statuses = None
+        self._permissions = None
+        # (content_type_id, object_id) -> set of object permissions
+        self._object_perms = {}
+        self._group_object_perms = {}
+
+    @property
+    def is_authenticated(self):
+        return self.user.is_authenticated()
+
+    @property
+    def profile(self):
+        return self.user.profile
+
+    @property
+    def is_superuser(self):
+        return self.is_authenticated and self.profile.is_superuser
+
+    @property
+    def is_member(self):
+        return self.is_authenticated and self.profile.is_member
+
+    @property
+    def group_ids(self):
+        """
+        Ids of the (tendenci) groups the user belongs to.
+        """
+        if self._group_ids is None:
+            if not self.is_authenticated:
+                self._group_ids = []
+            else:
+                from tendenci.apps.user_groups.models import GroupMembership
+                self._group_ids = list(GroupMembership.objects.filter(
+                    member=self.user).values_list('group_id', flat=True))
+        return self._group_ids
+
+    @property
+    def groups_fingerprint(self):
+        """
+        Short hash of group_ids, the same for every user in the same groups.
+        """
+        return hashlib.md5(','.join(
+            str(group_id) for group_id in sorted(self.group_ids))).hexdigest()[:16]
+
+    @property
+    def membership_statuses(self):
+        """
+        Lowercased status_detail of the user's memberships with status=True.
+        """
+        if self._membership_statuses is None:
+            if not self.is_authenticated:
+                self._membership_statuses = set()
+            else:
+                self._membership_statuses = set(s.lower() for s in
+                    self.user.membershipdefault_set.filter(
+                        status=True).values_list('status_detail', flat=True))
+        return self._membership_statuses
+
+    @property
+    def has_active_membership(self):
+        return 'active' in self.membership_statuses
+
+    @property
+    def has_expired_membership(self):
+        return 'inactive' in self.membership_statuses
+
+    @property
+    def permissions(self):
+        """
+        Set of "app_label.codename" global permissions the user has
+        directly, through tendenci groups or through django auth groups.
+        """
+        if self._permissions is None:
+            if not self.is_authenticated:
+                self._permissions = set()
+            else:
+                perms = Permission.objects.filter(
+                    Q(user=self.user) |
+                    Q(group_permissions__members=self.user) |
+                    Q(group__user=self.user)
+                    ).values_list('content_type__app_label', 'codename'
+                    ).order_by().distinct()
+                self._permissions = set(u"%s.%s" % (ct, name) for ct, name in perms)
+        return self._permissions
+
+    def _object_key(self, obj):
+        return ContentType.objects.get_for_model(obj).pk, obj.pk
+
+    def prefetch_object_permissions(self, objects):
+        """
+        Load the object permissions the user has on each of objects,
+        directly or through groups, with one query per content type.
+        Objects already loaded are skipped.
+        """
+        from tendenci.apps.perms.object_perms import ObjectPermission
+
+        object_ids = {}
+        for obj in objects:
+            if not isinstance(obj, Model) or obj.pk is None:
+                continue
+            key = self._object_key(obj)
+            if key not in self._object_perms:
+                object_ids.setdefault(key[0], set()).add(key[1])
+
+        for content_type_id, ids in object_ids.items():
+            perms = dict((pk, set()) for pk in ids)
+            group_perms = dict((pk, set()) for pk in ids)
+            if self.is_authenticated:
+                content_type = ContentType.objects.get_for_id(content_type_id)
+                q = Q(user=self.user)
+                if self.group_ids:
+                    q |= Q(group__in=self.group_ids)
+                rows = ObjectPermission.objects.filter(q,
+                            content_type=content_type_id,
+                            object_id__in=ids
+                            ).values_list('object_id', 'group_id', 'codename')
+                for object_id, group_id, codename in rows:
+                    perm = u"%s.%s.%s" % (object_id, content_type.app_label, codename)
+                    perms[object_id].add(perm)
+                    if group_id in self.group_ids:
+                        group_perms[object_id].add(perm)
+            for pk in ids:
+                self._object_perms[(content_type_id, pk)] = perms[pk]
+                self._group_object_perms[(content_type_id, pk)] = group_perms[pk]
+
+    def get_object_permissions(self, obj):
+        """
+        Set of "object_id.app_label.codename" permissions the user has
+        on obj, directly or through groups.
+        """
+        key = self._object_key(obj)
+        if key not in self._object_perms:
+            self.prefetch_object_permissions([obj])
+        return self._object_perms[key]
+
+    def get_group_object_permissions(self, obj):
+        """
+        Set of "object_id.app_label.codename" permissions the user has
+        on obj through groups.
+        """
+        key = self._object_key(obj)
+        if key not in self._group_object_perms:
+            self.prefetch_object_permissions([obj])
+        return self._group_object_perms[key]
+
+
+def get_user_context(user):
+    """
+    Returns the UserContext of user, creating it on first use.
+
+    It lives on the user object: the UserContextMiddleware drops it at
+    the end of each request. Code running outside of a request (commands,
+    tasks) must not rely on it staying current; call clear_user_context()
+    after changing the user's groups, memberships or permissions.
+    """
+    try:
+        return user._user_context
+    except AttributeError:
+        context = UserContext(user)
+        try:
+            user._user_context = context
+        except AttributeError:
+            pass
+        return context
+
+
+def clear_user_context(user):
+    """
+    Drops the UserContext kept on user, the next read loads it again.
+    """
+    try:
+        del user._user_context
+    except AttributeError:
+        pass
@@ -1,7 +1,4 @@
 from __future__ import print_function
-from haystack.query import SearchQuerySet
-from haystack.backends import SQ
-
 from django.contrib.auth.models import User
 from django.contrib.auth.models import Group as Auth_Group, Permission
 from django.contrib.contenttypes.models import ContentType
@@ -10,6 +7,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
 
 from tendenci.apps.perms.object_perms import ObjectPermission
+from tendenci.apps.perms.user_context import get_user_context
 
 
 PUBLIC_FILTER = {'status':True,'status_detail':"active",'allow_anonymous_view':True}
@@ -61,17 +59,16 @@ def update_perms_and_save(request, form, instance, **kwargs):
             instance.owner_username = request.user.username
 
     # save the instance because we need the primary key
-    if instance.pk:
-        ObjectPermission.objects.remove_all(instance)
-    else:
+    if not instance.pk:
         try:
             instance.save()
         except Exception as e:
             print('boom! in update_perms_and_save()', e)
 
-    # assign permissions for selected groups
-    if 'group_perms' in form.cleaned_data:
-        ObjectPermission.objects.assign_group(form.cleaned_data['group_perms'], instance)
+    # assign permissions for selected groups, remove the others
+    if instance.pk:
+        groups = form.cleaned_data.get('group_perms') or []
+        ObjectPermission.objects.bulk_replace([instance], [(group, None) for group in groups])
 
     # save again for indexing purposes
     # TODO: find a better solution, saving twice kinda sux
@@ -94,8 +91,6 @@ def assign_files_perms(instance, **kwargs):
         coupled_files = list(File.objects.filter(content_type=content_type, object_id=instance.pk))
         files = orphaned_files + coupled_files
 
-    file_ct = ContentType.objects.get_for_model(File)
-
     perm_attrs = []
 
     tmp_perm_attrs = [
@@ -112,27 +107,19 @@ def assign_files_perms(instance, **kwargs):
         if hasattr(instance, attr):
             perm_attrs.append(attr)
 
+    # copy instance group permissions to the files,
+    # replacing the group permissions they have
+    instance_perms = ObjectPermission.objects.filter(
+        content_type=content_type, object_id=instance.pk, group__isnull=False
+    ).select_related('group')
+    ObjectPermission.objects.bulk_replace(files,
+        [(p.group, p.codename.split('_')[0]) for p in instance_perms],
+        groups_only=True)
+
     for file in files:  # loop through media files and update
         if not file.object_id:  # pick up orphans
             file.object_id = instance.pk
 
-        # remove all group permissions on file
-        ObjectPermission.objects.filter(
-            content_type=file_ct, object_id=file.pk, group__isnull=False).delete()
-
-        # get all instance permissions [for copying]
-        instance_perms = ObjectPermission.objects.filter(
-            content_type=content_type, object_id=instance.pk, group__isnull=False
-        )
-
-        # copy instance group permissions to file
-        for file_perm in instance_perms:
-            file_perm.pk = None
-            file_perm.content_type = file_ct
-            file_perm.object_id = file.pk
-            file_perm.codename = '%s_%s' % (file_perm.codename.split('_')[0], 'file')
-            file_perm.save()
-
         # copy permission attributes
         for attr in perm_attrs:
             # example: file.status = instance.status
@@ -180,6 +167,18 @@ def has_perm(user, perm, obj=None):
         return user.has_perm(perm, obj)
 
 
+def prefetch_object_perms(user, objects):
+    """
+        Loads the object permissions of user on all objects at once
+        (one query per content type). Call it before checking has_perm
+        on each object of a list.
+    """
+    if hasattr(user, 'impersonated_user') and \
+            isinstance(user.impersonated_user, User):
+        get_user_context(user.impersonated_user).prefetch_object_permissions(objects)
+    get_user_context(user).prefetch_object_permissions(objects)
+
+
 def has_view_perm(user, perm, obj=None):
     """
     Method used in details views to check permissions faster on a single object.
@@ -194,11 +193,12 @@ def has_view_perm(user, perm, obj=None):
                 return True
             else:
                 return False
-        elif user.profile.is_superuser:
+        user_context = get_user_context(user)
+        if user_context.is_superuser:
             return True
         elif obj.creator_id == user.pk or obj.owner_id == user.pk:
             return True
-        elif user.profile.is_member and obj.status and obj.status_detail in active_status_details \
+        elif user_context.is_member and obj.status and obj.status_detail in active_status_details \
                     and (obj.allow_anonymous_view or obj.allow_user_view or obj.allow_member_view):
             return True
         elif obj.status and obj.status_detail in active_status_details \
@@ -209,6 +209,50 @@ def has_view_perm(user, perm, obj=None):
     return False
 
 
+# "app_label.codename" -> content type id of the permission
+_perm_content_type_ids = {}
+
+
+def get_perm_content_type_id(perm):
+    """
+    Returns the id of the content type of the "app_label.codename"
+    permission, or None if there is no such permission.
+    """
+    if perm not in _perm_content_type_ids:
+        app_label, codename = perm.split('.', 1)
+        _perm_content_type_ids[perm] = Permission.objects.filter(
+            content_type__app_label=app_label, codename=codename
+            ).values_list('content_type_id', flat=True).first()
+    return _perm_content_type_ids[perm]
+
+
+def get_group_perm_filters(perm, group_ids):
+    """
+    Q for the objects on which one of the groups has the object
+    permission perm.
+
+    It's a semi-join (pk IN ...) on the content_type, codename, group,
+    object_id index of ObjectPermission, so unlike a join on the perms
+    relation it doesn't return duplicate rows and needs no DISTINCT.
+    """
+    content_type_id = None
+    if '.' in perm:
+        content_type_id = get_perm_content_type_id(perm)
+
+    if not content_type_id:
+        # can't tell the model from perm, join on the perms relation
+        group_q = Q(perms__group__in=group_ids)
+        if '.' in perm:
+            group_q &= Q(perms__codename=perm.split(".")[-1])
+        return group_q
+
+    object_ids = ObjectPermission.objects.filter(
+                        content_type=content_type_id,
+                        codename=perm.split(".")[-1],
+                        group__in=group_ids).values('object_id')
+    return Q(pk__in=object_ids)
+
+
 def get_query_filters(user, perm, **kwargs):
     """
     Method to generate search query filters for different user types.
@@ -249,12 +293,12 @@ def get_query_filters(user, perm, **kwargs):
                 status_detail_q = Q(status_detail='active')
 
                 if perms_field:
-                    group_ids = [int(g.group.id) for g in user.group_member.select_related('group')]
-                    group_q = Q(perms__group__in=group_ids)
+                    group_ids = get_user_context(user).group_ids
+                    group_q = get_group_perm_filters(perm, group_ids)
 
                 creator_perm_q = Q(creator=user)
                 owner_perm_q = Q(owner=user)
-                member_filter = (status_q & (((anon_q | user_q | member_q | (group_q & group_perm)) & status_detail_q) | (creator_perm_q | owner_perm_q)))
+                member_filter = (status_q & (((anon_q | user_q | member_q | group_q) & status_detail_q) | (creator_perm_q | owner_perm_q)))
 
                 return member_filter
             else:
@@ -264,12 +308,12 @@ def get_query_filters(user, perm, **kwargs):
                 status_detail_q = Q(status_detail='active')
 
                 if perms_field:
-                    group_ids = [int(g.group.id) for g in user.group_member.select_related('group')]
-                    group_q = Q(perms__group__in=group_ids)
+                    group_ids = get_user_context(user).group_ids
+                    group_q = get_group_perm_filters(perm, group_ids)
 
                 creator_perm_q = Q(creator=user)
                 owner_perm_q = Q(owner=user)
-                user_filter = (status_q & (((anon_q | user_q | (group_q & group_perm)) & status_detail_q) | (creator_perm_q | owner_perm_q)))
+                user_filter = (status_q & (((anon_q | user_q | group_q) & status_detail_q) | (creator_perm_q | owner_perm_q)))
 
                 return user_filter
 
@@ -325,42 +369,12 @@ def update_admin_group_perms():
     auth_group.save()
 
 
-def _specific_view(user, obj):
-    """
-    determines if a user has specific permissions to view the object.
-    note this is based only on:
-
-    (users_can_view contains user)
-    +
-    (groups_can_view contains one of user's groups)
-    """
-    sqs = SearchQuerySet()
-    sqs = sqs.models(obj.__class__)
-
-    groups = [g.pk for g in user.group_set.all()]
-
-    q_primary_key = SQ(primary_key=obj.pk)
-    q_groups = SQ(groups_can_view__in=groups)
-    q_users = SQ(users_can_view__in=[user.pk])
-
-    if groups:
-        sqs = sqs.filter(q_primary_key & (q_groups | q_users))
-    else:
-        sqs = sqs.filter(q_primary_key & q_users)
-
-    if sqs:
-        # Make sure the index isn't doing something unexpected with the query,
-        # like when the Whoosh StopFilter caused the primary_key portion of the
-        # query to be ignored.
-        assert len(sqs) == 1, "Index returned an unexpected result set when searching for view permissions on an object"
-        return True
-
-    return False
-
-
 def can_view(user, obj):
     """
-    Checks for tendenci specific permissions to viewing objects
-    through the search index
+    Checks for tendenci specific permissions to viewing objects:
+    the view permission given to the user or one of his/her groups
+    on the object level.
     """
-    return _specific_view(user, obj)
+    from tendenci.apps.perms.cache import has_object_perm
+    return has_object_perm(user, obj, '%s.view_%s' % (obj._meta.app_label,
+                                                       obj._meta.model_name))
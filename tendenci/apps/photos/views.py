@@ -30,7 +30,8 @@ from tendenci.apps.perms.decorators import is_enabled
 from tendenci.apps.perms.utils import has_perm, update_perms_and_save, assign_files_perms, get_query_filters, has_view_perm
 from tendenci.apps.site_settings.utils import get_setting
 from tendenci.apps.event_logs.models import EventLog
-from tendenci.apps.files.utils import get_image, aspect_ratio, generate_image_cache_key
+from tendenci.apps.files.derivatives import get_derivative
+from tendenci.apps.files.utils import aspect_ratio, generate_image_cache_key
 from tendenci.apps.user_groups.models import Group
 from djcelery.models import TaskMeta
 
@@ -217,16 +218,14 @@ def photo_size(request, id, size, crop=False, quality=90, download=False, constr
     if not photo.image or not default_storage.exists(photo.image.name):
         raise Http404
 
-    # gets resized image from cache or rebuild
-    image = get_image(photo.image, size, PHOTO_PRE_KEY, crop=crop, quality=quality, unique_key=str(photo.pk), constrain=constrain)
-
-    # if image not rendered; quit
-    if not image:
+    # gets the resized image from the derivatives or builds it
+    try:
+        binary = get_derivative(photo.image, size, crop=crop, quality=quality, format='JPEG')
+    except IOError:  # image not rendered; quit
         raise Http404
 
-    response = HttpResponse(content_type='image/jpeg')
+    response = HttpResponse(binary, content_type='image/jpeg')
     response['Content-Disposition'] = '%s filename="%s"' % (attachment, photo.image_filename())
-    image.convert('RGB').save(response, "JPEG", quality=quality)
 
     if photo.is_public_photo() and photo.is_public_photoset():
         file_name = photo.image_filename()
@@ -426,13 +425,11 @@ def photoset_edit(request, id, form_class=PhotoSetEditForm, template_name="photo
                 Image.objects.filter(photoset=photo_set).update(**get_privacy_settings(photo_set))
 
                 # photo set group permissions
-                group_perms = photo_set.perms.filter(group__isnull=False).values_list('group','codename')
-                group_perms = tuple([(unicode(g), c.split('_')[0]) for g, c in group_perms ])
+                group_perms = photo_set.perms.filter(group__isnull=False).select_related('group')
+                group_perms = [(p.group, p.codename.split('_')[0]) for p in group_perms]
 
                 photos = Image.objects.filter(photoset=photo_set)
-                for photo in photos:
-                    ObjectPermission.objects.remove_all(photo)
-                    ObjectPermission.objects.assign_group(group_perms, photo)
+                ObjectPermission.objects.bulk_replace(photos, group_perms)
 
                 messages.add_message(request, messages.SUCCESS, _("Successfully updated photo set! "))
 
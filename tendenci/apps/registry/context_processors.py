@@ -1,6 +1,8 @@
 from tendenci.apps.registry.sites import site
+from tendenci.apps.base.lazy_context import lazy_context_processor
 
 
+@lazy_context_processor(registered_apps=None)
 def registered_apps(request):
     """
     Context processor to display registered apps
@@ -23,6 +25,7 @@ def registered_apps(request):
     return contexts
 
 
+@lazy_context_processor(enabled_addons=None)
 def enabled_addons(request):
     """
     Context processor that further filters registered apps
@@ -2,6 +2,10 @@ from tendenci.apps.registry.exceptions import AlreadyRegistered, NotRegistered
 from tendenci.apps.registry.utils import RegisteredApps
 from tendenci.apps.registry.cache import cache_reg_apps, get_reg_apps, delete_reg_apps_cache
 from django.utils.translation import ugettext_lazy as _
+from tendenci.apps.site_settings.utils import get_local_settings, clear_local_settings
+
+# key of the built RegisteredApps in the in-process settings memory
+LOCAL_APPS_KEY = 'registry.registered_apps'
 
 
 class RegistrySite(object):
@@ -34,6 +38,7 @@ class RegistrySite(object):
         self._registry[model] = registry_class(model)
 
         #reset cache of the registered apps
+        clear_local_settings()
         delete_reg_apps_cache()
         cache_reg_apps(self.get_registered_apps())
 
@@ -46,16 +51,28 @@ class RegistrySite(object):
         del(self._registry[model])
 
         #reset cache of the registered apps
+        clear_local_settings()
         delete_reg_apps_cache()
         cache_reg_apps(self.get_registered_apps())
 
     def get_registered_apps(self):
+        """
+        The built RegisteredApps is kept in process memory alongside the
+        site settings, so it is only rebuilt when a setting (such as a
+        module's enabled setting) changes or an app is registered.
+        """
+        local_settings = get_local_settings()
+        apps = local_settings.get(LOCAL_APPS_KEY)
+        if apps is not None:
+            return apps
+
         cached_apps = get_reg_apps()
         if cached_apps:
             #build RegisteredApps object from the cache
             apps = RegisteredApps(cached_apps, build_from_cache=True)
         else:
             apps = RegisteredApps(self._registry)
+        local_settings[LOCAL_APPS_KEY] = apps
         return apps
 
 site = RegistrySite()
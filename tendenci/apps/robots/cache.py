@@ -1,3 +1,5 @@
+import uuid
+
 from django.core.cache import cache
 from django.conf import settings
 
@@ -13,3 +15,30 @@ def cache_all_robots():
 
     robots = Robot.objects.all()
     cache.set(key, robots)
+
+
+def get_robots_version():
+    """
+    Returns the version stamp of the robot table. It changes
+    whenever a Robot is saved or deleted.
+    """
+    keys = [settings.CACHE_PRE_KEY, CACHE_PRE_KEY, 'version']
+    key = '.'.join(keys)
+
+    version = cache.get(key)
+    if not version:
+        version = uuid.uuid4().hex
+        cache.set(key, version)
+    return version
+
+
+def bump_robots_version(**kwargs):
+    """
+    Invalidates the cached robot queryset and the compiled robot
+    matchers of every process. Connected to Robot save and delete.
+    """
+    keys = [settings.CACHE_PRE_KEY, CACHE_PRE_KEY, 'all']
+    cache.delete('.'.join(keys))
+
+    keys = [settings.CACHE_PRE_KEY, CACHE_PRE_KEY, 'version']
+    cache.set('.'.join(keys), uuid.uuid4().hex)
@@ -3,12 +3,16 @@ from django.core.cache import cache
 from django.conf import settings
 from django.db.models.query import QuerySet
 
-from tendenci.apps.robots.cache import CACHE_PRE_KEY, cache_all_robots
+from tendenci.apps.robots.cache import CACHE_PRE_KEY, cache_all_robots, get_robots_version
+from tendenci.apps.robots.matcher import RobotMatcher
 
 
 class RobotManager(Manager):
-    def get_by_agent(self, user_agent):
+    # compiled matcher for this process, rebuilt when the
+    # robots version stamp in the shared cache changes
+    _matcher = None
 
+    def get_all_cached(self):
         keys = [settings.CACHE_PRE_KEY, CACHE_PRE_KEY, 'all']
         key = '.'.join(keys)
 
@@ -16,7 +20,18 @@ class RobotManager(Manager):
         if not (robots and isinstance(robots, QuerySet)):
             cache_all_robots()
             robots = cache.get(key, [])
+        return robots
+
+    def get_matcher(self):
+        version = get_robots_version()
+        matcher = RobotManager._matcher
+        if matcher is None or matcher.version != version:
+            matcher = RobotMatcher(self.get_all_cached(), version=version,
+                        max_size=getattr(settings, 'ROBOTS_MATCHER_CACHE_SIZE', 1000))
+            RobotManager._matcher = matcher
+        return matcher
 
+    def get_by_agent(self, user_agent):
         # UnicodeDecodeError: 'ascii' codec can't decode byte 0xf3
         # http://stackoverflow.com/questions/2392732/sqlite-python-unicode-and-non-utf-data
         try:
@@ -24,7 +39,4 @@ class RobotManager(Manager):
         except TypeError:
             pass
 
-        for robot in robots:
-            if robot.name.lower() in user_agent.lower():
-                return robot
-        return None
+        return self.get_matcher().get(user_agent)
@@ -0,0 +1,62 @@
+import re
+import threading
+from collections import OrderedDict
+
+
+class RobotMatcher(object):
+    """
+    Matches user agents against the names of a list of robots.
+
+    The names are compiled into one alternation regex, so a user agent
+    that is not a robot (the common case) costs a single scan instead
+    of one substring test per robot. When the regex does match, the
+    robots are checked in their original order so the same robot as a
+    plain linear scan is returned.
+
+    Results are kept in a bounded LRU map from user agent to robot id.
+    """
+    def __init__(self, robots, version=None, max_size=1000):
+        self.version = version
+        self.max_size = max_size
+        self.robots = [(robot.name.lower(), robot) for robot in robots]
+        self.robots_by_id = dict((robot.pk, robot) for name, robot in self.robots)
+        self.regex = None
+        if self.robots:
+            names = sorted(set(name for name, robot in self.robots),
+                           key=len, reverse=True)
+            self.regex = re.compile('|'.join(re.escape(name) for name in names))
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+
+    def match(self, user_agent):
+        """
+        Returns the id of the first robot whose name is
+        contained in the lowercased user_agent, or None.
+        """
+        if self.regex is None:
+            return None
+
+        user_agent = user_agent.lower()
+        if not self.regex.search(user_agent):
+            return None
+        for name, robot in self.robots:
+            if name in user_agent:
+                return robot.pk
+        return None
+
+    def get(self, user_agent):
+        """
+        Returns the matching robot for user_agent, or None.
+        """
+        with self.lock:
+            try:
+                robot_id = self.lru.pop(user_agent)
+            except KeyError:
+                robot_id = self.match(user_agent)
+                if len(self.lru) >= self.max_size:
+                    self.lru.popitem(last=False)
+            self.lru[user_agent] = robot_id
+
+        if robot_id is None:
+            return None
+        return self.robots_by_id.get(robot_id)
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import ugettext_lazy as _
 
 from tendenci.apps.robots.managers import RobotManager
+from tendenci.apps.robots.cache import bump_robots_version
 
 
 STATUS_CHOICES = (('active',_('Active')),('inactive',_('Inactive')),)
@@ -20,3 +22,7 @@ class Robot(models.Model):
 
     def __unicode__(self):
         return self.name
+
+
+post_save.connect(bump_robots_version, sender=Robot, weak=False)
+post_delete.connect(bump_robots_version, sender=Robot, weak=False)
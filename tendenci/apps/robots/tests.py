@@ -0,0 +1,56 @@
+from django.test import TestCase
+
+from tendenci.apps.robots.models import Robot
+
+
+USER_AGENTS = [
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'msnbot/2.0b (+http://search.msn.com/msnbot.htm)',
+    'Mozilla/5.0 (compatible; Yahoo! Slurp; http://help.yahoo.com/help/us/ysearch/slurp)',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 10_3 like Mac OS X) AppleWebKit/603.1.30 '
+    '(KHTML, like Gecko) Version/10.0 Mobile/14E277 Safari/602.1',
+    'GOOGLEBOT',
+    '',
+]
+
+
+class RobotMatcherTest(TestCase):
+    fixtures = ['initial_data.json']
+
+    def get_by_agent_linear(self, user_agent):
+        """
+        The matching of get_by_agent before the compiled matcher.
+        """
+        for robot in Robot.objects.all():
+            if robot.name.lower() in user_agent.lower():
+                return robot
+        return None
+
+    def test_same_robots_as_linear_scan(self):
+        self.assertTrue(Robot.objects.exists())
+        for user_agent in USER_AGENTS:
+            self.assertEqual(Robot.objects.get_by_agent(user_agent),
+                             self.get_by_agent_linear(user_agent))
+
+    def test_known_robots(self):
+        robot = Robot.objects.get_by_agent(USER_AGENTS[0])
+        self.assertEqual(robot.name, 'Googlebot')
+        robot = Robot.objects.get_by_agent(USER_AGENTS[1])
+        self.assertEqual(robot.name, 'msnbot')
+
+    def test_browsers_and_empty_user_agent(self):
+        for user_agent in USER_AGENTS[3:5] + ['']:
+            self.assertIsNone(Robot.objects.get_by_agent(user_agent))
+
+    def test_save_invalidates_matcher(self):
+        user_agent = 'TestCrawler/1.0 (+http://example.com/crawler)'
+        self.assertIsNone(Robot.objects.get_by_agent(user_agent))
+
+        robot = Robot.objects.create(name='TestCrawler', url='http://example.com/crawler',
+                                     version='1.0')
+        self.assertEqual(Robot.objects.get_by_agent(user_agent), robot)
+
+        robot.delete()
+        self.assertIsNone(Robot.objects.get_by_agent(user_agent))
@@ -0,0 +1,669 @@
+"""
+Haystack backend on an embedded SQLite FTS5 index file, the default
+search engine:
+
+    HAYSTACK_CONNECTIONS = {
+        'default': {
+            'ENGINE': 'tendenci.apps.search.backends.sqlite_backend.SQLiteEngine',
+            'PATH': '/path/to/search_index.sqlite3',
+        }
+    }
+
+Each indexed document is a row of the documents table with its stored
+fields as JSON, every field value is a row of the fields table
+(indexed by name and value, one row per value of multi-value fields
+such as users_can_view) and the document text is in the fts table,
+an FTS5 table ranked with bm25.
+
+The SQLite library Python is linked with must be built with FTS5,
+otherwise the engine falls back to SimpleEngine and logs a warning.
+Searches only return what is in the index: run rebuild_index after
+switching to this backend, a warning is logged when the index is
+empty.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import six, tree
+from django.utils.encoding import force_text, force_str
+
+from haystack.backends import BaseEngine, BaseSearchBackend, BaseSearchQuery, log_query
+from haystack.backends.simple_backend import SimpleSearchBackend, SimpleSearchQuery
+from haystack.constants import DJANGO_CT, DJANGO_ID, ID, VALID_FILTERS, FILTER_SEPARATOR
+from haystack.exceptions import MissingDependency, SkipDocument
+from haystack.inputs import BaseInput, AutoQuery, Exact, Not, Raw
+from haystack.models import SearchResult
+from haystack.utils import get_identifier, get_model_ct
+from haystack.utils import log as logging
+from haystack.utils.app_loading import haystack_get_model
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    django_ct TEXT NOT NULL,
+    django_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_django_ct ON documents (django_ct);
+CREATE TABLE IF NOT EXISTS fields (
+    doc INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value
+);
+CREATE INDEX IF NOT EXISTS fields_name_value ON fields (name, value, doc);
+CREATE INDEX IF NOT EXISTS fields_doc ON fields (doc, name);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(
+    text, tokenize = 'porter unicode61 remove_diacritics 1'
+);
+"""
+
+DOCUMENT_COLUMNS = {
+    ID: 'd.id',
+    DJANGO_CT: 'd.django_ct',
+    DJANGO_ID: 'd.django_id',
+}
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+DATE_FORMAT = '%Y-%m-%d'
+
+AUTO_QUERY_RE = re.compile(r'"(?P<phrase>.*?)"')
+
+SNIPPET_TOKENS = 32
+
+_has_fts5 = None
+
+
+def has_fts5():
+    """
+    Returns True if the SQLite library Python is linked with
+    has FTS5, checked once per process.
+    """
+    global _has_fts5
+    if _has_fts5 is None:
+        conn = sqlite3.connect(':memory:')
+        try:
+            conn.execute('CREATE VIRTUAL TABLE fts5_check USING fts5(text)')
+            _has_fts5 = True
+        except sqlite3.OperationalError:
+            _has_fts5 = False
+        finally:
+            conn.close()
+    return _has_fts5
+
+
+def fts_string(term):
+    """
+    Quotes a term for an FTS5 query, so that user input
+    can't use the query syntax.
+    """
+    return u'"%s"' % term.replace(u'"', u'""')
+
+
+def like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class CompiledQuery(object):
+    """
+    The query a SQLiteSearchQuery builds for the backend: a WHERE
+    clause over the documents table (d) and, if the query has
+    full text conditions at its top level, the FTS5 expression that
+    drives and ranks the search.
+    """
+    def __init__(self, where='', params=None, match=None):
+        self.where = where
+        self.params = params or []
+        self.match = match or []
+
+    @property
+    def match_expression(self):
+        if not self.match:
+            return ''
+        return u' AND '.join(u'(%s)' % m for m in self.match)
+
+    def __str__(self):
+        return force_str(u'%s %s' % (self.match_expression or u'*', self.where))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+
+    def __init__(self, connection_alias, **connection_options):
+        super(SQLiteSearchBackend, self).__init__(connection_alias, **connection_options)
+        self.path = connection_options.get('PATH')
+        if not self.path:
+            raise ImproperlyConfigured(
+                "You must specify a 'PATH' in your settings for connection '%s'." % connection_alias)
+        self._local = threading.local()
+        self.log = logging.getLogger('haystack')
+
+    @property
+    def unified_index(self):
+        from haystack import connections
+        return connections[self.connection_alias].get_unified_index()
+
+    def get_connection(self):
+        """
+        Returns the sqlite connection of this thread (and process),
+        creating the index file and its tables on first use.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        try:
+            conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            if 'fts5' in str(e):
+                raise MissingDependency(
+                    "The sqlite backend requires an SQLite library built with FTS5.")
+            raise
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self.check_empty(conn)
+        return conn
+
+    def check_empty(self, conn):
+        """
+        Logs a warning, once per process, if the index has no
+        documents: searches return nothing until it is built.
+        """
+        if getattr(self, '_checked_empty', False):
+            return
+        self._checked_empty = True
+        if conn.execute('SELECT 1 FROM documents LIMIT 1').fetchone() is None:
+            self.log.warning(
+                "The search index %s is empty. Run 'python manage.py rebuild_index' to build it, "
+                "or 'python manage.py process_unindexed' to index the queued objects.", self.path)
+
+    # Values
+
+    def to_db(self, value):
+        """
+        Converts a field value to what is stored in the fields table
+        and compared in filters.
+        """
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, datetime):
+            return value.strftime(DATETIME_FORMAT)
+        if isinstance(value, date):
+            return value.strftime(DATE_FORMAT)
+        if isinstance(value, six.integer_types + (float,)):
+            return value
+        if isinstance(value, Decimal):
+            return float(value)
+        return force_text(value)
+
+    def to_json(self, value):
+        if isinstance(value, (list, tuple, set)):
+            return [self.to_json(v) for v in value]
+        if value is None or isinstance(value, bool):
+            return value
+        return self.to_db(value)
+
+    # Indexing
+
+    def update(self, index, iterable, commit=True):
+        conn = self.get_connection()
+        document_field = self.unified_index.document_field
+
+        try:
+            with conn:
+                for obj in iterable:
+                    try:
+                        doc = index.full_prepare(obj)
+                    except SkipDocument:
+                        self.log.debug(u"Indexing for object `%s` skipped", obj)
+                        continue
+                    self._write_document(conn, doc, document_field)
+        except sqlite3.Error as e:
+            if not self.silently_fail:
+                raise
+            self.log.error(u"Failed to add documents to the sqlite index: %s", e, exc_info=True)
+
+    def _write_document(self, conn, doc, document_field):
+        row = conn.execute('SELECT rowid FROM documents WHERE id = ?', (doc[ID],)).fetchone()
+        if row:
+            self._delete_rowids(conn, [row[0]])
+
+        stored = {}
+        values = []
+        for name, value in doc.items():
+            if name in (ID, DJANGO_CT, DJANGO_ID, document_field) or name == 'boost':
+                continue
+            stored[name] = self.to_json(value)
+            if not isinstance(value, (list, tuple, set)):
+                value = [value]
+            values.extend((name, self.to_db(v)) for v in value if v is not None)
+
+        cursor = conn.execute(
+            'INSERT INTO documents (id, django_ct, django_id, data) VALUES (?, ?, ?, ?)',
+            (doc[ID], doc[DJANGO_CT], force_text(doc[DJANGO_ID]), json.dumps(stored)))
+        rowid = cursor.lastrowid
+        conn.executemany('INSERT INTO fields (doc, name, value) VALUES (?, ?, ?)',
+                         [(rowid, name, value) for name, value in values])
+        conn.execute('INSERT INTO fts (rowid, text) VALUES (?, ?)',
+                     (rowid, force_text(doc.get(document_field) or u'')))
+
+    def _delete_rowids(self, conn, rowids):
+        for i in range(0, len(rowids), 500):
+            chunk = rowids[i:i + 500]
+            marks = ', '.join('?' * len(chunk))
+            conn.execute('DELETE FROM fields WHERE doc IN (%s)' % marks, chunk)
+            conn.execute('DELETE FROM fts WHERE rowid IN (%s)' % marks, chunk)
+            conn.execute('DELETE FROM documents WHERE rowid IN (%s)' % marks, chunk)
+
+    def remove(self, obj_or_string, commit=True):
+        conn = self.get_connection()
+        doc_id = get_identifier(obj_or_string)
+        try:
+            with conn:
+                row = conn.execute('SELECT rowid FROM documents WHERE id = ?', (doc_id,)).fetchone()
+                if row:
+                    self._delete_rowids(conn, [row[0]])
+        except sqlite3.Error as e:
+            if not self.silently_fail:
+                raise
+            self.log.error("Failed to remove document '%s' from the sqlite index: %s", doc_id, e, exc_info=True)
+
+    def clear(self, models=None, commit=True):
+        conn = self.get_connection()
+        try:
+            with conn:
+                if not models:
+                    conn.execute('DELETE FROM fields')
+                    conn.execute('DELETE FROM fts')
+                    conn.execute('DELETE FROM documents')
+                else:
+                    cts = [get_model_ct(model) for model in models]
+                    rowids = [row[0] for row in conn.execute(
+                        'SELECT rowid FROM documents WHERE django_ct IN (%s)' % ', '.join('?' * len(cts)),
+                        cts)]
+                    self._delete_rowids(conn, rowids)
+        except sqlite3.Error as e:
+            if not self.silently_fail:
+                raise
+            self.log.error("Failed to clear the sqlite index: %s", e, exc_info=True)
+
+    # Searching
+
+    def build_models_filter(self, models=None, limit_to_registered_models=None):
+        if limit_to_registered_models is None:
+            limit_to_registered_models = getattr(settings, 'HAYSTACK_LIMIT_TO_REGISTERED_MODELS', True)
+
+        if models:
+            cts = sorted(get_model_ct(model) for model in models)
+        elif limit_to_registered_models:
+            cts = self.build_models_list()
+        else:
+            return '', []
+
+        if not cts:
+            return '0', []
+        return 'd.django_ct IN (%s)' % ', '.join('?' * len(cts)), cts
+
+    def build_narrow_filter(self, narrow_query):
+        """
+        Narrow queries (e.g. selected facets) are "field:value" strings.
+        """
+        field, _, value = narrow_query.partition(':')
+        value = value.strip().strip('"')
+        if field in DOCUMENT_COLUMNS:
+            return '%s = ?' % DOCUMENT_COLUMNS[field], [value]
+        return ('EXISTS (SELECT 1 FROM fields f WHERE f.doc = d.rowid '
+                'AND f.name = ? AND f.value = ?)'), [field, value]
+
+    def build_order_by(self, sort_by, ranked):
+        order_by, params = [], []
+        for field in sort_by or []:
+            direction = 'ASC'
+            if field.startswith('-'):
+                field, direction = field[1:], 'DESC'
+
+            if field == 'score':
+                if ranked:
+                    order_by.append('score %s' % direction)
+            elif field in DOCUMENT_COLUMNS:
+                order_by.append('%s %s' % (DOCUMENT_COLUMNS[field], direction))
+            else:
+                order_by.append('(SELECT MIN(f.value) FROM fields f WHERE f.doc = d.rowid '
+                                'AND f.name = ?) %s' % direction)
+                params.append(field)
+
+        if ranked and not sort_by:
+            order_by.append('score DESC')
+        order_by.append('d.rowid DESC')
+        return ', '.join(order_by), params
+
+    @log_query
+    def search(self, query_string, sort_by=None, start_offset=0, end_offset=None,
+               fields='', highlight=False, facets=None, date_facets=None, query_facets=None,
+               narrow_queries=None, spelling_query=None, within=None,
+               dwithin=None, distance_point=None, models=None,
+               limit_to_registered_models=None, result_class=None, **kwargs):
+
+        if not isinstance(query_string, CompiledQuery):
+            # raw_search() and more_like_this() pass FTS5 query strings
+            query_string = force_text(query_string or '').strip()
+            if query_string in ('', '*'):
+                query_string = CompiledQuery()
+            else:
+                query_string = CompiledQuery(match=[query_string])
+
+        match = query_string.match_expression
+        if match:
+            from_clause = 'fts JOIN documents d ON d.rowid = fts.rowid'
+            where, params = ['fts MATCH ?'], [match]
+            score = '-bm25(fts)'
+        else:
+            from_clause = 'documents d'
+            where, params = [], []
+            score = '0'
+
+        if query_string.where:
+            where.append(query_string.where)
+            params.extend(query_string.params)
+
+        models_filter, models_params = self.build_models_filter(models, limit_to_registered_models)
+        if models_filter:
+            where.append(models_filter)
+            params.extend(models_params)
+
+        for narrow_query in narrow_queries or []:
+            narrow_filter, narrow_params = self.build_narrow_filter(narrow_query)
+            where.append(narrow_filter)
+            params.extend(narrow_params)
+
+        where = ' AND '.join('(%s)' % w for w in where) or '1'
+        order_by, order_params = self.build_order_by(sort_by, bool(match))
+
+        limit = -1
+        if end_offset is not None:
+            limit = max(end_offset - start_offset, 0)
+
+        try:
+            conn = self.get_connection()
+            hits = conn.execute('SELECT COUNT(*) FROM %s WHERE %s' % (from_clause, where),
+                                params).fetchone()[0]
+            rows = conn.execute(
+                'SELECT d.rowid, d.django_ct, d.django_id, d.data, %s AS score '
+                'FROM %s WHERE %s ORDER BY %s LIMIT ? OFFSET ?' % (score, from_clause, where, order_by),
+                params + order_params + [limit, start_offset]).fetchall()
+
+            snippets = {}
+            if highlight and match and rows:
+                snippets = self.get_snippets(conn, match, [row[0] for row in rows])
+
+            field_facets = {}
+            for field, options in (facets or {}).items():
+                field_facets[field] = self.get_facet_counts(conn, from_clause, where, params,
+                                                            field, options)
+        except sqlite3.Error as e:
+            if not self.silently_fail:
+                raise
+            self.log.error("Failed to query the sqlite index using '%s': %s", query_string, e, exc_info=True)
+            return {'results': [], 'hits': 0}
+
+        results = self.process_results(rows, snippets, result_class)
+        return {
+            'results': results,
+            'hits': hits - (len(rows) - len(results)),
+            'facets': {'fields': field_facets, 'dates': {}, 'queries': {}},
+            'spelling_suggestion': None,
+        }
+
+    def get_snippets(self, conn, match, rowids):
+        rows = conn.execute(
+            "SELECT rowid, snippet(fts, 0, '<em>', '</em>', '...', %d) FROM fts "
+            "WHERE fts MATCH ? AND rowid IN (%s)" % (SNIPPET_TOKENS, ', '.join('?' * len(rowids))),
+            [match] + rowids)
+        return dict(rows)
+
+    def get_facet_counts(self, conn, from_clause, where, params, field, options):
+        limit = options.get('limit', 100)
+        if limit is None or limit < 0:
+            limit = -1
+        mincount = options.get('mincount', 1)
+
+        if field in DOCUMENT_COLUMNS:
+            sql = ('SELECT %s, COUNT(*) FROM %s WHERE %s GROUP BY 1 HAVING COUNT(*) >= ? '
+                   'ORDER BY 2 DESC LIMIT ?' % (DOCUMENT_COLUMNS[field], from_clause, where))
+            facet_params = params + [mincount, limit]
+        else:
+            sql = ('SELECT f.value, COUNT(DISTINCT d.rowid) FROM %s '
+                   'JOIN fields f ON f.doc = d.rowid AND f.name = ? WHERE %s '
+                   'GROUP BY 1 HAVING COUNT(DISTINCT d.rowid) >= ? '
+                   'ORDER BY 2 DESC LIMIT ?' % (from_clause, where))
+            facet_params = [field] + params + [mincount, limit]
+        return [(value, count) for value, count in conn.execute(sql, facet_params)]
+
+    def process_results(self, rows, snippets=None, result_class=None):
+        result_class = result_class or SearchResult
+        unified_index = self.unified_index
+        indexed_models = unified_index.get_indexed_models()
+        document_field = unified_index.document_field
+
+        results = []
+        for rowid, django_ct, django_id, data, score in rows:
+            app_label, model_name = django_ct.split('.')
+            model = haystack_get_model(app_label, model_name)
+            if not model or model not in indexed_models:
+                continue
+
+            index = unified_index.get_index(model)
+            additional_fields = {}
+            for key, value in json.loads(data).items():
+                key = str(key)
+                field = index.fields.get(key)
+                if field is not None and value is not None and not field.is_multivalued:
+                    value = field.convert(value)
+                additional_fields[key] = value
+
+            if snippets and rowid in snippets:
+                additional_fields['highlighted'] = {document_field: [snippets[rowid]]}
+
+            results.append(result_class(app_label, model_name, django_id, score or 0,
+                                        **additional_fields))
+        return results
+
+
+class SQLiteSearchQuery(BaseSearchQuery):
+
+    def __str__(self):
+        return str(self.build_query())
+
+    def build_query(self):
+        compiled = CompiledQuery()
+        compiled.where, compiled.params = self.build_node(self.query_filter, compiled, top=True)
+        return compiled
+
+    def matching_all_fragment(self):
+        return CompiledQuery()
+
+    def split_expression(self, expression):
+        parts = expression.split(FILTER_SEPARATOR)
+        field = parts[0]
+        if len(parts) == 1 or parts[-1] not in VALID_FILTERS:
+            filter_type = 'contains'
+        else:
+            filter_type = parts.pop()
+        return field, filter_type
+
+    def build_node(self, node, compiled, top=False, negated=False):
+        """
+        Compiles a SQ (or Q) tree to a WHERE clause. Full text filters
+        that all results must match (the top level ANDs) are moved to
+        compiled.match so that the FTS5 index drives the search.
+        """
+        negated = negated != node.negated
+        top = top and not negated and (node.connector == 'AND' or len(node.children) == 1)
+
+        parts, params = [], []
+        for child in node.children:
+            if isinstance(child, tree.Node):
+                sql, child_params = self.build_node(child, compiled, top=top, negated=negated)
+            else:
+                expression, value = child
+                field, filter_type = self.split_expression(expression)
+                sql, child_params = self.build_filter(field, filter_type, value, compiled, top=top)
+            if sql:
+                parts.append('(%s)' % sql)
+                params.extend(child_params)
+
+        if not parts:
+            return '', []
+        sql = (' %s ' % node.connector).join(parts)
+        if node.negated:
+            sql = 'NOT (%s)' % sql
+        return sql, params
+
+    def is_content_field(self, field):
+        return field in ('content', self.backend.unified_index.document_field)
+
+    def build_filter(self, field, filter_type, value, compiled, top=False):
+        if self.is_content_field(field):
+            positive, negative = self.build_match(filter_type, value)
+            if top and positive:
+                if negative:
+                    positive = u'%s NOT (%s)' % (positive, negative)
+                compiled.match.append(positive)
+                return '', []
+
+            sql, params = [], []
+            if positive:
+                sql.append('d.rowid IN (SELECT rowid FROM fts WHERE fts MATCH ?)')
+                params.append(positive)
+            if negative:
+                sql.append('d.rowid NOT IN (SELECT rowid FROM fts WHERE fts MATCH ?)')
+                params.append(negative)
+            return ' AND '.join(sql), params
+
+        negate = isinstance(value, Not)
+        sql, params = self.build_field_filter(field, filter_type, value)
+        if negate and sql:
+            sql = 'NOT (%s)' % sql
+        return sql, params
+
+    def build_match(self, filter_type, value):
+        """
+        Returns the FTS5 expressions of the terms a document must
+        and must not contain.
+        """
+        if isinstance(value, Raw):
+            return force_text(value.query_string), ''
+        if isinstance(value, AutoQuery):
+            query_string = force_text(value.query_string)
+            phrases = AUTO_QUERY_RE.findall(query_string)
+            positive, negative = [fts_string(p) for p in phrases if p.strip()], []
+            for token in AUTO_QUERY_RE.sub(' ', query_string).split():
+                if token.startswith('-') and len(token) > 1:
+                    negative.append(fts_string(token[1:]))
+                elif token != '-':
+                    positive.append(fts_string(token))
+            return u' AND '.join(positive), u' OR '.join(negative)
+
+        if filter_type == 'in':
+            terms = [force_text(v) for v in value]
+            return u' OR '.join(fts_string(t) for t in terms if t.strip()), ''
+
+        text = force_text(value.query_string if isinstance(value, BaseInput) else value)
+
+        if isinstance(value, Exact) or filter_type == 'exact':
+            expression = fts_string(text) if text.strip() else u''
+        elif filter_type == 'startswith':
+            expression = u' AND '.join(fts_string(t) for t in text.split())
+            if expression:
+                expression += u'*'
+        else:
+            expression = u' AND '.join(fts_string(t) for t in text.split())
+
+        if isinstance(value, Not):
+            return u'', expression
+        return expression, u''
+
+    def build_field_filter(self, field, filter_type, value):
+        if isinstance(value, BaseInput):
+            value = value.query_string
+
+        field = self.backend.unified_index.get_index_fieldname(field)
+        if field in DOCUMENT_COLUMNS:
+            column = DOCUMENT_COLUMNS[field]
+            if filter_type == 'in':
+                values = [force_text(v) for v in value]
+                if not values:
+                    return '0', []
+                return '%s IN (%s)' % (column, ', '.join('?' * len(values))), values
+            return '%s = ?' % column, [force_text(value)]
+
+        if filter_type == 'in':
+            values = [self.prep_field_value(field, v) for v in value]
+            if not values:
+                return '0', []
+            condition, params = 'f.value IN (%s)' % ', '.join('?' * len(values)), values
+        elif filter_type == 'range':
+            start, end = value
+            condition = 'f.value BETWEEN ? AND ?'
+            params = [self.prep_field_value(field, start), self.prep_field_value(field, end)]
+        else:
+            value = self.prep_field_value(field, value)
+            if filter_type in ('gt', 'gte', 'lt', 'lte'):
+                operator = {'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}[filter_type]
+                condition, params = 'f.value %s ?' % operator, [value]
+            elif filter_type == 'startswith' and isinstance(value, six.string_types):
+                condition = "f.value LIKE ? ESCAPE '\\'"
+                params = [like_escape(value) + '%']
+            elif filter_type == 'contains' and isinstance(value, six.string_types):
+                # word match, like a tokenized field of a search engine
+                condition = "(f.value = ? COLLATE NOCASE OR ' ' || f.value || ' ' LIKE ? ESCAPE '\\')"
+                params = [value, '% ' + like_escape(value) + ' %']
+            else:
+                condition, params = 'f.value = ?', [value]
+
+        return ('EXISTS (SELECT 1 FROM fields f WHERE f.doc = d.rowid '
+                'AND f.name = ? AND %s)' % condition), [field] + params
+
+    def prep_field_value(self, field, value):
+        """
+        Converts a filter value to the type the field is stored with.
+        """
+        search_field = self.backend.unified_index.all_searchfields().get(field)
+        field_type = getattr(search_field, 'field_type', None)
+        if isinstance(value, six.string_types):
+            if field_type == 'boolean':
+                return int(value.lower() in ('1', 'true', 'yes', 'on'))
+            try:
+                if field_type == 'integer':
+                    return int(value)
+                if field_type == 'float':
+                    return float(value)
+            except ValueError:
+                pass
+        return self.backend.to_db(value)
+
+
+class SQLiteEngine(BaseEngine):
+    backend = SQLiteSearchBackend
+    query = SQLiteSearchQuery
+
+    def __init__(self, using=None):
+        super(SQLiteEngine, self).__init__(using=using)
+        if not has_fts5():
+            logging.getLogger('haystack').warning(
+                "The SQLite library has no FTS5, the '%s' search connection falls back "
+                "to haystack's SimpleEngine.", self.using)
+            self.backend = SimpleSearchBackend
+            self.query = SimpleSearchQuery
@@ -0,0 +1,126 @@
+import hashlib
+
+from django.core.cache import cache
+from django.conf import settings
+from django.db.models import ForeignKey
+from django.utils.encoding import force_bytes
+
+from haystack.models import SearchResult
+from haystack.utils.app_loading import haystack_get_model
+
+
+CACHE_PRE_KEY = "search"
+
+# seconds the ordered results of a search are kept
+RESULTS_TIMEOUT = 60
+
+# max number of results cached per search, the pages past that
+# are read from the search backend
+MAX_CACHED_RESULTS = 1000
+
+
+def get_cache_key(keys):
+    keys = [settings.CACHE_PRE_KEY, CACHE_PRE_KEY] + [unicode(k) for k in keys]
+    return '.'.join(keys)
+
+
+def get_visibility_class(user):
+    """
+    Returns the name of the group of users that get the same
+    search results: anonymous users, admins, or, since the results
+    of the other users include what they own, each of them.
+    """
+    user = getattr(user, 'impersonated_user', user)
+    if not user or user.is_anonymous():
+        return 'anonymous'
+    if user.profile.is_superuser:
+        return 'admin'
+    return 'user%s' % user.pk
+
+
+def get_related_fields(model):
+    """
+    The foreign keys of model, loaded with the search results.
+    """
+    return [f.name for f in model._meta.fields if isinstance(f, ForeignKey)]
+
+
+def hydrate(identifiers):
+    """
+    Returns SearchResults for a list of (app_label, model_name, pk)
+    with their objects loaded with one in_bulk query per model.
+    Objects deleted since they were indexed are left out.
+    """
+    pks_by_model = {}
+    for app_label, model_name, pk in identifiers:
+        pks_by_model.setdefault((app_label, model_name), []).append(pk)
+
+    objects = {}
+    for (app_label, model_name), pks in pks_by_model.items():
+        model = haystack_get_model(app_label, model_name)
+        if model is None:
+            continue
+        queryset = model._default_manager.select_related(*get_related_fields(model))
+        for pk, obj in queryset.in_bulk(pks).items():
+            objects[(app_label, model_name, unicode(pk))] = obj
+
+    results = []
+    for app_label, model_name, pk in identifiers:
+        obj = objects.get((app_label, model_name, unicode(pk)))
+        if obj is not None:
+            result = SearchResult(app_label, model_name, pk, 0)
+            result._object = obj
+            results.append(result)
+    return results
+
+
+class CachedSearchResults(object):
+    """
+    The results of a SearchQuerySet for the paginator of SearchView.
+
+    The ordered (app_label, model_name, pk) of the results are cached
+    under key for RESULTS_TIMEOUT seconds, so paging through them or
+    repeating the search doesn't query the search backend. The
+    objects of each page are loaded by hydrate().
+    """
+    def __init__(self, searchqueryset, key):
+        self.searchqueryset = searchqueryset
+        self.key = get_cache_key(['results', hashlib.md5(force_bytes(key)).hexdigest()])
+        self._identifiers = None
+        self._count = None
+
+    def _load(self):
+        if self._identifiers is not None:
+            return
+
+        cached = cache.get(self.key)
+        if cached is None:
+            results = self.searchqueryset[:MAX_CACHED_RESULTS]
+            identifiers = [(r.app_label, r.model_name, r.pk) for r in results]
+            cached = (identifiers, self.searchqueryset.count())
+            cache.set(self.key, cached, RESULTS_TIMEOUT)
+        self._identifiers, self._count = cached
+
+    def count(self):
+        self._load()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        self._load()
+        if not isinstance(k, slice):
+            return self[k:k + 1][0]
+
+        start = k.start or 0
+        stop = self._count if k.stop is None else k.stop
+        if stop <= MAX_CACHED_RESULTS:
+            identifiers = self._identifiers[start:stop]
+        else:
+            identifiers = [(r.app_label, r.model_name, r.pk)
+                           for r in self.searchqueryset[start:stop]]
+        return hydrate(identifiers)
+
+    def facet_counts(self):
+        return self.searchqueryset.facet_counts()
@@ -0,0 +1,128 @@
+"""
+Exact-delta indexing of the UnindexedItem queue.
+
+The QueuedSignalProcessor adds a (content type, object id) row to the
+UnindexedItem table when an indexed object is saved. index_queue()
+indexes exactly those objects, loaded in bulk per model, and deletes
+only the queue rows it handled. Objects that are gone (or filtered
+out by their index_queryset) are removed from the index. The
+typeahead suggestions of the objects are updated too.
+"""
+import logging
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections as db_connections
+
+from haystack import connections
+from haystack.exceptions import NotHandled
+from haystack.utils import get_model_ct
+
+from tendenci.apps.search.models import UnindexedItem
+from tendenci.apps.search import suggest
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def get_queued_content_type_ids():
+    return list(UnindexedItem.objects.order_by()
+                .values_list('content_type_id', flat=True).distinct())
+
+
+def index_objects(model, object_ids):
+    """
+    Updates the index of every connection handling model with the
+    objects of object_ids, and removes the ones that no longer exist.
+    """
+    ct = get_model_ct(model)
+    for using in connections.connections_info.keys():
+        try:
+            index = connections[using].get_unified_index().get_index(model)
+        except NotHandled:
+            continue
+        backend = connections[using].get_backend()
+
+        objects = list(index.build_queryset(using=using).filter(pk__in=object_ids))
+        if objects:
+            backend.update(index, objects)
+
+        found = set(obj.pk for obj in objects)
+        for object_id in set(object_ids) - found:
+            backend.remove('%s.%s' % (ct, object_id))
+
+
+def index_content_type(content_type_id, batch_size=BATCH_SIZE):
+    """
+    Indexes the queued objects of one content type, batch_size queue
+    rows at a time. Returns the number of queue rows handled.
+    """
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    total = 0
+
+    while True:
+        queued = list(UnindexedItem.objects.filter(content_type_id=content_type_id)
+                      .order_by('pk').values_list('pk', 'object_id', 'create_dt')[:batch_size])
+        if not queued:
+            break
+
+        # Delete the queue rows before loading the objects: a save that
+        # happens from now on queues the object again instead of being
+        # covered by a row we are about to delete.
+        UnindexedItem.objects.filter(pk__in=[pk for pk, object_id, create_dt in queued]).delete()
+        total += len(queued)
+
+        if model is None:
+            continue
+
+        object_ids = set(object_id for pk, object_id, create_dt in queued)
+        try:
+            index_objects(model, object_ids)
+            suggest.update_objects(model, object_ids)
+        except Exception:
+            # queue them again for the next run
+            UnindexedItem.objects.bulk_create([
+                UnindexedItem(content_type_id=content_type_id, object_id=object_id,
+                              create_dt=create_dt)
+                for pk, object_id, create_dt in queued])
+            raise
+
+    return total
+
+
+def _index_content_type_worker(args):
+    # each worker process needs its own database connection
+    db_connections.close_all()
+    content_type_id, batch_size = args
+    try:
+        return index_content_type(content_type_id, batch_size=batch_size)
+    except Exception as e:
+        logger.error('Unable to index content type %s: %s' % (content_type_id, e))
+        return 0
+
+
+def index_queue(batch_size=BATCH_SIZE, workers=0):
+    """
+    Indexes everything in the UnindexedItem queue. With workers, the
+    content types are split between that many processes.
+    Returns the number of queue rows handled.
+    """
+    content_type_ids = get_queued_content_type_ids()
+    if not content_type_ids:
+        return 0
+
+    if workers and len(content_type_ids) > 1:
+        import multiprocessing
+
+        db_connections.close_all()
+        pool = multiprocessing.Pool(min(workers, len(content_type_ids)))
+        try:
+            totals = pool.map(_index_content_type_worker,
+                              [(content_type_id, batch_size) for content_type_id in content_type_ids])
+        finally:
+            pool.close()
+            pool.join()
+        return sum(totals)
+
+    return sum(index_content_type(content_type_id, batch_size=batch_size)
+               for content_type_id in content_type_ids)
@@ -0,0 +1,20 @@
+#rebuild_suggest_index.py
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the typeahead suggestions of the global search box from
+    the titles and headlines of the indexed objects. process_unindexed
+    keeps them up to date afterwards.
+
+    Usage:
+        python manage.py rebuild_suggest_index
+    """
+
+    def handle(self, *args, **options):
+        from tendenci.apps.search.suggest import rebuild
+
+        total = rebuild()
+        if int(options.get('verbosity', 1)) >= 1:
+            print('Indexed %d suggestions' % total)
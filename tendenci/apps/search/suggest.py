@@ -0,0 +1,245 @@
+"""
+Typeahead suggestions for the global search box.
+
+The titles (or headlines) of the active TendenciBaseModel objects are
+kept in a small SQLite file next to the search index:
+
+    SEARCH_SUGGEST_PATH = '/path/to/suggest.sqlite3'
+
+Every title is stored once per word it contains, as the normalized
+title from that word on ("annual meeting 2015", "meeting 2015",
+"2015"), so a prefix of any word matches. The terms table is keyed
+by (visibility, term): one sorted partition per visibility level
+(anonymous, user, member), searched by a range scan of the prefix.
+Objects only visible through group permissions or ownership are not
+suggested.
+
+The file is built by the rebuild_suggest_index command and updated
+by process_unindexed along with the search index.
+"""
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.core.urlresolvers import NoReverseMatch
+from django.utils.encoding import force_text
+
+ANONYMOUS = 0
+USER = 1
+MEMBER = 2
+
+TITLE_FIELDS = ('title', 'headline')
+
+# max length of a stored term, longer prefixes don't narrow much more
+TERM_LENGTH = 64
+
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    visibility INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (visibility, term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS terms_doc ON terms (doc);
+"""
+
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Returns the sqlite connection of this thread (and process).
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+
+    path = settings.SEARCH_SUGGEST_PATH
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.executescript(SCHEMA)
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def normalize(text):
+    """
+    Lowercases text, removes the accents and replaces anything
+    that is not a letter or a digit by a single space.
+    """
+    text = unicodedata.normalize('NFKD', force_text(text))
+    text = u''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[\W_]+', u' ', text.lower(), flags=re.UNICODE).strip()
+
+
+def get_terms(title):
+    words = normalize(title).split()
+    return set(u' '.join(words[i:])[:TERM_LENGTH] for i in range(len(words)))
+
+
+def get_title_field(model):
+    field_names = [f.name for f in model._meta.fields]
+    for name in TITLE_FIELDS:
+        if name in field_names:
+            return name
+    return None
+
+
+def get_suggest_models():
+    """
+    Returns the models with a TendenciBaseSearchIndex and a title
+    or headline.
+    """
+    from haystack import connections
+    from tendenci.apps.perms.indexes import TendenciBaseSearchIndex
+
+    unified_index = connections['default'].get_unified_index()
+    return [model for model, index in unified_index.get_indexes().items()
+            if isinstance(index, TendenciBaseSearchIndex) and get_title_field(model)]
+
+
+def get_visibility(obj):
+    """
+    Returns the first visibility level that can view obj,
+    or None if it is not visible by anonymous, users or members.
+    """
+    if not obj.status or obj.status_detail != 'active':
+        return None
+    if obj.allow_anonymous_view:
+        return ANONYMOUS
+    if obj.allow_user_view:
+        return USER
+    if obj.allow_member_view:
+        return MEMBER
+    return None
+
+
+def get_user_visibility(user):
+    user = getattr(user, 'impersonated_user', user)
+    if user.is_anonymous():
+        return ANONYMOUS
+    if user.profile.is_superuser or user.profile.is_member:
+        return MEMBER
+    return USER
+
+
+def get_doc_id(obj):
+    return u'%s.%s.%s' % (obj._meta.app_label, obj._meta.model_name, obj.pk)
+
+
+def write_objects(conn, model, objects, object_ids=()):
+    """
+    Replaces the suggestions of objects and removes the ones of the
+    object_ids that are not in objects.
+    """
+    title_field = get_title_field(model)
+    doc_ids = [u'%s.%s.%s' % (model._meta.app_label, model._meta.model_name, pk)
+               for pk in object_ids]
+    documents = []
+    terms = []
+    for obj in objects:
+        doc_id = get_doc_id(obj)
+        doc_ids.append(doc_id)
+        title = getattr(obj, title_field, '')
+        visibility = get_visibility(obj)
+        if not title or visibility is None:
+            continue
+        try:
+            url = obj.get_absolute_url()
+        except (AttributeError, NoReverseMatch):
+            url = ''
+        documents.append((doc_id, force_text(title), url or '',
+                          force_text(model._meta.verbose_name)))
+        terms.extend((visibility, term, doc_id) for term in get_terms(title))
+
+    conn.executemany('DELETE FROM terms WHERE doc = ?', [(d,) for d in set(doc_ids)])
+    conn.executemany('DELETE FROM documents WHERE id = ?', [(d,) for d in set(doc_ids)])
+    conn.executemany('INSERT INTO documents (id, title, url, type) VALUES (?, ?, ?, ?)', documents)
+    conn.executemany('INSERT OR IGNORE INTO terms (visibility, term, doc) VALUES (?, ?, ?)', terms)
+
+
+def update_objects(model, object_ids):
+    """
+    Updates the suggestions of the objects of model with the given ids.
+    Called by the process_unindexed indexer.
+    """
+    if model not in get_suggest_models():
+        return
+    objects = list(model._default_manager.filter(pk__in=object_ids))
+    conn = get_connection()
+    with conn:
+        write_objects(conn, model, objects, object_ids)
+
+
+def rebuild():
+    """
+    Rebuilds all the suggestions. Returns the number of objects.
+    """
+    from haystack import connections
+
+    unified_index = connections['default'].get_unified_index()
+    conn = get_connection()
+    total = 0
+    with conn:
+        conn.execute('DELETE FROM terms')
+        conn.execute('DELETE FROM documents')
+        for model in get_suggest_models():
+            queryset = unified_index.get_index(model).index_queryset().order_by('pk')
+            last_pk = 0
+            while True:
+                objects = list(queryset.filter(pk__gt=last_pk)[:BATCH_SIZE])
+                if not objects:
+                    break
+                write_objects(conn, model, objects)
+                last_pk = objects[-1].pk
+                total += len(objects)
+    return total
+
+
+def suggest(user, query, limit=10):
+    """
+    Returns up to limit suggestions (dicts with title, url and type)
+    for the titles with a word starting with query, visible by user.
+    """
+    prefix = normalize(query)[:TERM_LENGTH]
+    if not prefix:
+        return []
+
+    conn = get_connection()
+    rows = []
+    for visibility in range(get_user_visibility(user) + 1):
+        rows.extend(conn.execute(
+            'SELECT t.term, d.id, d.title, d.url, d.type FROM terms t '
+            'JOIN documents d ON d.id = t.doc '
+            'WHERE t.visibility = ? AND t.term >= ? AND t.term < ? '
+            'ORDER BY t.term LIMIT ?',
+            (visibility, prefix, prefix + u'\uffff', limit * 2)).fetchall())
+
+    # shortest matching term first: the closest matches
+    rows.sort(key=lambda row: (len(row[0]), row[0]))
+    suggestions = []
+    seen = set()
+    for term, doc_id, title, url, type in rows:
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        suggestions.append({'title': title, 'url': url, 'type': type})
+        if len(suggestions) == limit:
+            break
+    return suggestions
@@ -0,0 +1,352 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from haystack import connections
+from haystack.query import SearchQuerySet
+
+from tendenci.apps.boxes.models import Box
+from tendenci.apps.navs.models import Nav
+from tendenci.apps.perms.object_perms import ObjectPermission
+from tendenci.apps.profiles.models import Profile
+from tendenci.apps.search import suggest
+from tendenci.apps.search.models import UnindexedItem
+from tendenci.apps.user_groups.models import Group, GroupMembership
+
+SQLITE_ALIAS = 'sqlite_test'
+
+
+class SQLiteIndexTestCase(TestCase):
+    """
+    Adds a connection to an sqlite search index (and a suggest file)
+    in a temporary directory.
+    """
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        connections.connections_info[SQLITE_ALIAS] = {
+            'ENGINE': 'tendenci.apps.search.backends.sqlite_backend.SQLiteEngine',
+            'PATH': os.path.join(self.index_dir, 'index.sqlite3'),
+        }
+        self.backend = connections[SQLITE_ALIAS].get_backend()
+        self.unified_index = connections[SQLITE_ALIAS].get_unified_index()
+
+        self.override = override_settings(
+            SEARCH_SUGGEST_PATH=os.path.join(self.index_dir, 'suggest.sqlite3'))
+        self.override.enable()
+        suggest._local.__dict__.clear()
+
+    def tearDown(self):
+        suggest._local.__dict__.clear()
+        self.override.disable()
+        connections._connections.pop(SQLITE_ALIAS, None)
+        del connections.connections_info[SQLITE_ALIAS]
+        shutil.rmtree(self.index_dir)
+
+    def update(self, objects):
+        model = type(objects[0])
+        self.backend.update(self.unified_index.get_index(model), objects)
+
+    def sqs(self):
+        return SearchQuerySet(using=SQLITE_ALIAS)
+
+    def pks(self, sqs):
+        return [int(result.pk) for result in sqs]
+
+
+class SQLiteBackendTest(SQLiteIndexTestCase):
+    def setUp(self):
+        super(SQLiteBackendTest, self).setUp()
+        self.boxes = [
+            Box.objects.create(title='Short', content='apple banana'),
+            Box.objects.create(title='Long', content='apple apple apple cherry'),
+            Box.objects.create(title='Other', content='cherry'),
+        ]
+        self.update(self.boxes)
+
+    def test_index_and_search(self):
+        self.assertEqual(self.sqs().models(Box).count(), 3)
+        self.assertEqual(set(self.pks(self.sqs().filter(content='cherry'))),
+                         set([self.boxes[1].pk, self.boxes[2].pk]))
+        self.assertEqual(self.pks(self.sqs().filter(content='banana')), [self.boxes[0].pk])
+
+        # indexing an object again replaces its document
+        self.boxes[0].content = 'durian'
+        self.update(self.boxes[:1])
+        self.assertEqual(self.sqs().models(Box).count(), 3)
+        self.assertEqual(self.pks(self.sqs().filter(content='banana')), [])
+        self.assertEqual(self.pks(self.sqs().filter(content='durian')), [self.boxes[0].pk])
+
+    def test_bm25_ordering(self):
+        results = self.sqs().auto_query('apple')
+        self.assertEqual(self.pks(results), [self.boxes[1].pk, self.boxes[0].pk])
+        self.assertTrue(results[0].score > results[1].score)
+
+    def test_django_ct_facets(self):
+        nav = Nav.objects.create(title='Menu')
+        self.update([nav])
+
+        facets = self.sqs().facet('django_ct').facet_counts()['fields']['django_ct']
+        self.assertEqual(sorted(facets), [('boxes.box', 3), ('navs.nav', 1)])
+
+        sqs = self.sqs().narrow('django_ct:navs.nav')
+        self.assertEqual(self.pks(sqs), [nav.pk])
+
+    def test_permission_filters(self):
+        user = User.objects.create_user('tester', 'test@test.com', 'test')
+        Profile.objects.create_profile(user=user)
+        group = Group.objects.create(name='Editors')
+        GroupMembership.objects.create(group=group, member=user)
+
+        for box in self.boxes:
+            box.allow_anonymous_view = False
+            box.allow_user_view = False
+            box.save()
+        self.boxes[0].allow_anonymous_view = True
+        self.boxes[0].save()
+        inactive = Box.objects.create(title='Inactive', content='', status_detail='inactive')
+        ObjectPermission.objects.assign_group([group], self.boxes[2], ['view'])
+        self.update(self.boxes + [inactive])
+
+        sqs = self.sqs().models(Box)
+        visible = set([self.boxes[0].pk, self.boxes[2].pk])
+        self.assertEqual(self.pks(Box.objects._anon_sqs(sqs)), [self.boxes[0].pk])
+        self.assertEqual(set(self.pks(Box.objects._member_sqs(sqs, user))), visible)
+        self.assertEqual(set(self.pks(Box.objects._user_sqs(sqs, user))), visible)
+
+        other_user = User.objects.create_user('other', 'other@test.com', 'test')
+        Profile.objects.create_profile(user=other_user)
+        self.assertEqual(self.pks(Box.objects._user_sqs(sqs, other_user)), [self.boxes[0].pk])
+
+    def test_remove(self):
+        self.backend.remove(self.boxes[1])
+        self.assertEqual(set(self.pks(self.sqs().models(Box))),
+                         set([self.boxes[0].pk, self.boxes[2].pk]))
+        self.assertEqual(self.pks(self.sqs().filter(content='cherry')), [self.boxes[2].pk])
+
+    def test_clear(self):
+        nav = Nav.objects.create(title='Menu')
+        self.update([nav])
+
+        self.backend.clear(models=[Box])
+        self.assertEqual(self.pks(self.sqs()), [nav.pk])
+
+        self.backend.clear()
+        self.assertEqual(self.sqs().count(), 0)
+
+
+class SQLiteEngineTest(SQLiteIndexTestCase):
+    def capture_warnings(self):
+        import logging
+
+        messages = []
+        handler = logging.Handler(logging.WARNING)
+        handler.emit = lambda record: messages.append(record.getMessage())
+        logger = logging.getLogger('haystack')
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return messages
+
+    def test_fallback_without_fts5(self):
+        from haystack.backends.simple_backend import SimpleSearchBackend, SimpleSearchQuery
+        from tendenci.apps.search.backends import sqlite_backend
+
+        messages = self.capture_warnings()
+        has_fts5 = sqlite_backend._has_fts5
+        sqlite_backend._has_fts5 = False
+        try:
+            engine = sqlite_backend.SQLiteEngine(SQLITE_ALIAS)
+        finally:
+            sqlite_backend._has_fts5 = has_fts5
+        self.assertIsInstance(engine.get_backend(), SimpleSearchBackend)
+        self.assertIsInstance(engine.get_query(), SimpleSearchQuery)
+        self.assertEqual(len(messages), 1)
+        self.assertIn('FTS5', messages[0])
+
+    def test_empty_index_warning(self):
+        from tendenci.apps.search.backends.sqlite_backend import SQLiteSearchBackend
+
+        messages = self.capture_warnings()
+        self.assertEqual(self.sqs().count(), 0)
+        self.assertEqual(len(messages), 1)
+        self.assertIn('rebuild_index', messages[0])
+
+        # once per process
+        self.sqs().count()
+        self.assertEqual(len(messages), 1)
+
+        self.update([Box.objects.create(title='Box', content='apple')])
+        backend = SQLiteSearchBackend(SQLITE_ALIAS, PATH=self.backend.path)
+        backend.get_connection()
+        self.assertEqual(len(messages), 1)
+
+
+class ProcessUnindexedTest(SQLiteIndexTestCase):
+    def setUp(self):
+        super(ProcessUnindexedTest, self).setUp()
+        self.boxes = [Box.objects.create(title='Box %s' % i, content='') for i in range(3)]
+
+    def process_unindexed(self):
+        from django.core.management import call_command
+
+        call_command('process_unindexed', batch_size=1)
+
+    def test_saves_are_queued(self):
+        content_type = ContentType.objects.get_for_model(Box)
+        self.assertEqual(set(UnindexedItem.objects.filter(content_type=content_type)
+                             .values_list('object_id', flat=True)),
+                         set(box.pk for box in self.boxes))
+
+    def test_indexes_exactly_the_queued_items(self):
+        UnindexedItem.objects.all().delete()
+        self.boxes[0].save()
+        self.boxes[2].save()
+
+        self.process_unindexed()
+        self.assertEqual(set(self.pks(self.sqs().models(Box))),
+                         set([self.boxes[0].pk, self.boxes[2].pk]))
+        self.assertFalse(UnindexedItem.objects.exists())
+
+        # nothing queued, nothing indexed
+        self.process_unindexed()
+        self.assertEqual(self.sqs().models(Box).count(), 2)
+
+    def test_removes_objects_that_are_gone(self):
+        self.process_unindexed()
+        self.assertEqual(self.sqs().models(Box).count(), 3)
+
+        content_type = ContentType.objects.get_for_model(Box)
+        box_id = self.boxes[1].pk
+        Box.objects.filter(pk=box_id).delete()
+        UnindexedItem.objects.create(content_type=content_type, object_id=box_id)
+
+        self.process_unindexed()
+        self.assertEqual(set(self.pks(self.sqs().models(Box))),
+                         set([self.boxes[0].pk, self.boxes[2].pk]))
+        self.assertFalse(UnindexedItem.objects.exists())
+
+
+class SuggestTest(SQLiteIndexTestCase):
+    def setUp(self):
+        super(SuggestTest, self).setUp()
+        self.public = Box.objects.create(title=u'Annual Meeting 2015', content='')
+        self.members_only = Box.objects.create(title=u'Members M\xe9eting Notes', content='',
+                                               allow_anonymous_view=False,
+                                               allow_user_view=False,
+                                               allow_member_view=True)
+        self.private = Box.objects.create(title=u'Private Meeting', content='',
+                                          allow_anonymous_view=False,
+                                          allow_user_view=False,
+                                          allow_member_view=False)
+        self.inactive = Box.objects.create(title=u'Old Meeting', content='',
+                                           status_detail='inactive')
+        suggest.rebuild()
+
+        self.user = User.objects.create_user('tester', 'test@test.com', 'test')
+        Profile.objects.create_profile(user=self.user)
+        self.member = User.objects.create_user('member', 'member@test.com', 'test')
+        profile = Profile.objects.create_profile(user=self.member)
+        profile.member_number = '1001'
+        profile.save()
+
+    def titles(self, user, query):
+        return [item['title'] for item in suggest.suggest(user, query)]
+
+    def test_prefix_of_any_word(self):
+        self.assertEqual(self.titles(AnonymousUser(), 'annu'), [u'Annual Meeting 2015'])
+        self.assertEqual(self.titles(AnonymousUser(), 'meeting 20'), [u'Annual Meeting 2015'])
+        self.assertEqual(self.titles(AnonymousUser(), '2015'), [u'Annual Meeting 2015'])
+        self.assertEqual(self.titles(AnonymousUser(), 'xyz'), [])
+        self.assertEqual(self.titles(AnonymousUser(), '  '), [])
+
+    def test_visibility(self):
+        self.assertEqual(self.titles(AnonymousUser(), 'meet'), [u'Annual Meeting 2015'])
+        self.assertEqual(self.titles(self.user, 'meet'), [u'Annual Meeting 2015'])
+        # accents are ignored
+        self.assertEqual(sorted(self.titles(self.member, 'meet')),
+                         [u'Annual Meeting 2015', u'Members M\xe9eting Notes'])
+
+    def test_update_objects(self):
+        self.public.title = u'Spring Gala'
+        self.public.save()
+        suggest.update_objects(Box, [self.public.pk])
+        self.assertEqual(self.titles(AnonymousUser(), 'annual'), [])
+        self.assertEqual(self.titles(AnonymousUser(), 'gala'), [u'Spring Gala'])
+
+        Box.objects.filter(pk=self.public.pk).delete()
+        suggest.update_objects(Box, [self.public.pk])
+        self.assertEqual(self.titles(AnonymousUser(), 'gala'), [])
+
+    def test_suggest_view(self):
+        import json
+        from django.core.urlresolvers import reverse
+
+        response = self.client.get(reverse('search_suggest'), {'q': 'Annual'})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['query'], 'Annual')
+        self.assertEqual([item['title'] for item in data['results']], [u'Annual Meeting 2015'])
+
+
+class CachedSearchResultsTest(SQLiteIndexTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        super(CachedSearchResultsTest, self).setUp()
+        cache.clear()
+        self.boxes = [Box.objects.create(title='Box %s' % i, content='') for i in range(5)]
+        self.update(self.boxes)
+
+    def results(self, key='boxes'):
+        from tendenci.apps.search.cache import CachedSearchResults
+
+        return CachedSearchResults(self.sqs().models(Box).order_by('primary_key'), key)
+
+    def test_pagination(self):
+        from django.core.paginator import Paginator
+
+        paginator = Paginator(self.results(), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual([r.object for r in paginator.page(2).object_list], self.boxes[2:4])
+        self.assertEqual([r.object for r in paginator.page(3).object_list], self.boxes[4:])
+        self.assertEqual(self.results()[1].object, self.boxes[1])
+
+    def test_results_are_cached(self):
+        self.assertEqual(self.results().count(), 5)
+
+        # the next searches with the same key don't reach the backend
+        self.backend.clear()
+        self.assertEqual(self.results().count(), 5)
+        self.assertEqual([r.object for r in self.results()[:5]], self.boxes)
+        self.assertEqual(self.results(key='other').count(), 0)
+
+    def test_hydration(self):
+        results = self.results()
+        results.count()
+        with self.assertNumQueries(1):
+            page = results[0:3]
+            self.assertEqual([r.object for r in page], self.boxes[:3])
+            self.assertEqual([(r.app_label, r.model_name) for r in page], [('boxes', 'box')] * 3)
+
+        # objects deleted since they were indexed are left out
+        self.boxes[1].delete()
+        self.assertEqual([r.object for r in self.results()[0:3]],
+                         [self.boxes[0], self.boxes[2]])
+
+    def test_pages_past_the_cached_results(self):
+        from tendenci.apps.search import cache as search_cache
+
+        max_cached_results = search_cache.MAX_CACHED_RESULTS
+        search_cache.MAX_CACHED_RESULTS = 2
+        try:
+            results = self.results()
+            self.assertEqual(results.count(), 5)
+            self.assertEqual([r.object for r in results[0:2]], self.boxes[:2])
+            self.assertEqual([r.object for r in results[2:4]], self.boxes[2:4])
+        finally:
+            search_cache.MAX_CACHED_RESULTS = max_cached_results
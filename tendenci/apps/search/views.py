@@ -1,11 +1,15 @@
 from django.conf import settings
 from django.core.paginator import Paginator, InvalidPage
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.shortcuts import render_to_response
 from django.template import RequestContext
 from django.utils.translation import ugettext_lazy as _
 
+from haystack.query import SearchQuerySet
+
 from tendenci.apps.search.forms import ModelSearchForm
+from tendenci.apps.search.cache import CachedSearchResults, get_visibility_class
+from tendenci.apps.search.suggest import suggest as get_suggestions
 from tendenci.apps.event_logs.models import EventLog
 
 RESULTS_PER_PAGE = getattr(settings, 'HAYSTACK_SEARCH_RESULTS_PER_PAGE', 20)
@@ -18,6 +22,17 @@ def open_search(request, template_name="search/open_search_xml.html"):
     )
 
 
+def suggest(request, limit=10):
+    """
+    Returns the typeahead suggestions for the q parameter as json.
+    """
+    query = request.GET.get('q', '').strip()
+    return JsonResponse({
+        'query': query,
+        'results': get_suggestions(request.user, query, limit=limit),
+    })
+
+
 class SearchView(object):
     template = 'search/search.html'
     extra_context = {}
@@ -79,9 +94,26 @@ class SearchView(object):
         Returns an empty list if there's no query to search with.
         """
         if self.query:
-            return self.form.search()
+            results = self.form.search()
+        else:
+            results = self.form.search(order_by='newest')
+
+        if isinstance(results, SearchQuerySet):
+            return CachedSearchResults(results, self.get_results_cache_key())
+        return results
 
-        return self.form.search(order_by='newest')
+    def get_results_cache_key(self):
+        """
+        Identifies the results: the normalized query and options,
+        and the visibility class of the user.
+        """
+        data = self.form.cleaned_data if self.form.is_valid() else {}
+        return u'|'.join([
+            u' '.join(self.query.lower().split()),
+            u','.join(sorted(data.get('models') or [])),
+            data.get('sort_by') or u'',
+            get_visibility_class(self.user),
+        ])
 
     def build_page(self):
         """
@@ -2,16 +2,22 @@ from django.core.cache import cache
 from django.conf import settings as d_settings
 from django.template import Context, Template, TemplateDoesNotExist
 from django.template.loader import get_template
+from django.utils import six
+from django.utils.functional import lazy
 
 from tendenci import __version__ as version
 from tendenci.apps.site_settings.models import Setting
 from tendenci.apps.site_settings.cache import SETTING_PRE_KEY
+from tendenci.apps.site_settings.utils import get_local_settings, get_setting_key
+from tendenci.apps.base.lazy_context import timed_context_processor
 
 
-def settings(request):
-    """Context processor for settings
+def build_settings_context():
+    """
+    Returns the coerced (and decrypted) values of all settings keyed
+    for the template context. The contact_message setting is returned
+    as a compiled Template.
     """
-
     key = [d_settings.CACHE_PRE_KEY, SETTING_PRE_KEY, 'all']
     key = '.'.join(key)
 
@@ -41,11 +47,7 @@ def settings(request):
         # Handle context for the social_media addon's
         # contact_message setting
         if setting.name == 'contact_message':
-            page_url = request.build_absolute_uri()
-            message_context = {'page_url': page_url}
-            message_context = Context(message_context)
-            message_template = Template(value)
-            value = message_template.render(message_context)
+            value = Template(value)
 
         contexts[context_key.upper()] = value
 
@@ -58,6 +60,55 @@ def settings(request):
     return contexts
 
 
+def render_contact_message(template, request):
+    page_url = request.build_absolute_uri()
+    return template.render(Context({'page_url': page_url}))
+
+lazy_contact_message = lazy(render_contact_message, six.text_type)
+
+
+@timed_context_processor
+def settings(request):
+    """Context processor for settings
+
+    The context is built once per settings version and kept in process
+    memory; contact_message is only rendered if a template uses it.
+    """
+    local_settings = get_local_settings()
+    local_key = get_setting_key(['context'])
+    try:
+        precompiled, template_keys = local_settings[local_key]
+    except KeyError:
+        precompiled = build_settings_context()
+        template_keys = [k for k, v in precompiled.items() if isinstance(v, Template)]
+        local_settings[local_key] = (precompiled, template_keys)
+
+    contexts = dict(precompiled)
+    for context_key in template_keys:
+        contexts[context_key] = lazy_contact_message(precompiled[context_key], request)
+
+    return contexts
+
+
+# app name -> whether the app has a top_nav.html template
+_top_nav_templates = {}
+
+
+def top_nav_exists(app_name):
+    if app_name in _top_nav_templates:
+        return _top_nav_templates[app_name]
+    try:
+        get_template(app_name+'/top_nav.html')
+        exists = True
+    except TemplateDoesNotExist:
+        exists = False
+    # app_name comes from the url, don't let random paths grow this
+    if len(_top_nav_templates) < 500:
+        _top_nav_templates[app_name] = exists
+    return exists
+
+
+@timed_context_processor
 def app_dropdown(request):
     """
     Context processor for getting the template
@@ -72,10 +123,9 @@ def app_dropdown(request):
 
     else:
         if path[0] == 'settings' and path[1] == 'module':
-            try:
-                get_template(path[2]+'/top_nav.html')
+            if top_nav_exists(path[2]):
                 context.update({'ADMIN_MENU_APP_TEMPLATE_DROPDOWN': path[2]+'/top_nav.html'})
-            except TemplateDoesNotExist:
+            else:
                 context.update({'ADMIN_MENU_APP_TEMPLATE_DROPDOWN': 'site_settings/top_nav.html'})
 
             # special case profile setting as users
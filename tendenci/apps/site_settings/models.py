@@ -95,6 +95,10 @@ class Setting(models.Model):
         else:
             super(Setting, self).save(*args, **kwargs)
 
+        # any change can affect the in-process settings of every process
+        from tendenci.apps.site_settings.utils import bump_settings_version
+        bump_settings_version()
+
         #update the cache when value has changed
         if orig and self.value != orig.value:
             from tendenci.apps.site_settings.utils import (delete_setting_cache,
@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from tendenci.apps.site_settings.models import Setting
+from tendenci.apps.site_settings.utils import (get_setting, get_setting_key,
+    bump_settings_version, clear_local_settings, _start_request, _finish_request)
+
+
+class SettingsVersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_settings()
+        self.setting = Setting.objects.create(name='testsetting', label='Test setting',
+                                              description='', data_type='string',
+                                              value='first', input_type='text',
+                                              scope='module', scope_category='testapp')
+
+    def tearDown(self):
+        _finish_request()
+
+    def change_elsewhere(self, value):
+        """
+        Changes the setting the way another process would be seen from
+        this one: the row and the shared cache, not the process memory.
+        """
+        Setting.objects.filter(pk=self.setting.pk).update(value=value)
+        cache.delete(get_setting_key(['module', 'testapp', 'testsetting']))
+
+    def test_version_bump_discards_process_memory(self):
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'first')
+
+        self.change_elsewhere('second')
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'first')
+
+        bump_settings_version()
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'second')
+
+    def test_save_bumps_version(self):
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'first')
+
+        self.setting.value = 'second'
+        self.setting.save()
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'second')
+
+    def test_version_is_read_once_per_request(self):
+        _start_request()
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'first')
+
+        # a bump from another process shows up in the next request
+        self.change_elsewhere('second')
+        cache.set(get_setting_key(['version']), 'other-process')
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'first')
+
+        _finish_request()
+        _start_request()
+        self.assertEqual(get_setting('module', 'testapp', 'testsetting'), 'second')
+
+    def test_settings_context_follows_version(self):
+        from tendenci.apps.site_settings.context_processors import settings
+
+        request = RequestFactory().get('/')
+        self.assertEqual(settings(request)['MODULE_TESTAPP_TESTSETTING'], 'first')
+
+        self.change_elsewhere('second')
+        cache.delete(get_setting_key(['all']))
+        self.assertEqual(settings(request)['MODULE_TESTAPP_TESTSETTING'], 'first')
+
+        bump_settings_version()
+        self.assertEqual(settings(request)['MODULE_TESTAPP_TESTSETTING'], 'second')
+
+    def test_registered_apps_follow_version(self):
+        from tendenci.apps.registry.sites import site
+
+        apps = site.get_registered_apps()
+        self.assertIs(site.get_registered_apps(), apps)
+
+        bump_settings_version()
+        self.assertIsNot(site.get_registered_apps(), apps)
@@ -1,4 +1,8 @@
+import uuid
+import threading
+
 from django.core.cache import cache
+from django.core.signals import request_started, request_finished
 from django.conf import settings as d_settings
 from django.utils.translation import ugettext_lazy as _
 from django import VERSION as django_version
@@ -20,9 +24,71 @@ def get_setting_key(items=[]):
     return key
 
 
+# Settings are also kept in process memory, stamped with a global
+# version from the shared cache. The version is read once per request
+# (on every call outside of a request) and bumped whenever a setting
+# changes, which discards the memory layer of every process.
+_request_state = threading.local()
+_local_settings = {'version': None, 'values': {}}
+
+
+def get_settings_version():
+    version = getattr(_request_state, 'version', None)
+    if version is None:
+        key = get_setting_key(['version'])
+        version = cache.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(key, version)
+        if getattr(_request_state, 'in_request', False):
+            _request_state.version = version
+    return version
+
+
+def bump_settings_version():
+    cache.set(get_setting_key(['version']), uuid.uuid4().hex)
+    _request_state.version = None
+
+
+def get_local_settings():
+    """
+    Returns the in-process dict of setting values
+    that is valid for the current settings version.
+    """
+    global _local_settings
+    version = get_settings_version()
+    local_settings = _local_settings
+    if local_settings['version'] != version:
+        local_settings = {'version': version, 'values': {}}
+        _local_settings = local_settings
+    return local_settings['values']
+
+
+def clear_local_settings():
+    """
+    Discards the in-process settings of this process only.
+    """
+    global _local_settings
+    _local_settings = {'version': None, 'values': {}}
+
+
+def _start_request(**kwargs):
+    _request_state.in_request = True
+    _request_state.version = None
+
+
+def _finish_request(**kwargs):
+    _request_state.in_request = False
+    _request_state.version = None
+
+request_started.connect(_start_request, dispatch_uid='site_settings_start_request')
+request_finished.connect(_finish_request, dispatch_uid='site_settings_finish_request')
+
+
 def delete_all_settings_cache():
     key = get_setting_key(['all'])
     cache.delete(key)
+    bump_settings_version()
 
 
 def cache_setting(scope, scope_category, name, value):
@@ -56,6 +122,7 @@ def delete_setting_cache(scope, scope_category, name):
     """
     key = get_setting_key([scope, scope_category, name])
     cache.delete(key)
+    bump_settings_version()
 
 
 def delete_settings_cache(scope, scope_category):
@@ -71,6 +138,7 @@ def delete_settings_cache(scope, scope_category):
     for setting in settings:
         key = get_setting_key([setting.scope, setting.scope_category, setting.name])
         cache.delete(key)
+    bump_settings_version()
 
 
 def get_setting(scope, scope_category, name):
@@ -88,10 +156,26 @@ def get_setting(scope, scope_category, name):
         # Calling cache.get() from within django.setup() on Django 1.7-1.9 will
         # cause a deadlock.
         # See https://github.com/django/django/pull/6044
-        setting = None
-    else:
-        setting = cache.get(key)
+        return _get_setting(scope, scope_category, name, key, None)[0]
+
+    local_settings = get_local_settings()
+    try:
+        return local_settings[key]
+    except KeyError:
+        pass
 
+    value, cacheable = _get_setting(scope, scope_category, name, key, cache.get(key))
+    if cacheable:
+        local_settings[key] = value
+    return value
+
+
+def _get_setting(scope, scope_category, name, key, setting):
+    """
+    Returns the converted value of a setting and whether that value
+    can be kept in process memory. File settings are not, as the
+    File object they resolve to may change on its own.
+    """
     if setting is None:
         #setting is not in the cache
         try:
@@ -112,7 +196,7 @@ def get_setting(scope, scope_category, name):
             # test is get_value will work
             value = setting.get_value().strip()
         except AttributeError:
-            return u''
+            return u'', False
         # convert data types
         if setting.data_type == 'boolean':
             value = value[0].lower() == 't'
@@ -128,9 +212,10 @@ def get_setting(scope, scope_category, name):
             except TFile.DoesNotExist:
                 tfile = None
             value = tfile
-        return value
+            return value, False
+        return value, True
 
-    return u''
+    return u'', True
 
 
 def get_global_setting(name):
@@ -142,6 +227,19 @@ def get_module_setting(scope_category, name):
 
 
 def check_setting(scope, scope_category, name):
+    local_key = get_setting_key([scope, scope_category, name, 'exists'])
+    local_settings = get_local_settings()
+    try:
+        return local_settings[local_key]
+    except KeyError:
+        pass
+
+    exists = _check_setting(scope, scope_category, name)
+    local_settings[local_key] = exists
+    return exists
+
+
+def _check_setting(scope, scope_category, name):
     #check cache first
     key = get_setting_key([scope, scope_category, name])
     setting = cache.get(key)
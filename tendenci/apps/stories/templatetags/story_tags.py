@@ -1,4 +1,3 @@
-import random
 from datetime import datetime
 from operator import or_, and_
 
@@ -9,7 +8,8 @@ from django.template import Library, TemplateSyntaxError, Variable
 from django.utils.translation import ugettext_lazy as _
 
 from tendenci.apps.stories.models import Story
-from tendenci.apps.base.template_tags import ListNode, parse_tag_kwargs
+from tendenci.apps.base.template_tags import (ListNode, parse_tag_kwargs,
+    get_list_cache_key, get_list_objects)
 from tendenci.apps.perms.utils import get_query_filters
 
 
@@ -171,8 +171,6 @@ class ListStoriesNode(ListNode):
         if group:
             items = items.filter(group=group)
 
-        objects = []
-
         # Removed seconds and microseconds so we can cache the query better
         now = datetime.now().replace(second=0, microsecond=0)
 
@@ -186,11 +184,9 @@ class ListStoriesNode(ListNode):
         else:
             items = items.order_by('-position', '-start_dt')
 
-        # if order is not specified it sorts by relevance
-        if randomize:
-            objects = [item for item in random.sample(items, len(items))][:limit]
-        else:
-            objects = [item for item in items[:limit]]
+        key = get_list_cache_key(self.model, user, self.__class__.__name__, tags, limit,
+                                 order, group, now, randomize)
+        objects = get_list_objects(self.model, items, limit, randomize, key)
 
         context[self.context_var] = objects
 
@@ -1,8 +1,16 @@
 from django.conf import settings
 from tendenci.apps.site_settings.utils import get_setting
 from tendenci.apps.theme.utils import get_theme_info
+from tendenci.apps.base.lazy_context import lazy_context_processor, timed_context_processor
 
 
+@lazy_context_processor(THEME_INFO=None)
+def theme_info(request):
+    theme = request.session.get('theme', get_setting('module', 'theme_editor', 'theme'))
+    return {'THEME_INFO': get_theme_info(theme)}
+
+
+@timed_context_processor
 def theme(request):
     contexts = {}
     if 'theme' in request.GET and request.user.profile.is_superuser:
@@ -26,6 +34,7 @@ def theme(request):
 
     contexts['LOCAL_THEME_URL'] = '/themes/' + theme + '/'
 
-    contexts['THEME_INFO'] = get_theme_info(theme)
+    # reading theme.info is only done if a template uses it
+    contexts.update(theme_info(request))
 
     return contexts
@@ -1,14 +1,13 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.core.cache import cache
 
 
 class Command(BaseCommand):
     """
     If theme files are served on an external server, such as AWS S3,
-    the theme files contents are cached and the cache keys are added
-    to a list that is also cached. This command clears that list, so
-    that theme files are then re-cached.
+    the templates are read from a local mirror of the active theme
+    that is synced in the background. This command clears the mirror
+    and syncs it again right away.
 
     A usecase for this would be whenever a new theme is uploaded to the remote storage.
 
@@ -16,10 +15,14 @@ class Command(BaseCommand):
     """
 
     def handle(self, *args, **options):
-        cache_group_key = "%s.theme_files_cache_list" % settings.SITE_CACHE_KEY
-        cache_group_list = cache.get(cache_group_key)
+        from tendenci.apps.theme.mirror import get_theme_mirror
+        from tendenci.apps.theme.utils import get_theme
 
-        if cache_group_list:  # protects against NoneType object
-            for key in cache_group_list:
-                cache.delete(key)
-            cache.set(cache_group_key, [])
+        if not settings.USE_S3_THEME:
+            return
+
+        mirror = get_theme_mirror(get_theme())
+        mirror.clear()
+        downloaded, removed = mirror.sync()
+        if int(options.get('verbosity', 1)) >= 2:
+            self.stdout.write('Downloaded %d theme files' % downloaded)
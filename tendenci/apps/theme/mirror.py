@@ -0,0 +1,214 @@
+"""
+Local mirror of the themes stored on S3 (USE_S3_THEME).
+
+The files of a theme are downloaded to THEME_MIRROR_DIR/<theme> and the
+template loader reads them from there. A manifest next to them keeps
+the ETag of every file, so a sync lists the theme prefix once and only
+downloads the files whose ETag changed. The first read of a theme syncs
+it; after that, a read more than THEME_MIRROR_REVALIDATE seconds after
+the last sync starts a sync in a background thread and keeps serving
+the local files.
+
+The bucket is settings.AWS_STORAGE_BUCKET_NAME (see
+tendenci.libs.boto_s3.utils.get_bucket), any object with the list()
+method of a boto bucket can be passed instead.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils._os import safe_join
+
+from tendenci.apps.theme.utils import bump_theme_version
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.manifest.json'
+
+
+class ThemeMirror(object):
+
+    def __init__(self, theme, bucket=None, root=None, prefix=None):
+        self.theme = theme
+        self.root = root or os.path.join(settings.THEME_MIRROR_DIR, theme)
+        if prefix is None:
+            prefix = '%s/%s/' % (settings.THEME_S3_PATH.strip('/'), theme)
+        self.prefix = prefix
+        self._bucket = bucket
+        self._revalidating = threading.Lock()
+        self._failed_at = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            from tendenci.libs.boto_s3.utils import get_bucket
+            self._bucket = get_bucket()
+        return self._bucket
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def write_manifest(self, manifest):
+        self.write_file(self.manifest_path, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+    def get_synced_time(self):
+        """
+        The time of the last sync, by any process, or None.
+        """
+        try:
+            return os.path.getmtime(self.manifest_path)
+        except OSError:
+            return None
+
+    def write_file(self, path, write):
+        """
+        Writes path through a temporary file, so that readers never
+        see a partial file.
+        """
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.rename(tmp_path, path)
+        except:
+            os.remove(tmp_path)
+            raise
+
+    def lock(self, wait=True):
+        """
+        Returns the open lock file of the mirror, locked, or None
+        if another process holds it and wait is False.
+        """
+        if not os.path.isdir(os.path.dirname(self.root)):
+            os.makedirs(os.path.dirname(self.root))
+        lock_file = open('%s.lock' % self.root, 'a')
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except IOError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    def sync(self, wait=True):
+        """
+        Downloads the files whose ETag changed and removes the ones
+        deleted from S3. Returns the (downloaded, removed) counts,
+        or None if another process is syncing and wait is False.
+        """
+        lock_file = self.lock(wait=wait)
+        if lock_file is None:
+            return None
+
+        try:
+            manifest = self.read_manifest()
+            listed = {}
+            downloaded = 0
+
+            for key in self.bucket.list(prefix=self.prefix):
+                name = key.name[len(self.prefix):]
+                if not name or name.endswith('/'):
+                    continue
+                path = safe_join(self.root, name)
+                etag = key.etag.strip('"')
+                listed[name] = etag
+                if manifest.get(name) == etag and os.path.isfile(path):
+                    continue
+                self.write_file(path, key.get_contents_to_file)
+                downloaded += 1
+
+            removed = [name for name in manifest if name not in listed]
+            for name in removed:
+                try:
+                    os.remove(safe_join(self.root, name))
+                except OSError:
+                    pass
+
+            # rewritten even if nothing changed, its mtime is the sync time
+            self.write_manifest(listed)
+        finally:
+            lock_file.close()
+
+        if downloaded or removed:
+            bump_theme_version()
+        return downloaded, len(removed)
+
+    def revalidate(self):
+        """
+        Syncs the mirror in a background thread, unless this process
+        or another one is already doing it.
+        """
+        if not self._revalidating.acquire(False):
+            return
+
+        def run():
+            try:
+                self.sync(wait=False)
+            except Exception as e:
+                logger.error('Unable to sync the theme mirror of %s: %s' % (self.theme, e))
+            finally:
+                self._revalidating.release()
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def get_root(self):
+        """
+        Returns the local directory of the theme, syncing it first
+        if it never was.
+        """
+        synced = self.get_synced_time()
+        if synced is None:
+            # don't retry a failed first sync on every read
+            if self._failed_at and time.time() - self._failed_at < settings.THEME_MIRROR_REVALIDATE:
+                return self.root
+            try:
+                self.sync()
+            except Exception as e:
+                self._failed_at = time.time()
+                logger.error('Unable to sync the theme mirror of %s: %s' % (self.theme, e))
+        elif time.time() - synced > settings.THEME_MIRROR_REVALIDATE:
+            self.revalidate()
+        return self.root
+
+    def clear(self):
+        lock_file = self.lock()
+        try:
+            shutil.rmtree(self.root, ignore_errors=True)
+        finally:
+            lock_file.close()
+
+
+_mirrors = {}
+
+
+def get_theme_mirror(theme):
+    if theme not in _mirrors:
+        _mirrors[theme] = ThemeMirror(theme)
+    return _mirrors[theme]
@@ -4,8 +4,9 @@ Wrapper for loading template based on a selected Theme.
 import os
 
 from django.conf import settings
-from django.template import TemplateDoesNotExist
+from django.template import Template, TemplateDoesNotExist
 from django.template.loader import BaseLoader
+from django.template.loaders import cached
 from django.template import engines
 engine = engines['django'].engine
 find_template_loader = engine.find_template_loader
@@ -13,12 +14,11 @@ get_template_from_string = engine.from_string
 make_origin = engine.make_origin
 
 from django.utils._os import safe_join
-from django.core.cache import cache
 from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import SuspiciousFileOperation
 
-from tendenci.libs.boto_s3.utils import read_theme_file_from_s3
-from tendenci.apps.theme.utils import get_theme_root
+from tendenci.apps.theme.utils import get_theme, get_theme_root, get_theme_version
+from tendenci.apps.theme.mirror import get_theme_mirror
 from tendenci.apps.theme.middleware import get_current_request
 
 non_theme_source_loaders = None
@@ -59,16 +59,16 @@ class Loader(BaseLoader):
         current_request = get_current_request()
         # this is needed when the theme is changed
         self.theme_root = get_theme_root()
-        if current_request and current_request.mobile:
+        if settings.USE_S3_THEME:
+            # the theme files are read from the local mirror of S3
+            self.theme_root = get_theme_mirror(self.theme_root).get_root()
+        if current_request and getattr(current_request, 'mobile', False):
             theme_templates.append(os.path.join(self.theme_root, 'mobile'))
         theme_templates.append(os.path.join(self.theme_root, 'templates'))
 
         for template_path in theme_templates:
             try:
-                if settings.USE_S3_THEME:
-                    yield os.path.join(template_path, template_name)
-                else:
-                    yield safe_join(template_path, template_name)
+                yield safe_join(template_path, template_name)
             except SuspiciousFileOperation:
                 # The joined path was located outside of this particular
                 # template_dir (it might be inside another one, so this isn't
@@ -79,48 +79,14 @@ class Loader(BaseLoader):
         tried = []
 
         for filepath in self.get_template_sources(template_name, template_dirs):
-            # First try to read from S3
-            if settings.USE_S3_THEME:
-                # first try to read from cache
-                cache_key = ".".join([settings.SITE_CACHE_KEY, "theme", filepath])
-                cached_template = cache.get(cache_key)
-                if cached_template == "tried":
-                    # Skip out of this on to the next template file
-                    continue
-                if cached_template:
-                    return (cached_template, filepath)
-
-                try:
-                    file = read_theme_file_from_s3(filepath)
-                    try:
-                        cache.set(cache_key, file)
-                        cache_group_key = "%s.theme_files_cache_list" % settings.SITE_CACHE_KEY
-                        cache_group_list = cache.get(cache_group_key)
-
-                        if cache_group_list is None:
-                            cache.set(cache_group_key, [cache_key])
-                        else:
-                            cache_group_list += [cache_key]
-                            cache.set(cache_group_key, cache_group_list)
-
-                        return (file, filepath)
-                    finally:
-                        pass
-                except:
-                    # Cache that we tried this file
-                    cache.set(cache_key, "tried")
-
-            # Otherwise, look on to local file system.
-            else:
-                #print filepath
+            try:
+                file = open(filepath)
                 try:
-                    file = open(filepath)
-                    try:
-                        return (file.read().decode(settings.FILE_CHARSET), filepath)
-                    finally:
-                        file.close()
-                except IOError:
-                    tried.append(filepath)
+                    return (file.read().decode(settings.FILE_CHARSET), filepath)
+                finally:
+                    file.close()
+            except IOError:
+                tried.append(filepath)
         if tried:
             error_msg = "Tried %s" % tried
         else:
@@ -128,6 +94,79 @@ class Loader(BaseLoader):
         raise TemplateDoesNotExist(_(error_msg))
     load_template_source.is_usable = True
 
+
+class CachedLoader(cached.Loader):
+    """
+    Caches the compiled templates of the loaders it wraps, like
+    django.template.loaders.cached.Loader, but keyed by theme, mobile
+    flag and template name, so that a theme previewed through
+    request.session['theme'] gets its own templates.
+
+    A cached template is reloaded when the theme version changes
+    (any theme file added, edited or deleted through the theme editor)
+    or when the modification time of its local file changes.
+    Templates that were not found are cached too, until the next
+    theme version.
+    """
+    def get_mtime(self, path):
+        try:
+            return os.path.getmtime(path)
+        except (OSError, TypeError, ValueError):
+            return None
+
+    def find_template_source(self, name, dirs=None):
+        """
+        Returns the source of the template (the compiled template for
+        loaders without load_template_source), its origin and the path
+        of its file, or None if no loader has it.
+        """
+        for loader in self.loaders:
+            try:
+                if hasattr(loader, 'load_template_source'):
+                    source, display_name = loader.load_template_source(name, dirs)
+                    origin = self.engine.make_origin(display_name, loader.load_template_source,
+                                                     name, dirs)
+                else:
+                    source, display_name = loader(name, dirs)
+                    origin = self.engine.make_origin(display_name, loader, name, dirs)
+            except TemplateDoesNotExist:
+                continue
+            return source, origin, display_name
+        return None
+
+    def load_template(self, template_name, template_dirs=None):
+        current_request = get_current_request()
+        mobile = bool(current_request and getattr(current_request, 'mobile', False))
+        key = (get_theme(), mobile, template_name, tuple(template_dirs or ()))
+        version = get_theme_version()
+
+        cached_template = self.template_cache.get(key)
+        if cached_template is not None:
+            template, cached_version, path, mtime = cached_template
+            if cached_version == version and (mtime is None or self.get_mtime(path) == mtime):
+                if template is None:
+                    raise TemplateDoesNotExist(template_name)
+                return template, None
+
+        found = self.find_template_source(template_name, template_dirs)
+        if found is None:
+            self.template_cache[key] = (None, version, None, None)
+            raise TemplateDoesNotExist(template_name)
+
+        template, origin, path = found
+        if not hasattr(template, 'render'):
+            try:
+                template = Template(template, origin, template_name, self.engine)
+            except TemplateDoesNotExist:
+                # If compiling the template we found raises TemplateDoesNotExist,
+                # back off to returning the source and display name for the template
+                # we were asked to load, as django's cached loader does.
+                return template, path
+
+        self.template_cache[key] = (template, version, path, self.get_mtime(path))
+        return template, None
+
+
 _loader = Loader()
 
 
@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+
+from django.template import Context, engines
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from tendenci.apps.site_settings.models import Setting
+from tendenci.apps.theme.middleware import RequestMiddleware
+from tendenci.apps.theme.template_loaders import CachedLoader
+from tendenci.apps.theme.utils import bump_theme_version, get_theme_version
+
+
+class CachedLoaderTest(TestCase):
+    def setUp(self):
+        self.themes_dir = tempfile.mkdtemp()
+        for theme in ('first', 'second'):
+            self.write_template(theme, '%s {{ value }}' % theme)
+
+        self.override = override_settings(ORIGINAL_THEMES_DIR=self.themes_dir,
+                                          USE_S3_THEME=False)
+        self.override.enable()
+        Setting.objects.create(name='theme', label='Theme', description='',
+                               data_type='string', value='first', input_type='text',
+                               scope='module', scope_category='theme_editor')
+
+        self.loader = CachedLoader(engines['django'].engine,
+                                   ['tendenci.apps.theme.template_loaders.Loader'])
+        self.start_request()
+
+    def tearDown(self):
+        RequestMiddleware().process_request(None)
+        self.override.disable()
+        shutil.rmtree(self.themes_dir)
+
+    def start_request(self, session=None):
+        request = RequestFactory().get('/')
+        request.session = session or {}
+        RequestMiddleware().process_request(request)
+
+    def write_template(self, theme, content, mtime=1500000000):
+        dirname = os.path.join(self.themes_dir, theme, 'templates')
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        path = os.path.join(dirname, 'loader_test.html')
+        with open(path, 'w') as f:
+            f.write(content)
+        os.utime(path, (mtime, mtime))
+
+    def render(self):
+        template, origin = self.loader.load_template('loader_test.html')
+        return template.render(Context({'value': 'ok'}))
+
+    def test_render_active_theme(self):
+        self.assertEqual(self.render(), 'first ok')
+
+    def test_render_previewed_theme(self):
+        self.assertEqual(self.render(), 'first ok')
+
+        self.start_request(session={'theme': 'second'})
+        self.assertEqual(self.render(), 'second ok')
+
+        self.start_request()
+        self.assertEqual(self.render(), 'first ok')
+
+    def test_theme_version_bump_reloads(self):
+        self.assertEqual(self.render(), 'first ok')
+
+        # same mtime: only the theme version tells the template changed
+        self.write_template('first', 'edited {{ value }}')
+        self.start_request()
+        self.assertEqual(self.render(), 'first ok')
+
+        bump_theme_version()
+        self.start_request()
+        self.assertEqual(self.render(), 'edited ok')
+
+    def test_mtime_change_reloads(self):
+        self.assertEqual(self.render(), 'first ok')
+
+        self.write_template('first', 'edited {{ value }}', mtime=1500000010)
+        self.start_request()
+        self.assertEqual(self.render(), 'edited ok')
+
+
+class FakeKey(object):
+    def __init__(self, name, etag, content):
+        self.name = name
+        self.etag = '"%s"' % etag
+        self.content = content
+        self.downloads = 0
+
+    def get_contents_to_file(self, f):
+        self.downloads += 1
+        f.write(self.content)
+
+
+class FakeBucket(object):
+    def __init__(self, keys=()):
+        self.keys = list(keys)
+        self.listed = 0
+
+    def list(self, prefix=''):
+        self.listed += 1
+        if self.keys is None:
+            raise IOError('S3 is unreachable')
+        return [key for key in self.keys if key.name.startswith(prefix)]
+
+
+class ThemeMirrorTest(TestCase):
+    def setUp(self):
+        from tendenci.apps.theme.mirror import ThemeMirror
+
+        RequestMiddleware().process_request(None)
+        self.mirror_dir = tempfile.mkdtemp()
+        self.header = FakeKey('themes/t/templates/header.html', 'a1', 'header')
+        self.footer = FakeKey('themes/t/templates/footer.html', 'b1', 'footer')
+        self.bucket = FakeBucket([self.header, self.footer,
+                                  FakeKey('themes/other/templates/header.html', 'c1', 'other')])
+        self.mirror = ThemeMirror('t', bucket=self.bucket,
+                                  root=os.path.join(self.mirror_dir, 't'),
+                                  prefix='themes/t/')
+
+    def tearDown(self):
+        shutil.rmtree(self.mirror_dir)
+
+    def read(self, name):
+        with open(os.path.join(self.mirror.root, name)) as f:
+            return f.read()
+
+    def test_first_sync_downloads_the_theme(self):
+        self.assertEqual(self.mirror.sync(), (2, 0))
+        self.assertEqual(self.read('templates/header.html'), 'header')
+        self.assertEqual(self.read('templates/footer.html'), 'footer')
+        self.assertEqual(self.mirror.read_manifest(),
+                         {'templates/header.html': 'a1', 'templates/footer.html': 'b1'})
+
+    def test_unchanged_etags_are_not_downloaded(self):
+        self.mirror.sync()
+
+        self.header.etag = '"a2"'
+        self.header.content = 'edited'
+        self.assertEqual(self.mirror.sync(), (1, 0))
+        self.assertEqual(self.header.downloads, 2)
+        self.assertEqual(self.footer.downloads, 1)
+        self.assertEqual(self.read('templates/header.html'), 'edited')
+
+    def test_files_deleted_on_s3_are_removed(self):
+        self.mirror.sync()
+
+        self.bucket.keys.remove(self.footer)
+        self.assertEqual(self.mirror.sync(), (0, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.mirror.root, 'templates/footer.html')))
+        self.assertEqual(self.mirror.read_manifest(), {'templates/header.html': 'a1'})
+
+    def test_version_bumped_only_when_something_changed(self):
+        version = get_theme_version()
+        self.mirror.sync()
+        self.assertNotEqual(get_theme_version(), version)
+
+        version = get_theme_version()
+        self.assertEqual(self.mirror.sync(), (0, 0))
+        self.assertEqual(get_theme_version(), version)
+
+        self.bucket.keys.remove(self.footer)
+        self.mirror.sync()
+        self.assertNotEqual(get_theme_version(), version)
+
+    @override_settings(THEME_MIRROR_REVALIDATE=60)
+    def test_failed_first_sync_is_not_retried_on_every_read(self):
+        keys, self.bucket.keys = self.bucket.keys, None
+        self.assertEqual(self.mirror.get_root(), self.mirror.root)
+        self.assertEqual(self.mirror.get_root(), self.mirror.root)
+        self.assertEqual(self.bucket.listed, 1)
+
+        # retried once THEME_MIRROR_REVALIDATE has passed
+        self.bucket.keys = keys
+        self.mirror._failed_at -= 61
+        self.mirror.get_root()
+        self.assertEqual(self.bucket.listed, 2)
+        self.assertEqual(self.read('templates/header.html'), 'header')
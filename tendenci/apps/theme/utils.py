@@ -1,4 +1,5 @@
 import os
+import uuid
 import ConfigParser
 from django.conf import settings
 from django.core.cache import cache
@@ -9,10 +10,38 @@ from tendenci.apps.theme.middleware import get_current_request
 def get_theme():
     request = get_current_request()
     if request:
-        theme = request.session.get('theme', get_setting('module', 'theme_editor', 'theme'))
-    else:
-        theme = get_setting('module', 'theme_editor', 'theme')
-    return theme
+        if 'theme' in request.session:
+            return request.session['theme']
+        # the active theme setting is read once per request
+        if not hasattr(request, 'active_theme'):
+            request.active_theme = get_setting('module', 'theme_editor', 'theme')
+        return request.active_theme
+    return get_setting('module', 'theme_editor', 'theme')
+
+
+def get_theme_version():
+    """
+    Returns the version stamp of the theme files. It changes whenever
+    a theme file is added, edited or deleted, which makes the
+    template loader reload the templates. It is read once per request.
+    """
+    request = get_current_request()
+    if request and hasattr(request, 'theme_version'):
+        return request.theme_version
+
+    key = '.'.join([settings.CACHE_PRE_KEY, 'theme_version'])
+    version = cache.get(key)
+    if not version:
+        version = uuid.uuid4().hex
+        cache.set(key, version, None)
+    if request:
+        request.theme_version = version
+    return version
+
+
+def bump_theme_version():
+    key = '.'.join([settings.CACHE_PRE_KEY, 'theme_version'])
+    cache.set(key, uuid.uuid4().hex, None)
 
 
 def get_theme_root(theme=None):
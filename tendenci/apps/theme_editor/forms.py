@@ -8,10 +8,10 @@ from django import forms
 from django.core.files import File
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
-from django.core.cache import cache
 
 # local
-from tendenci.apps.theme.utils import get_theme_root, get_theme, theme_choices
+from tendenci.apps.theme.utils import get_theme_root, get_theme, bump_theme_version, theme_choices
+from tendenci.apps.theme.mirror import get_theme_mirror
 from tendenci.apps.theme_editor.utils import archive_file
 from tendenci.libs.boto_s3.utils import save_file_to_s3
 
@@ -70,6 +70,7 @@ class FileForm(forms.Form):
             file = File(f)
             file.write(content)
             file.close()
+            bump_theme_version()
 
             if settings.USE_S3_THEME:
                 # copy to s3 storage
@@ -79,8 +80,8 @@ class FileForm(forms.Form):
                     public = True
                 save_file_to_s3(file_path, public=public)
 
-                cache_key = ".".join([settings.SITE_CACHE_KEY, 'theme', "%s/%s" % (get_theme(), file_relative_path)])
-                cache.delete(cache_key)
+                # update the local mirror the templates are read from
+                get_theme_mirror(get_theme()).revalidate()
 
                 if hasattr(settings, 'REMOTE_DEPLOY_URL') and settings.REMOTE_DEPLOY_URL:
                     urllib.urlopen(settings.REMOTE_DEPLOY_URL)
@@ -8,10 +8,10 @@ from dateutil.parser import parse
 from operator import itemgetter
 
 from django.conf import settings
-from django.core.cache import cache
 from importlib import import_module
 
-from tendenci.apps.theme.utils import get_theme_root, get_theme
+from tendenci.apps.theme.utils import get_theme_root, get_theme, bump_theme_version
+from tendenci.apps.theme.mirror import get_theme_mirror
 from tendenci.apps.theme_editor.models import ThemeFileVersion
 from tendenci.libs.boto_s3.utils import save_file_to_s3, read_theme_file_from_s3
 
@@ -99,6 +99,7 @@ def copy(filename, path_to_file, full_filename, TO_ROOT=THEME_ROOT):
 
     filecopy = os.path.join(TO_ROOT, "templates", path_to_file, filename)
     shutil.copy(full_filename, filecopy)
+    bump_theme_version()
 
     # copy to s3
     if settings.USE_S3_THEME:
@@ -310,6 +311,7 @@ def handle_uploaded_file(file_path, file_dir):
     dest_path = os.path.join(settings.PROJECT_ROOT, "themes", filecopy)
 
     shutil.move(file_path, dest_path)
+    bump_theme_version()
 
     # copy to s3
     if settings.USE_S3_THEME:
@@ -320,8 +322,8 @@ def handle_uploaded_file(file_path, file_dir):
         dest_path = "/themes/%s" % filecopy
         save_file_to_s3(file_path, dest_path=dest_path, public=public)
 
-        cache_key = ".".join([settings.SITE_CACHE_KEY, 'theme', file_path[(file_path.find(THEME_ROOT)):]])
-        cache.delete(cache_key)
+        # update the local mirror the templates are read from
+        get_theme_mirror(get_theme()).revalidate()
 
         if hasattr(settings, 'REMOTE_DEPLOY_URL') and settings.REMOTE_DEPLOY_URL:
             urllib.urlopen(settings.REMOTE_DEPLOY_URL)
@@ -20,7 +20,7 @@ from tendenci.apps.site_settings.utils import get_setting
 from tendenci.apps.site_settings.models import Setting
 from tendenci.apps.perms.utils import has_perm
 from tendenci.apps.event_logs.models import EventLog
-from tendenci.apps.theme.utils import get_theme, theme_choices as theme_choice_list
+from tendenci.apps.theme.utils import get_theme, bump_theme_version, theme_choices as theme_choice_list
 from tendenci.libs.boto_s3.utils import delete_file_from_s3
 from tendenci.apps.theme_editor.models import ThemeFileVersion
 from tendenci.apps.theme_editor.forms import (FileForm,
@@ -205,6 +205,7 @@ def create_new_template(request, form_class=AddTemplateForm):
             if use_s3_storage:
                 # django default_storage not set for theme, that's why we cannot use it
                 save_file_to_s3(template_full_path)
+            bump_theme_version()
 
             ret_dict['created'] = True
             ret_dict['template_name'] = template_full_name
@@ -341,6 +342,7 @@ def delete_file(request):
         raise Http404
 
     os.remove(full_filename)
+    bump_theme_version()
 
     if settings.USE_S3_STORAGE:
         delete_file_from_s3(file=settings.AWS_LOCATION + '/' + 'themes/' + get_theme() + '/' + current_dir + chosen_file)
@@ -3,6 +3,7 @@ import os
 from datetime import datetime
 import mimetypes
 import boto
+from boto.s3.connection import OrdinaryCallingFormat
 from boto.s3.key import Key
 from timezones.utils import adjust_datetime_to_timezone
 from django.conf import settings
@@ -39,6 +40,23 @@ class DefaultStorage(S3BotoStorage):
         super(DefaultStorage, self).__init__(*args, **kwargs)
 
 
+def get_bucket():
+    """
+    Returns the boto bucket settings.AWS_STORAGE_BUCKET_NAME.
+    AWS_S3_HOST (and AWS_S3_PORT, AWS_S3_USE_SSL) point it to another
+    S3 compatible server, a local stand-in for example.
+    """
+    kwargs = {}
+    if getattr(settings, 'AWS_S3_HOST', None):
+        kwargs['host'] = settings.AWS_S3_HOST
+        kwargs['port'] = getattr(settings, 'AWS_S3_PORT', None)
+        kwargs['is_secure'] = getattr(settings, 'AWS_S3_USE_SSL', True)
+        kwargs['calling_format'] = OrdinaryCallingFormat()
+    conn = boto.connect_s3(settings.AWS_ACCESS_KEY_ID,
+                           settings.AWS_SECRET_ACCESS_KEY, **kwargs)
+    return conn.get_bucket(settings.AWS_STORAGE_BUCKET_NAME, validate=False)
+
+
 def read_media_file_from_s3(file_path):
     """
     Read a media file from S3.
@@ -75,6 +75,7 @@ MIDDLEWARE_CLASSES = (
     'dj_pagination.middleware.PaginationMiddleware',
     'tendenci.apps.profiles.middleware.ForceLogoutProfileMiddleware',
     'tendenci.apps.profiles.middleware.ProfileMiddleware',
+    'tendenci.apps.perms.middleware.UserContextMiddleware',
     'tendenci.apps.base.middleware.Http403Middleware',
     'tendenci.apps.redirects.middleware.RedirectMiddleware',
     'tendenci.apps.mobile.middleware.MobileMiddleware',
@@ -92,6 +93,18 @@ ROOT_URLCONF = 'tendenci.urls'
 
 USE_S3_STORAGE = False
 
+# files.views.details streams the local files, unless FILES_SENDFILE hands
+# them to the front-end server: 'x-sendfile' (apache mod_xsendfile) or
+# 'x-accel-redirect' (nginx, with MEDIA_ROOT served by the internal
+# location FILES_SENDFILE_URL)
+FILES_SENDFILE = None
+FILES_SENDFILE_URL = '/protected_media/'
+
+# resized images of the files and photos are stored in IMAGE_DERIVATIVES_DIR,
+# the least recently used ones are removed past IMAGE_DERIVATIVES_MAX_SIZE bytes
+IMAGE_DERIVATIVES_DIR = os.path.join(TENDENCI_ROOT, 'image_derivatives')
+IMAGE_DERIVATIVES_MAX_SIZE = 1024 * 1024 * 1024
+
 # Absolute path to the directory that holds static media.
 STATIC_ROOT = os.path.join(TENDENCI_ROOT, 'static')
 
@@ -161,7 +174,7 @@ TEMPLATES = [
                 'tendenci.apps.forums.context_processors.processor',
                 ],
          'loaders':  [
-                ('django.template.loaders.cached.Loader', [
+                ('tendenci.apps.theme.template_loaders.CachedLoader', [
                 'app_namespace.Loader',
                 'tendenci.apps.theme.template_loaders.Loader',
                 #'tendenci.apps.theme.template_loaders.load_template_source',
@@ -342,6 +355,11 @@ THEMES_DIR = os.path.join(TENDENCI_ROOT, 'themes')
 # ORIGINAL_THEMES_DIR is used when USE_S3_STORAGE==True
 ORIGINAL_THEMES_DIR = THEMES_DIR
 USE_S3_THEME = False
+# with USE_S3_THEME, the active theme is synced from S3 to THEME_MIRROR_DIR
+# and templates are read from there. A sync is started in the background
+# when the last one is older than THEME_MIRROR_REVALIDATE seconds.
+THEME_MIRROR_DIR = os.path.join(TENDENCI_ROOT, 'theme_mirror')
+THEME_MIRROR_REVALIDATE = 60
 
 # -------------------------------------- #
 #    TINYMCE
@@ -398,6 +416,30 @@ CACHE_DIR = TENDENCI_ROOT + "/cache"
 CACHE_BACKEND = "file://" + CACHE_DIR + "?timeout=604800"   # 7 days
 CACHE_PRE_KEY = "TENDENCI"
 
+# -------------------------------------- #
+# EVENT LOGS
+# -------------------------------------- #
+# 'sync' saves each event log immediately. 'buffered' queues them per
+# process and bulk inserts them; 'spool' also writes the queue to
+# EVENTLOG_SPOOL_DIR so `manage.py drain_event_log_spool` can recover
+# rows from workers that died before flushing.
+EVENTLOG_WRITE_MODE = 'sync'
+EVENTLOG_BUFFER_SIZE = 100
+EVENTLOG_BUFFER_TIMEOUT = 5   # seconds
+EVENTLOG_SPOOL_DIR = os.path.join(CACHE_DIR, 'event_logs_spool')
+# 'stack' derives the application and action of an event log from the
+# calling code; 'resolver' takes them from request.resolver_match and
+# only walks the stack when the request did not resolve to a view.
+EVENTLOG_ATTRIBUTION_MODE = 'stack'
+# event logs older than this many days are moved to compressed monthly
+# files in default storage by `manage.py archive_event_logs`.
+# None keeps everything in the database.
+EVENTLOG_ARCHIVE_DAYS = None
+# `manage.py rollup_event_logs` leaves the event logs newer than this
+# many minutes to the reports' raw path, so rows still being committed
+# (or flushed from a buffer) are never skipped by the summaries.
+EVENTLOG_ROLLUP_LAG = 15
+
 # --------------------------------------#
 # CELERY
 # --------------------------------------#
@@ -419,9 +461,15 @@ USE_SUBPROCESS = True
 # --------------------------------------#
 # Hackstack Search
 # --------------------------------------#
+# The default engine is an embedded SQLite FTS5 index at PATH
+# (tendenci.apps.search.backends.sqlite_backend). Run rebuild_index once
+# after installing or upgrading, the index only returns what was indexed.
+# If the SQLite library has no FTS5, it falls back to SimpleEngine, which
+# needs no index but scans the database tables for every search.
 HAYSTACK_CONNECTIONS = {
     'default': {
-        'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
+        'ENGINE': 'tendenci.apps.search.backends.sqlite_backend.SQLiteEngine',
+        'PATH': os.path.join(TENDENCI_ROOT, 'search_index', 'index.sqlite3'),
     }
 }
 
@@ -436,6 +484,10 @@ HAYSTACK_INDEX_LIMITS = {
 INDEX_FILE_CONTENT = False
 HAYSTACK_SIGNAL_PROCESSOR = 'tendenci.apps.search.signals.QueuedSignalProcessor'
 
+# typeahead suggestions of the header search box,
+# built by rebuild_suggest_index
+SEARCH_SUGGEST_PATH = os.path.join(TENDENCI_ROOT, 'search_index', 'suggest.sqlite3')
+
 # --------------------------------------#
 # PAYMENT GATEWAYS
 # --------------------------------------#